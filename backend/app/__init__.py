@@ -1,21 +1,25 @@
 """
 Author:  Orion Hess
 Created: 2025-12-03
-Edited:  2025-12-10
+Edited:  2026-10-17
 
 Module to serve endpoints for our database
 """
 
 from flask import Flask
+from app import cache, instrumentation, middleware
 from app.config import Config
-from app.database import db
+from app.database import db, migrate
+from app.json_provider import FastJSONProvider
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
 
-    # Initialize database
+    # Initialize database, the schema is managed by the migrations in backend/migrations
     db.init_app(app)
+    migrate.init_app(app, db)
 
     from app.routes.users import user_bp
     from app.routes.budgets import budget_bp
@@ -28,12 +32,28 @@ def create_app(config_class=Config):
     category_bp.register_blueprint(transaction_bp, url_prefix='/<int:category_id>/transactions')
     app.register_blueprint(user_bp)
 
-    # Create tables that do not exist yet
-    with app.app_context():
-        db.create_all()
+    from app.commands import import_user, prune_applied_writes, rebuild_usage
+    app.cli.add_command(rebuild_usage)
+    app.cli.add_command(import_user)
+    app.cli.add_command(prune_applied_writes)
+
+    # Timing first, so it covers the other request hooks
+    instrumentation.init_app(app)
+    # ETags with 304s for If-None-Match, and compression
+    middleware.init_app(app)
+    cache.init_app(app)
 
     @app.route('/health')
     def health_check():
         return {'status': 'healthy'}, 200
 
+    @app.route('/metrics')
+    def metrics():
+        return instrumentation.render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+    @app.route('/cache')
+    def cache_stats():
+        read_cache = cache.get_cache()
+        return (read_cache.stats() if read_cache else {'backend': None}), 200
+
     return app
@@ -0,0 +1,161 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Time used per category or group, bucketed by day, week or month
+
+Whole days are summed from the category_daily_usage rollup, so a report costs the same
+per day however many transactions were logged. Only the partial days at either end
+of a range that does not start or end at midnight are summed from the transactions.
+Postgres buckets with date_trunc; SQLite, used for development, gets equivalent date functions.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import DateTime, cast, func
+
+from app.database import db
+from app.models import Category, CategoryDailyUsage, Group, Transaction
+
+BUCKETS = ('day', 'week', 'month')
+GROUP_BY = ('category', 'group')
+
+# Julian day of 1970-01-01, SQLite stores intervals as a date time after the epoch
+_SQLITE_EPOCH = 2440587.5
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """
+    First day of the bucket containing a day, weeks start on monday like date_trunc
+    :param day: Day inside the bucket
+    :param bucket: One of BUCKETS
+    """
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day: date, bucket: str) -> date:
+    """First day of the bucket after the one starting on day"""
+    if bucket == 'week':
+        return day + timedelta(weeks=1)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_range(start: datetime, end: datetime, bucket: str) -> list[date]:
+    """Every bucket overlapping the range from start inclusive to end exclusive"""
+    buckets = []
+    day = bucket_start(start.date(), bucket)
+    while datetime.combine(day, datetime.min.time()) < end:
+        buckets.append(day)
+        day = next_bucket(day, bucket)
+    return buckets
+
+
+def _bucket_expression(column, bucket: str):
+    """SQL expression truncating a date time column to the start of its bucket"""
+    if db.engine.dialect.name == 'sqlite':
+        if bucket == 'week':
+            # weekday 0 moves forward to sunday, step back to the monday before it
+            return func.date(column, 'weekday 0', '-6 days')
+        if bucket == 'month':
+            return func.date(column, 'start of month')
+        return func.date(column)
+    return func.date_trunc(bucket, cast(column, DateTime))
+
+
+def _seconds_expression(column):
+    """SQL expression summing an interval column to seconds"""
+    if db.engine.dialect.name == 'sqlite':
+        return func.sum((func.julianday(column) - _SQLITE_EPOCH) * 86400)
+    return func.extract('epoch', func.sum(column))
+
+
+def _as_date(value) -> date:
+    """Bucket returned by the database, a timestamp on Postgres and a string on SQLite"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
+
+
+def _sum_by_bucket(model, time_column, amount_column, key, budget_id, start, end, bucket):
+    """
+    Sum a table per bucket and per category or group, in one grouped query
+    :param model: Transaction or CategoryDailyUsage
+    :param time_column: Column of the model to bucket and filter the range by
+    :param amount_column: Interval column of the model to sum
+    :param key: Category column to group by
+    :return: List of bucket, key and seconds tuples
+    """
+    bucket_column = _bucket_expression(time_column, bucket)
+    return db.session.query(bucket_column, key, _seconds_expression(amount_column)) \
+        .join(Category, Category.category_id == model.category_id) \
+        .filter(Category.budget_id == budget_id, time_column >= start, time_column < end) \
+        .group_by(bucket_column, key) \
+        .all()
+
+
+def usage(budget_id: int, start: datetime, end: datetime, bucket: str, group_by: str) -> dict:
+    """
+    Time used in a budget per bucket, as a columnar payload
+    :param budget_id: Budget to report on
+    :param start: Start of the range, inclusive
+    :param end: End of the range, exclusive
+    :param bucket: One of BUCKETS
+    :param group_by: One of GROUP_BY
+    :return: Dictionary with the list of buckets, and ids, names and values in seconds
+        of each category or group, values[i][j] being the time used by ids[i] in buckets[j]
+    """
+    if group_by == 'group':
+        series = db.session.query(Group.group_id, Group.group_name) \
+            .filter(Group.budget_id == budget_id).order_by(Group.group_id).all()
+        key = Category.group_id
+    else:
+        series = db.session.query(Category.category_id, Category.category_name) \
+            .filter(Category.budget_id == budget_id).order_by(Category.category_id).all()
+        key = Category.category_id
+
+    # Whole days in the range come from the rollup, the partial days around them from transactions
+    first_day = start.date() if start.time() == datetime.min.time() else start.date() + timedelta(days=1)
+    last_day = end.date()
+    if first_day < last_day:
+        rows = _sum_by_bucket(CategoryDailyUsage, CategoryDailyUsage.day, CategoryDailyUsage.time_used,
+                              key, budget_id, first_day, last_day, bucket)
+        edges = [(start, datetime.combine(first_day, datetime.min.time())),
+                 (datetime.combine(last_day, datetime.min.time()), end)]
+    else:
+        rows = []
+        edges = [(start, end)]
+    for edge_start, edge_end in edges:
+        if edge_start < edge_end:
+            rows += _sum_by_bucket(Transaction, Transaction.date_time, Transaction.period,
+                                   key, budget_id, edge_start, edge_end, bucket)
+
+    buckets = bucket_range(start, end, bucket)
+    columns = {day: i for i, day in enumerate(buckets)}
+    values = {series_id: [0.0] * len(buckets) for series_id, _ in series}
+    for bucket_value, series_id, seconds in rows:
+        if series_id not in values:
+            # Transactions of categories outside any group
+            series.append((None, None))
+            values[None] = [0.0] * len(buckets)
+        values[series_id][columns[_as_date(bucket_value)]] += float(seconds or 0)
+
+    return {
+        'bucket': bucket,
+        'group_by': group_by,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'buckets': [day.isoformat() for day in buckets],
+        'ids': [series_id for series_id, _ in series],
+        'names': [name for _, name in series],
+        # Rounded to milliseconds, julianday arithmetic on SQLite is off in the last digits
+        'values': [[round(value, 3) for value in values[series_id]] for series_id, _ in series],
+    }
@@ -0,0 +1,174 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Server side cache of the rendered read views of budgets
+
+Entries are keyed by the budget's revision ETag and the full path of the request, so a
+write to the budget makes its entries unreachable as soon as it commits. After a commit
+the entries of the budgets it wrote to are also dropped, to give their memory back.
+
+By default entries are kept in an LRU holding at most CACHE_MAX_BYTES of bodies per
+worker process. With CACHE_REDIS_URL set, and the redis package installed, they are kept
+in Redis instead and shared by the workers; its maxmemory then bounds the cache.
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import event
+
+from app.database import db
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LRUCache:
+    """Thread safe LRU of response entries, bounded by the total size of their bodies"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: tuple) -> None:
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key)[0])
+            self.entries[key] = entry
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted[0])
+                self.evictions += 1
+
+    def invalidate(self, budget_ids) -> None:
+        prefixes = tuple(f"b{budget_id}." for budget_id in budget_ids)
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefixes)]:
+                self.size -= len(self.entries.pop(key)[0])
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'backend': 'memory', 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+
+class RedisCache:
+    """Response entries in Redis, with a set of the keys of each budget for invalidation"""
+
+    def __init__(self, url: str, ttl: int):
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: str):
+        value = self.client.get(f"cache:{key}")
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        mimetype, link, body = value.split(b'\n', 2)
+        return body, mimetype.decode(), link.decode()
+
+    def put(self, key: str, entry: tuple) -> None:
+        body, mimetype, link = entry
+        budget_keys = f"budget:{key.split('.', 1)[0]}"
+        with self.client.pipeline() as pipeline:
+            pipeline.set(f"cache:{key}", b'\n'.join((mimetype.encode(), link.encode(), body)), ex=self.ttl)
+            pipeline.sadd(budget_keys, f"cache:{key}")
+            pipeline.expire(budget_keys, self.ttl)
+            pipeline.execute()
+
+    def invalidate(self, budget_ids) -> None:
+        for budget_id in budget_ids:
+            keys = self.client.smembers(f"budget:b{budget_id}")
+            self.client.delete(f"budget:b{budget_id}", *keys)
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = {'backend': 'redis', 'hits': self.hits, 'misses': self.misses}
+        info = self.client.info()
+        stats.update(evictions=info.get('evicted_keys', 0), bytes=info.get('used_memory', 0),
+                     max_bytes=info.get('maxmemory', 0))
+        return stats
+
+
+def init_app(app):
+    """Create the cache of an application, or none when CACHE_MAX_BYTES is 0 and no Redis is configured"""
+    if app.config['CACHE_REDIS_URL']:
+        if redis is None:
+            raise RuntimeError('CACHE_REDIS_URL is set but the redis package is not installed.')
+        app.extensions['read_cache'] = RedisCache(app.config['CACHE_REDIS_URL'], app.config['CACHE_TTL'])
+    elif app.config['CACHE_MAX_BYTES'] > 0:
+        app.extensions['read_cache'] = LRUCache(app.config['CACHE_MAX_BYTES'])
+
+
+def get_cache():
+    """Return the cache of the current application, or None"""
+    return current_app.extensions.get('read_cache')
+
+
+def cached(view):
+    """
+    Serve a budget read view from the cache, rendering and storing it on a miss.
+    Only views with a revision ETag, see app.middleware, are cached.
+    """
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        cache = get_cache()
+        etag = g.get('budget_etag')
+        if cache is None or etag is None:
+            return view(**kwargs)
+
+        key = f"{etag}:{request.full_path}"
+        entry = cache.get(key)
+        if entry is not None:
+            body, mimetype, link = entry
+            response = current_app.response_class(body, mimetype=mimetype)
+            if link:
+                response.headers['Link'] = link
+            return response
+
+        response = make_response(view(**kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            cache.put(key, (response.get_data(), response.mimetype, response.headers.get('Link', '')))
+        return response
+    return wrapper
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_written_budgets(session):
+    """Drop the entries of the budgets a commit wrote to, see Budget.bump_revision"""
+    budget_ids = session.info.pop('written_budgets', None)
+    cache = get_cache() if budget_ids else None
+    if cache is not None:
+        cache.invalidate(budget_ids)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_written_budgets(session):
+    session.info.pop('written_budgets', None)
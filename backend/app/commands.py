@@ -0,0 +1,164 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Administrative commands for the time budgeting application
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import cast
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
+
+from app.database import db
+from app.models import AppliedWrite, Budget, Category, CategoryDailyUsage, Group, ImportJob, Transaction
+from app.transfer import FORMATS, import_records, read_records
+
+
+def _actual_time_used():
+    """
+    Sum the transactions of every category, then roll those sums up to groups and budgets
+    :return: Tuple of category, group and budget dictionaries mapping id to interval
+    """
+    transaction_sums = dict(
+        db.session.query(Transaction.category_id, func.sum(Transaction.period))
+        .group_by(Transaction.category_id)
+        .all()
+    )
+
+    categories, groups, budgets = {}, {}, {}
+    for category_id, group_id, budget_id in db.session.query(Category.category_id, Category.group_id, Category.budget_id):
+        time_used = transaction_sums.get(category_id) or timedelta(0)
+        categories[category_id] = time_used
+        if group_id is not None:
+            groups[group_id] = groups.get(group_id, timedelta(0)) + time_used
+        budgets[budget_id] = budgets.get(budget_id, timedelta(0)) + time_used
+    return categories, groups, budgets
+
+
+def _actual_daily_usage():
+    """
+    Sum the transactions of every category per day
+    :return: Dictionary mapping (category_id, day) to interval
+    """
+    day = cast(Transaction.date_time, db.Date)
+    return {
+        (category_id, usage_day): time_used
+        for category_id, usage_day, time_used in db.session.query(Transaction.category_id, day, func.sum(Transaction.period))
+        .group_by(Transaction.category_id, day)
+    }
+
+
+@click.command('rebuild-usage')
+@click.option('--verify', is_flag=True, help='Only report running totals that are wrong, change nothing.')
+@with_appcontext
+def rebuild_usage(verify):
+    """Recompute the time used totals of categories, groups, budgets and days from transactions"""
+    tables = ((Category, Category.category_id), (Group, Group.group_id), (Budget, Budget.budget_id))
+
+    # Lock in the same order as the transaction routes so no write lands between summing and storing,
+    # a category, then its budget, bumped before the first write, then its group
+    rows = {}
+    for model, key in (tables[0], tables[2], tables[1]):
+        query = model.query.order_by(key)
+        if not verify:
+            query = query.with_for_update()
+        rows[model] = query.all()
+
+    actual = dict(zip((model for model, _ in tables), _actual_time_used()))
+
+    mismatches = 0
+    written = set()
+    for model, key in tables:
+        for row in rows[model]:
+            row_id = getattr(row, key.key)
+            expected = actual[model].get(row_id, timedelta(0))
+            if row.time_used == expected:
+                continue
+            mismatches += 1
+            click.echo(f"{model.__tablename__} {row_id}: stored {row.time_used}, actual {expected}")
+            if not verify:
+                row.time_used = expected
+                written.add(row.budget_id)
+
+    # Daily rollup, rows of days without transactions left are removed
+    stored = {(row.category_id, row.day): row for row in CategoryDailyUsage.query}
+    actual_daily = _actual_daily_usage()
+    for key in sorted(stored.keys() | actual_daily.keys()):
+        expected = actual_daily.get(key)
+        row = stored.get(key)
+        if row is not None and row.time_used == expected:
+            continue
+        mismatches += 1
+        click.echo(f"{CategoryDailyUsage.__tablename__} {key[0]} {key[1]}: "
+                   f"stored {row.time_used if row else None}, actual {expected}")
+        if verify:
+            continue
+        if expected is None:
+            db.session.delete(row)
+        elif row is None:
+            db.session.add(CategoryDailyUsage(category_id=key[0], day=key[1], time_used=expected))
+        else:
+            row.time_used = expected
+
+    if verify:
+        db.session.rollback()
+        click.echo(f"{mismatches} running totals are wrong.")
+        if mismatches:
+            raise SystemExit(1)
+    else:
+        # Totals are part of the views and changes of their budgets
+        if written:
+            Budget.bump_revision(*written)
+        db.session.commit()
+        click.echo(f"Rebuilt {mismatches} running totals.")
+
+
+@click.command('import-user')
+@click.argument('file', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'import_format', type=click.Choice(list(FORMATS)),
+              help='Format of the file, by default taken from its extension.')
+@click.option('--job', 'job_id', type=int, help='Resume this import job, after the records it committed.')
+@with_appcontext
+def import_user(file, import_format, job_id):
+    """Create a user from a file written by the export endpoint"""
+    if import_format is None:
+        import_format = 'csv' if file.name.endswith('.csv') else 'ndjson'
+
+    if job_id is None:
+        job = ImportJob(records_done=0, finished=False)
+        db.session.add(job)
+        db.session.commit()
+    else:
+        job = db.session.get(ImportJob, job_id)
+        if job is None:
+            raise click.ClickException(f"Import job {job_id} not found.")
+
+    def progress(job):
+        click.echo(f"{job.records_done:,} records imported")
+
+    try:
+        import_records(job, read_records(file, import_format), current_app.config['IMPORT_CHUNK_SIZE'], progress)
+    except (ValueError, IntegrityError) as error:
+        message = str(error.orig) if isinstance(error, IntegrityError) else str(error)
+        raise click.ClickException(f"{message}\nResume with --job {job.job_id} once the file is fixed, "
+                                   f"{job.records_done:,} records were imported.")
+    click.echo(f"Imported user {job.user_id} from {job.records_done:,} records.")
+
+
+@click.command('prune-applied-writes')
+@click.option('--days', type=int, default=30, show_default=True,
+              help='Keep the idempotency keys of creates applied in this many last days.')
+@with_appcontext
+def prune_applied_writes(days):
+    """Forget the idempotency keys of old creates, clients only send a create again while it is pending"""
+    # Naive UTC, like the time the database stamps keys with
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    deleted = AppliedWrite.query.filter(AppliedWrite.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Forgot {deleted:,} idempotency keys.")
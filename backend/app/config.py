@@ -1,7 +1,7 @@
 """
 Author: Orion Hess
 Created: 2025-12-03
-Updated: 2025-12-03
+Updated: 2026-10-17
 
 Configuration settings for the time budgeting application.
 """
@@ -14,4 +14,61 @@ dotenv.load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-standin-secret-key')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool of each worker process. Every process can hold up to
+    # pool_size + max_overflow connections, so WEB_WORKERS times that must stay
+    # below DB_MAX_CONNECTIONS, the max_connections of the database.
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 100))
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+
+    # Production server, see app.run.serve. Threads of a worker share its
+    # connection pool, so keep WEB_THREADS at most pool_size + max_overflow.
+    # Workers default to 2 * cpus + 1, capped to as many as the database connections allow.
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:8000')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', max(1, min(
+        (os.cpu_count() or 1) * 2 + 1,
+        (DB_MAX_CONNECTIONS - 1) // (SQLALCHEMY_ENGINE_OPTIONS['pool_size'] + SQLALCHEMY_ENGINE_OPTIONS['max_overflow']),
+    ))))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+
+    # Default and largest number of items returned by a list endpoint
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 100))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+
+    # Largest number of transactions accepted by one bulk request
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 10000))
+
+    # Largest number of buckets returned by the usage endpoint
+    USAGE_MAX_BUCKETS = int(os.environ.get('USAGE_MAX_BUCKETS', 1000))
+
+    # Responses of these types larger than COMPRESS_MIN_SIZE bytes are compressed,
+    # at a level between 1 and 9 that suits both gzip and brotli
+    COMPRESS_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+    # Cache of rendered budget views, an LRU of at most CACHE_MAX_BYTES per worker (0 turns
+    # it off), or Redis shared by the workers when CACHE_REDIS_URL is set
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+
+    # Requests running one statement this many times are logged as likely N+1 queries
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+
+    # Requests with this token in an X-Profile header are answered with their profile, unset turns profiling off
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+
+    # Rows fetched from the database cursor at a time while exporting
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+    # Records inserted per database transaction while importing
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
@@ -1,11 +1,15 @@
 """
 Author: Orion Hess
 Created: 2025-12-03
-Updated: 2025-12-03
+Updated: 2026-10-17
 
 Database setup for the time budgeting application.
 """
 
+import os
+
+from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+migrate = Migrate(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations'))
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Idempotency keys, so a client can send a create again when it does not know whether it was applied
+
+A client that lost the response to a create, to a timeout or a dropped connection, sends
+it again with the same key. The key of a create is stored in the transaction of the write,
+so it is stored exactly when the write is applied, and a create whose key is already
+stored is answered without being applied again. Edits and deletes need no key, applying
+one twice leaves the same result.
+
+Single creates take the key in an Idempotency-Key header, the items of the bulk
+transaction route in an idempotency_key field of their own.
+"""
+
+from functools import wraps
+
+from flask import jsonify, request
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+
+from app.database import db
+from app.models import AppliedWrite
+
+KEY_ERROR = 'Idempotency key must be a string of 1 to 64 characters.'
+
+
+def valid_key(key) -> bool:
+    return isinstance(key, str) and 0 < len(key) <= 64
+
+
+def applied_keys(keys) -> dict:
+    """Return the keys among these already applied, mapped to the id of the row each one created"""
+    keys = set(keys)
+    if not keys:
+        return {}
+    return dict(db.session.query(AppliedWrite.idempotency_key, AppliedWrite.record_id)
+                .filter(AppliedWrite.idempotency_key.in_(keys)))
+
+
+def _already_applied(model, applied):
+    """Answer a create sent again with the row it created, while that row still exists"""
+    row = db.session.get(model, applied.record_id) if applied.record_id is not None else None
+    if row is None:
+        return jsonify({'message': 'Already applied.'}), 200
+    return jsonify(row.to_dict()), 200
+
+
+def idempotent(model):
+    """
+    Apply a create once per Idempotency-Key, a key already applied is answered 200 without running the view
+    :param model: Model of the row the view creates, returned again to a create sent again
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if key is None:
+                return view(*args, **kwargs)
+            if not valid_key(key):
+                return jsonify({'error': KEY_ERROR}), 400
+            applied = db.session.get(AppliedWrite, key)
+            if applied is not None:
+                return _already_applied(model, applied)
+
+            # Stored by the view's commit, see _store_applied_write, a view that refuses the write commits nothing
+            db.session.info['idempotency'] = {'key': key, 'model': model, 'record_id': None}
+            try:
+                return view(*args, **kwargs)
+            except IntegrityError:
+                # Sent again while the first was still running, only one of them commits its key
+                db.session.rollback()
+                applied = db.session.get(AppliedWrite, key)
+                if applied is None:
+                    raise
+                return _already_applied(model, applied)
+            finally:
+                db.session.info.pop('idempotency', None)
+        return wrapper
+    return decorator
+
+
+@event.listens_for(db.session, 'after_flush')
+def _find_created_row(session, flush_context):
+    """Note the id of the first row of the idempotent view's model that a flush inserts"""
+    idempotency = session.info.get('idempotency')
+    if idempotency is None or idempotency['record_id'] is not None:
+        return
+    mapper = inspect(idempotency['model'])
+    for row in session.new:
+        if isinstance(row, idempotency['model']):
+            idempotency['record_id'] = mapper.primary_key_from_instance(row)[0]
+            return
+
+
+@event.listens_for(db.session, 'before_commit')
+def _store_applied_write(session):
+    """Store the key of an idempotent create in the transaction that applies it, with the id of the row created"""
+    if 'idempotency' not in session.info:
+        return
+    # The created row may still be pending, its id is known once flushed
+    session.flush()
+    idempotency = session.info.pop('idempotency')
+    session.add(AppliedWrite(idempotency_key=idempotency['key'], record_id=idempotency['record_id']))
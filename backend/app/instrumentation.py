@@ -0,0 +1,194 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Request timing, SQL instrumentation and profiling
+
+Every request records its wall time and, through engine events, the time spent in the
+database, the number of queries and the rows they reported. The totals are sent back in
+a Server-Timing header and aggregated per endpoint into histograms served on /metrics,
+in the Prometheus text format. Metrics are per worker process.
+
+A request that runs the same statement N_PLUS_ONE_THRESHOLD times or more is logged as a
+likely N+1 query pattern and counted.
+
+When PROFILE_TOKEN is set, a request with an X-Profile header holding that token is
+profiled, and answered with the profile instead of its response. pyinstrument, a sampling
+profiler, is used when it is installed, cProfile otherwise.
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app.database import db
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+# Upper bounds in seconds of the histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative histogram of durations, as Prometheus expects them"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        lines, total = [], 0
+        for bound, count in zip(BUCKETS + ('+Inf',), self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {total}')
+        return lines
+
+
+class Metrics:
+    """Request metrics aggregated per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.queries = Counter()
+        self.rows = Counter()
+        self.n_plus_one = Counter()
+        self.durations = {}
+        self.db_durations = {}
+
+    def record(self, endpoint: str, status: int, duration: float, db_duration: float,
+               queries: int, rows: int, n_plus_one: bool) -> None:
+        with self.lock:
+            self.requests[endpoint, status] += 1
+            self.queries[endpoint] += queries
+            self.rows[endpoint] += rows
+            self.n_plus_one[endpoint] += n_plus_one
+            self.durations.setdefault(endpoint, Histogram()).observe(duration)
+            self.db_durations.setdefault(endpoint, Histogram()).observe(db_duration)
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text format"""
+        with self.lock:
+            lines = ['# TYPE http_requests_total counter']
+            lines += [f'http_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+                      for (endpoint, status), count in sorted(self.requests.items())]
+            for name, histograms in (('http_request_duration_seconds', self.durations),
+                                     ('db_duration_seconds', self.db_durations)):
+                lines.append(f'# TYPE {name} histogram')
+                for endpoint, histogram in sorted(histograms.items()):
+                    lines += histogram.lines(name, f'endpoint="{endpoint}"')
+            for name, counter in (('db_queries_total', self.queries), ('db_rows_total', self.rows),
+                                  ('db_n_plus_one_total', self.n_plus_one)):
+                lines.append(f'# TYPE {name} counter')
+                lines += [f'{name}{{endpoint="{endpoint}"}} {count}' for endpoint, count in sorted(counter.items())]
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or 'request_start' not in g:
+        return
+    g.db_duration += time.perf_counter() - context._query_start
+    # An executemany, or a batched insert, runs its statement once per batch of rows.
+    # Counted once, it is a single statement of the route however many rows it writes.
+    if not (executemany and getattr(context, '_counted', False)):
+        g.statements[statement] += 1
+    context._counted = True
+    # Drivers report the rows of a select only if they know them, psycopg2 does and sqlite3 does not
+    if cursor.rowcount > 0:
+        g.db_rows += cursor.rowcount
+
+
+def start_request():
+    g.request_start = time.perf_counter()
+    g.db_duration = 0.0
+    g.db_rows = 0
+    g.statements = Counter()
+
+    token = current_app.config['PROFILE_TOKEN']
+    if token and request.headers.get('X-Profile') == token:
+        if Profiler:
+            g.profiler = Profiler()
+            g.profiler.start()
+        else:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+
+def finish_request(response):
+    if 'request_start' not in g:
+        return response
+    duration = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unknown'
+
+    repeated = [(statement, count) for statement, count in g.statements.items()
+                if count >= current_app.config['N_PLUS_ONE_THRESHOLD']]
+    for statement, count in repeated:
+        current_app.logger.warning("Likely N+1 queries in %s, ran %d times: %s", endpoint, count, statement)
+
+    queries = sum(g.statements.values())
+    current_app.extensions['metrics'].record(endpoint, response.status_code, duration, g.db_duration,
+                                             queries, g.db_rows, bool(repeated))
+    response.headers['Server-Timing'] = (f'app;dur={duration * 1000:.1f}, '
+                                         f'db;dur={g.db_duration * 1000:.1f};desc="{queries} queries"')
+
+    if 'profiler' in g:
+        return _profile_response(g.pop('profiler'))
+    return response
+
+
+def _profile_response(profiler):
+    """Replace the response of a profiled request with its profile"""
+    if Profiler:
+        profiler.stop()
+        return current_app.response_class(profiler.output_html(), mimetype='text/html')
+    profiler.disable()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(50)
+    return current_app.response_class(output.getvalue(), mimetype='text/plain')
+
+
+def render_metrics() -> str:
+    """Return the request metrics of this process, and the counters of the read cache if there is one"""
+    text = current_app.extensions['metrics'].render()
+    read_cache = current_app.extensions.get('read_cache')
+    if read_cache is not None:
+        stats = read_cache.stats()
+        text += '# TYPE read_cache_events_total counter\n'
+        text += ''.join(f'read_cache_events_total{{event="{name}"}} {stats[name]}\n'
+                        for name in ('hits', 'misses', 'evictions'))
+        text += f"# TYPE read_cache_bytes gauge\nread_cache_bytes {stats['bytes']}\n"
+    return text
+
+
+def init_app(app):
+    """Instrument an application, this has to come before other request hooks so it times them too"""
+    app.extensions['metrics'] = Metrics()
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,107 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Conditional GET and response compression for every route
+
+Views under a budget get a weak ETag built from the budget's revision, which every
+write to the budget bumps. A request whose If-None-Match holds the current tag is
+answered 304 before its view runs, so an unchanged view costs one primary key lookup.
+Other views get a weak ETag hashed from their body, and are still answered 304 when
+it matches, though only after rendering.
+
+Responses above COMPRESS_MIN_SIZE are compressed with brotli, when it is installed,
+or gzip, whichever the client prefers in Accept-Encoding.
+"""
+
+import gzip
+import hashlib
+
+from flask import current_app, g, request
+from sqlalchemy import select
+
+from app.database import db
+from app.models import Budget
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def unversioned(view):
+    """Mark a view whose response can change without a write to its budget, so its ETag is hashed from its body"""
+    view.unversioned = True
+    return view
+
+
+def _budget_etag():
+    """Return the revision ETag of the current request, or None if its view is not versioned by a budget"""
+    budget_id = (request.view_args or {}).get('budget_id')
+    view = current_app.view_functions.get(request.endpoint)
+    if budget_id is None or getattr(view, 'unversioned', False):
+        return None
+    revision = db.session.execute(
+        select(Budget.revision).where(Budget.budget_id == budget_id, Budget.user_id == request.view_args['user_id'])
+    ).scalar()
+    if revision is None:
+        return None
+    return f"b{budget_id}.{revision}"
+
+
+def check_etag():
+    """Answer 304 when the client already has the current revision of a budget view"""
+    if request.method != 'GET':
+        return None
+    # Read before the view runs: a write landing in between makes the tag older than the
+    # body, which only costs the client one more full response later, never a stale one
+    g.budget_etag = _budget_etag()
+    if g.budget_etag is not None and request.if_none_match.contains_weak(g.budget_etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(g.budget_etag, weak=True)
+        return response
+    return None
+
+
+def add_etag(response):
+    """Tag successful GET responses, replacing them with a 304 when the client has the same tag"""
+    if request.method != 'GET' or response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return response
+    etag = g.get('budget_etag') or hashlib.sha1(response.get_data()).hexdigest()
+    # Weak, the same tag stands for the compressed and the plain body
+    response.set_etag(etag, weak=True)
+    return response.make_conditional(request)
+
+
+def compress(response):
+    """Compress the body when the client accepts it and it is large enough to be worth it"""
+    if response.mimetype not in current_app.config['COMPRESS_MIMETYPES']:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.content_length is None or response.content_length < current_app.config['COMPRESS_MIN_SIZE']):
+        return response
+
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding == 'br':
+        response.set_data(brotli.compress(response.get_data(), quality=current_app.config['COMPRESS_LEVEL']))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(response.get_data(), compresslevel=current_app.config['COMPRESS_LEVEL']))
+    else:
+        return response
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """Register the middleware on an application"""
+    app.before_request(check_etag)
+
+    @app.after_request
+    def after_request(response):
+        # Tag before compressing, make_conditional needs the plain body
+        return compress(add_etag(response))
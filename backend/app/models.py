@@ -1,12 +1,15 @@
 """
 Author: Orion Hess
 Created: 2025-12-03
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 Database models for the time budgeting application.
 """
 
+from datetime import timedelta
 from app.database import db
+from sqlalchemy import event, inspect, update
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.sql import func
 
 class User(db.Model):
@@ -25,6 +28,11 @@ class User(db.Model):
             'created_at': self.created_at.isoformat(),
         }
 
+    @classmethod
+    def columns(cls):
+        """Columns of to_dict, for list routes that select rows instead of loading models"""
+        return cls.user_id, cls.username, cls.email, cls.created_at
+
 class Device(db.Model):
     __tablename__ = 'device'
 
@@ -42,23 +50,57 @@ class Budget(db.Model):
 
     budget_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     budget_name = db.Column(db.String(80), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.user_id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.user_id', ondelete='CASCADE'), nullable=False, index=True)
+    time_used = db.Column(db.Interval, nullable=False, default=timedelta(0), server_default='0')
+    # Counts the writes to the budget and everything in it, the ETags of its views are built from it
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def to_dict(self):
         return {
             'budget_id': self.budget_id,
             'budget_name': self.budget_name,
             'user_id': self.user_id,
+            'time_used': self.time_used.total_seconds(),
         }
 
+    @classmethod
+    def columns(cls):
+        """Columns of to_dict, for list routes that select rows instead of loading models"""
+        return cls.budget_id, cls.budget_name, cls.user_id, cls.time_used
+
+    @classmethod
+    def bump_revision(cls, *budget_ids):
+        """
+        Mark budgets as changed, so clients holding the ETag of one of their views get it again.
+        Every write to a budget, its groups, categories or transactions calls this before flushing them,
+        a budget is bumped once per database transaction however many of its rows the transaction writes.
+        :param budget_ids: Budgets written to
+        :return: Dictionary mapping each budget id to its new revision, which the rows written are stamped with
+        """
+        revisions = db.session.info.setdefault('budget_revisions', {})
+        bumped = [budget_id for budget_id in budget_ids if budget_id not in revisions]
+        if bumped:
+            # Not flushing first, the rows pending in the session are stamped with the new revision when flushed
+            with db.session.no_autoflush:
+                revisions.update(db.session.execute(
+                    update(cls).where(cls.budget_id.in_(bumped)).values(revision=cls.revision + 1)
+                    .returning(cls.budget_id, cls.revision)).all())
+            # Their cached views are dropped once the write commits, see app.cache
+            db.session.info.setdefault('written_budgets', set()).update(bumped)
+        return {budget_id: revisions[budget_id] for budget_id in budget_ids}
+
 class Category(db.Model):
     __tablename__ = 'category'
 
     category_id    = db.Column(db.Integer, primary_key=True, autoincrement=True)
     category_name  = db.Column(db.String(80), nullable=False)
     time_allocated = db.Column(db.Interval, nullable=False)
-    budget_id      = db.Column(db.Integer, db.ForeignKey('budget.budget_id', ondelete='CASCADE'), nullable=False)
-    group_id       = db.Column(db.Integer, db.ForeignKey('group.group_id'), nullable=True)
+    budget_id      = db.Column(db.Integer, db.ForeignKey('budget.budget_id', ondelete='CASCADE'), nullable=False, index=True)
+    group_id       = db.Column(db.Integer, db.ForeignKey('group.group_id'), nullable=True, index=True)
+    # Running total of the periods of this category's transactions
+    time_used      = db.Column(db.Interval, nullable=False, default=timedelta(0), server_default='0')
+    # Revision of the budget when the row was last written, see _stamp_revisions
+    revision       = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def to_dict(self):
         return {
@@ -69,37 +111,74 @@ class Category(db.Model):
             'group_id': self.group_id,
         }
 
-    def to_dict_with_transactions(self):
-        transactions = Transaction.query.filter_by(category_id=self.category_id).all()
-
-        total_seconds = sum(t.period.total_seconds() for t in transactions)
-
+    def to_dict_with_time_used(self):
         return_dict = self.to_dict()
-        return_dict['time_used'] = total_seconds
+        return_dict['time_used'] = self.time_used.total_seconds()
         return return_dict
 
+    @classmethod
+    def columns(cls, time_used=False):
+        """Columns of to_dict, or of to_dict_with_time_used, for list routes that select rows instead of loading models"""
+        columns = (cls.category_id, cls.category_name, cls.time_allocated, cls.budget_id, cls.group_id)
+        return columns + (cls.time_used,) if time_used else columns
+
+    def owner_budget_id(self):
+        return self.budget_id
+
+    def add_time_used(self, delta):
+        """
+        Add to the running time used of this category, its group and its budget
+
+        The group and budget rows are locked so concurrent writers cannot lose updates,
+        callers should have loaded this category with FOR UPDATE for the same reason.
+        :param delta: Interval to add, negative to subtract
+        """
+        self.time_used += delta
+        if self.group_id is not None:
+            group = Group.query.filter(Group.group_id == self.group_id).with_for_update().one()
+            group.time_used += delta
+        budget = Budget.query.filter(Budget.budget_id == self.budget_id).with_for_update().one()
+        budget.time_used += delta
+
 class Group(db.Model):
     __tablename__ = 'group'
 
     group_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     group_name = db.Column(db.String(80), nullable=False)
-    budget_id = db.Column(db.Integer, db.ForeignKey('budget.budget_id', ondelete='CASCADE' ), nullable=False)
+    budget_id = db.Column(db.Integer, db.ForeignKey('budget.budget_id', ondelete='CASCADE' ), nullable=False, index=True)
+    time_used = db.Column(db.Interval, nullable=False, default=timedelta(0), server_default='0')
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def to_dict(self):
         return {
             'group_id': self.group_id,
             'group_name': self.group_name,
             'budget_id': self.budget_id,
+            'time_used': self.time_used.total_seconds(),
         }
 
+    @classmethod
+    def columns(cls):
+        """Columns of to_dict, for list routes that select rows instead of loading models"""
+        return cls.group_id, cls.group_name, cls.budget_id, cls.time_used
+
+    def owner_budget_id(self):
+        return self.budget_id
+
 class Transaction(db.Model):
     __tablename__ = 'transaction'
+    # Also serves lookups by category_id alone, so that column has no index of its own
+    __table_args__ = (db.Index('ix_transaction_category_id_date_time', 'category_id', 'date_time'),
+                      db.Index('ix_transaction_category_id_revision', 'category_id', 'revision'))
+    # Fetch date_time with RETURNING on insert, the daily usage rollup is keyed by its day
+    __mapper_args__ = {'eager_defaults': True}
 
     transaction_id   = db.Column(db.Integer, primary_key=True, autoincrement=True)
     transaction_name = db.Column(db.String(80), nullable=False)
     period           = db.Column(db.Interval, nullable=False)
-    date_time        = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    date_time        = db.Column(db.DateTime, server_default=func.now(), nullable=False, index=True)
     category_id      = db.Column(db.Integer, db.ForeignKey('category.category_id', ondelete='CASCADE'), nullable=False)
+    revision         = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def to_dict(self):
         return {
@@ -109,11 +188,135 @@ class Transaction(db.Model):
             'date_time': self.date_time,
         }
 
+    @classmethod
+    def columns(cls):
+        """Columns of to_dict, for list routes that select rows instead of loading models"""
+        return cls.transaction_id, cls.transaction_name, cls.period, cls.date_time
+
+    def owner_budget_id(self):
+        # Its category is loaded by the routes writing it
+        return db.session.get(Category, self.category_id).budget_id
+
+class CategoryDailyUsage(db.Model):
+    """Time used per category per day, kept up to date by the transaction routes"""
+    __tablename__ = 'category_daily_usage'
+
+    category_id = db.Column(db.Integer, db.ForeignKey('category.category_id', ondelete='CASCADE'), primary_key=True)
+    day         = db.Column(db.Date, primary_key=True)
+    time_used   = db.Column(db.Interval, nullable=False)
+
+    @classmethod
+    def add(cls, deltas):
+        """
+        Add to the time used of categories on days, creating the rows that do not exist yet
+        :param deltas: Dictionary mapping (category_id, day) to the interval to add, negative to subtract
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        rows = [{'category_id': category_id, 'day': day, 'time_used': delta}
+                for (category_id, day), delta in sorted(deltas.items())]
+
+        if db.engine.dialect.name == 'postgresql':
+            # Upsert in one statement, conflicting rows are locked and added to atomically
+            statement = postgresql.insert(cls)
+            statement = statement.on_conflict_do_update(
+                index_elements=[cls.category_id, cls.day],
+                set_={'time_used': cls.time_used + statement.excluded.time_used},
+            )
+            db.session.execute(statement, rows)
+            return
+
+        # SQLite serializes writers and cannot add its emulated intervals in SQL
+        for row in rows:
+            usage = db.session.get(cls, (row['category_id'], row['day']))
+            if usage is None:
+                db.session.add(cls(**row))
+            else:
+                usage.time_used += row['time_used']
+
+class DeletedRow(db.Model):
+    """Tombstone of a deleted group, category or transaction, so clients syncing changes can drop it too"""
+    __tablename__ = 'deleted_row'
+    __table_args__ = (db.Index('ix_deleted_row_budget_id_revision', 'budget_id', 'revision'),)
+
+    deleted_row_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    budget_id      = db.Column(db.Integer, db.ForeignKey('budget.budget_id', ondelete='CASCADE'), nullable=False)
+    record_type    = db.Column(db.String(16), nullable=False)
+    record_id      = db.Column(db.Integer, nullable=False)
+    revision       = db.Column(db.Integer, nullable=False)
+
+# Rows stamped with the revision of their budget when written
+VERSIONED = (Group, Category, Transaction)
+
+@event.listens_for(db.session, 'before_flush')
+def _stamp_revisions(session, flush_context, instances):
+    """
+    Stamp the groups, categories and transactions a flush writes with the revision of their budget,
+    and leave a tombstone for each one it deletes, so the changes route can tell what changed since a revision.
+    Budgets not bumped yet in this transaction are bumped here.
+    """
+    written = [row for row in session.new if isinstance(row, VERSIONED)] + \
+              [row for row in session.dirty if isinstance(row, VERSIONED) and session.is_modified(row)]
+    deleted = [row for row in session.deleted if isinstance(row, VERSIONED)]
+    if not written and not deleted:
+        return
+    with session.no_autoflush:
+        owners = {row: row.owner_budget_id() for row in written + deleted}
+    revisions = Budget.bump_revision(*set(owners.values()))
+    for row in written:
+        row.revision = revisions[owners[row]]
+    for row in deleted:
+        session.add(DeletedRow(budget_id=owners[row], record_type=row.__tablename__,
+                               record_id=inspect(row).identity[0], revision=revisions[owners[row]]))
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _forget_revisions(session):
+    session.info.pop('budget_revisions', None)
+
+class ImportJob(db.Model):
+    """Progress of an import, so an interrupted import can resume after its last committed chunk"""
+    __tablename__ = 'import_job'
+
+    job_id       = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # The user created by the import, once its user record has been read
+    user_id      = db.Column(db.Integer, db.ForeignKey('user.user_id', ondelete='SET NULL'), nullable=True)
+    records_done = db.Column(db.Integer, nullable=False, default=0)
+    finished     = db.Column(db.Boolean, nullable=False, default=False)
+    created_at   = db.Column(db.DateTime, nullable=False, server_default=func.now())
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'user_id': self.user_id,
+            'records_done': self.records_done,
+            'finished': self.finished,
+        }
+
+class ImportIdMap(db.Model):
+    """Id given to each imported record, by its id in the import, while its import runs"""
+    __tablename__ = 'import_id_map'
+
+    job_id      = db.Column(db.Integer, db.ForeignKey('import_job.job_id', ondelete='CASCADE'), primary_key=True)
+    record_type = db.Column(db.String(16), primary_key=True)
+    old_id      = db.Column(db.Integer, primary_key=True)
+    new_id      = db.Column(db.Integer, nullable=False)
+
+class AppliedWrite(db.Model):
+    """Idempotency key of a create the server applied, so the same write sent again is not applied twice"""
+    __tablename__ = 'applied_write'
+
+    idempotency_key = db.Column(db.String(64), primary_key=True)
+    # Id of the row created, where the route reports it
+    record_id       = db.Column(db.Integer)
+    created_at      = db.Column(db.DateTime, nullable=False, server_default=func.now(), index=True)
+
 class Authorizes(db.Model):
     __tablename__ = 'authorizes'
 
     authorizer_id = db.Column(db.Integer, db.ForeignKey('user.user_id', ondelete="CASCADE"), primary_key=True, nullable=False)
-    authorized_id = db.Column(db.Integer, db.ForeignKey('user.user_id', ondelete="CASCADE"), primary_key=True, nullable=False)
+    authorized_id = db.Column(db.Integer, db.ForeignKey('user.user_id', ondelete="CASCADE"), primary_key=True, nullable=False, index=True)
 
     def to_dict(self):
         return {
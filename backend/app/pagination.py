@@ -0,0 +1,68 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Keyset pagination for list endpoints
+
+Lists are ordered by primary key and paged with ?limit=&after=, where after is the
+last key of the previous page. The url of the next page is sent in a Link header,
+so list responses stay plain json arrays.
+"""
+
+from flask import current_app, jsonify, request, url_for
+
+PAGE_ERROR = 'limit must be a positive integer and after must be an integer.'
+
+
+def get_page():
+    """
+    Read the pagination arguments of the current request
+    :return: Tuple of limit and after, or None if they are invalid
+    """
+    try:
+        limit = int(request.args.get('limit', current_app.config['PAGE_SIZE']))
+        after = request.args.get('after')
+        after = int(after) if after is not None else None
+    except ValueError:
+        return None
+    if limit < 1:
+        return None
+    return min(limit, current_app.config['MAX_PAGE_SIZE']), after
+
+
+def paginate(query, key, page, descending=False):
+    """
+    Fetch one page of a query
+    :param query: Query to page through, it must not be ordered yet
+    :param key: Unique column to order and page by
+    :param page: Tuple of limit and after from get_page
+    :param descending: Page from the highest key down
+    :return: Tuple of the rows in the page and the cursor of the next page, or None if it is the last
+    """
+    limit, after = page
+    if after is not None:
+        query = query.filter(key < after if descending else key > after)
+    query = query.order_by(key.desc() if descending else key)
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, getattr(rows[-1], key.key)
+
+
+def page_response(items, next_cursor):
+    """
+    Build the json response for a page, linking the next page if there is one
+    :param items: Serialized items of the page, or a document holding them
+    :param next_cursor: Cursor returned by paginate
+    """
+    response = jsonify(items)
+    if next_cursor is not None:
+        args = request.args.to_dict()
+        args['after'] = next_cursor
+        next_url = url_for(request.endpoint, **request.view_args, **args)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
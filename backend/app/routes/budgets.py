@@ -1,23 +1,43 @@
 """
 Author:  Orion Hess
 Created: 2025-12-09
-Edited:  2025-12-09
+Edited:  2026-10-17
 
 Routes for budget management
 """
 
-from flask import Blueprint, jsonify, request
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import cast, literal, null, select, union_all
+from app.analytics import BUCKETS, GROUP_BY, bucket_range, usage
+from app.cache import cached
 from app.database import db
-from app.models import Budget
+from app.idempotency import idempotent
+from app.middleware import unversioned
+from app.models import Budget, Category, DeletedRow, Group, Transaction
+from app.pagination import PAGE_ERROR, get_page, paginate, page_response
 
 budget_bp = Blueprint('budgets', __name__)
 
+# Kinds of the rows read for a snapshot, in the order they are returned
+BUDGET_ROW, GROUP_ROW, CATEGORY_ROW = 0, 1, 2
+
+# Table of a tombstone -> key of its ids in the changes of a budget
+DELETED_KEYS = {'group': 'groups', 'category': 'categories', 'transaction': 'transactions'}
+
 @budget_bp.get('')
 def get_budgets(user_id):
-    budgets = Budget.query.filter(Budget.user_id == user_id).all()
-    return jsonify([budget.to_dict() for budget in budgets]), 200
+    page = get_page()
+    if page is None:
+        return jsonify({'error': PAGE_ERROR}), 400
+
+    query = db.session.query(*Budget.columns()).filter(Budget.user_id == user_id)
+    budgets, next_cursor = paginate(query, Budget.budget_id, page)
+    return page_response([budget._asdict() for budget in budgets], next_cursor), 200
 
 @budget_bp.post('')
+@idempotent(Budget)
 def create_budget(user_id):
     data = request.get_json()
 
@@ -35,10 +55,160 @@ def create_budget(user_id):
     return jsonify(budget.to_dict()), 201
 
 @budget_bp.get('/<int:budget_id>')
+@cached
 def get_budget(user_id, budget_id):
     budget = Budget.query.get_or_404(budget_id)
     return jsonify(budget.to_dict()), 200
 
+@budget_bp.get('/<int:budget_id>/snapshot')
+@cached
+def get_budget_snapshot(user_id, budget_id):
+    """Get a budget with its groups and categories nested, including the time used of each"""
+    rows = _snapshot_rows(user_id, budget_id)
+    if not rows or rows[0].kind != BUDGET_ROW:
+        return jsonify({'error': 'Budget not found.'}), 404
+
+    budget, groups, categories = rows[0], [], []
+    for row in rows[1:]:
+        (groups if row.kind == GROUP_ROW else categories).append(row)
+
+    grouped = {group.id: [] for group in groups}
+    ungrouped = []
+    for category in categories:
+        grouped.get(category.parent_id, ungrouped).append({
+            'category_id': category.id,
+            'category_name': category.name,
+            'time_allocated': category.time_allocated.total_seconds(),
+            'budget_id': budget_id,
+            'group_id': category.parent_id,
+            'time_used': category.time_used.total_seconds(),
+        })
+
+    snapshot = {
+        'budget_id': budget.id,
+        'budget_name': budget.name,
+        'user_id': budget.parent_id,
+        'time_used': budget.time_used.total_seconds(),
+        'categories': ungrouped,
+        'groups': [{
+            'group_id': group.id,
+            'group_name': group.name,
+            'budget_id': budget_id,
+            'time_used': group.time_used.total_seconds(),
+            'categories': grouped[group.id],
+        } for group in groups],
+    }
+    return jsonify(snapshot), 200
+
+def _snapshot_rows(user_id, budget_id):
+    """
+    Read a budget, its groups and its categories in one query, as rows of one shape:
+    kind, id, name, parent_id (user of the budget, group of a category), time_allocated and time_used.
+    The budget's row comes first, then the groups and the categories, each in id order.
+    """
+    no_interval = cast(null(), db.Interval)
+    budget = select(literal(BUDGET_ROW).label('kind'), Budget.budget_id.label('id'), Budget.budget_name.label('name'),
+                    Budget.user_id.label('parent_id'), no_interval.label('time_allocated'), Budget.time_used) \
+        .where(Budget.budget_id == budget_id, Budget.user_id == user_id)
+    groups = select(literal(GROUP_ROW), Group.group_id, Group.group_name, null(), no_interval, Group.time_used) \
+        .where(Group.budget_id == budget_id)
+    categories = select(literal(CATEGORY_ROW), Category.category_id, Category.category_name, Category.group_id,
+                        Category.time_allocated, Category.time_used) \
+        .where(Category.budget_id == budget_id)
+    snapshot = union_all(budget, groups, categories)
+    return db.session.execute(snapshot.order_by(snapshot.selected_columns.kind, snapshot.selected_columns.id)).all()
+
+@budget_bp.get('/<int:budget_id>/changes')
+@cached
+def get_budget_changes(user_id, budget_id):
+    """
+    Get the groups, categories and transactions of a budget written since a revision, and the ids of those deleted
+
+    Takes ?since=<revision>, the revision of a previous response. Without it, or with a revision
+    the budget has not reached, every row is returned and full is true, so the client replaces its copy.
+    The transactions are paged with ?limit=&after= like the list routes, the next page linked in a Link
+    header. Later pages hold only transactions; a client keeps the revision and full of the first page.
+    """
+    since = request.args.get('since')
+    if since is not None and not since.isdigit():
+        return jsonify({'error': 'since must be a revision number.'}), 400
+    page = get_page()
+    if page is None:
+        return jsonify({'error': PAGE_ERROR}), 400
+    first_page = page[1] is None
+
+    budget = Budget.query.filter(Budget.budget_id == budget_id, Budget.user_id == user_id).first()
+    if not budget:
+        return jsonify({'error': 'Budget not found.'}), 404
+
+    # Read before the rows, a write landing in between is returned now and again next time, never missed
+    revision = budget.revision
+    full = since is None or int(since) > revision
+    since = -1 if full else int(since)
+
+    # The revision filter is fixed across the pages of a pull, so the transaction id alone orders them
+    transactions = db.session.query(*Transaction.columns(), Transaction.category_id) \
+        .join(Category, Category.category_id == Transaction.category_id) \
+        .filter(Category.budget_id == budget_id, Transaction.revision > since)
+    transactions, next_cursor = paginate(transactions, Transaction.transaction_id, page)
+
+    groups, categories = [], []
+    deleted = {'groups': [], 'categories': [], 'transactions': []}
+    if first_page:
+        groups = db.session.query(*Group.columns()) \
+            .filter(Group.budget_id == budget_id, Group.revision > since).order_by(Group.group_id).all()
+        categories = db.session.query(*Category.columns(time_used=True)) \
+            .filter(Category.budget_id == budget_id, Category.revision > since).order_by(Category.category_id).all()
+        if not full:
+            tombstones = db.session.query(DeletedRow.record_type, DeletedRow.record_id) \
+                .filter(DeletedRow.budget_id == budget_id, DeletedRow.revision > since)
+            for record_type, record_id in tombstones:
+                deleted[DELETED_KEYS[record_type]].append(record_id)
+
+    return page_response({
+        'revision': revision,
+        'full': full,
+        'budget': budget.to_dict(),
+        'groups': [group._asdict() for group in groups],
+        'categories': [category._asdict() for category in categories],
+        'transactions': [transaction._asdict() for transaction in transactions],
+        'deleted': deleted,
+    }, next_cursor), 200
+
+@budget_bp.get('/<int:budget_id>/usage')
+@unversioned
+def get_budget_usage(user_id, budget_id):
+    """
+    Get the time used per category or group, bucketed by day, week or month
+
+    Takes ?bucket=day|week|month (default week), ?group_by=category|group (default category)
+    and an ISO 8601 start (inclusive, default 90 days before end) and end (exclusive, default now).
+    """
+    bucket = request.args.get('bucket', 'week')
+    group_by = request.args.get('group_by', 'category')
+    if bucket not in BUCKETS or group_by not in GROUP_BY:
+        return jsonify({'error': f"bucket must be one of {', '.join(BUCKETS)} and group_by one of {', '.join(GROUP_BY)}."}), 400
+
+    try:
+        end = request.args.get('end')
+        end = datetime.fromisoformat(end) if end else datetime.now()
+        start = request.args.get('start')
+        start = datetime.fromisoformat(start) if start else end - timedelta(days=90)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 date times.'}), 400
+    if start.tzinfo is not None or end.tzinfo is not None:
+        return jsonify({'error': 'start and end must not have a time zone.'}), 400
+    if start >= end:
+        return jsonify({'error': 'start must be before end.'}), 400
+    if len(bucket_range(start, end, bucket)) > current_app.config['USAGE_MAX_BUCKETS']:
+        return jsonify({'error': 'Range has too many buckets, use a shorter range or a larger bucket.'}), 400
+
+    budget = Budget.query.filter(Budget.budget_id == budget_id, Budget.user_id == user_id).first()
+    if not budget:
+        return jsonify({'error': 'Budget not found.'}), 404
+
+    return jsonify(usage(budget_id, start, end, bucket, group_by)), 200
+
 @budget_bp.patch('/<int:budget_id>')
 def update_budget(user_id, budget_id):
     data = request.get_json()
@@ -50,6 +220,7 @@ def update_budget(user_id, budget_id):
         return jsonify({'error': 'Budget not found.'}), 404
 
     budget.budget_name = data.get('budget_name')
+    Budget.bump_revision(budget.budget_id)
 
     db.session.commit()
 
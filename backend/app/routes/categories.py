@@ -1,29 +1,35 @@
 """
 Author:  Orion Hess
 Created: 2025-12-09
-Edited:  2025-12-11
+Edited:  2026-10-17
 
 Routes for category management
 """
 
 from flask import Blueprint, jsonify, request
+from app.cache import cached
 from app.database import db
-from app.models import Category
+from app.idempotency import idempotent
+from app.models import Budget, Category
+from app.pagination import PAGE_ERROR, get_page, paginate, page_response
 from datetime import timedelta
 
 category_bp = Blueprint('categories', __name__)
 
 @category_bp.get('')
+@cached
 def get_categories(user_id, budget_id):
+    page = get_page()
+    if page is None:
+        return jsonify({'error': PAGE_ERROR}), 400
+
     detailed = request.args.get('detailed', 'false').lower() == 'true'
-    categories = Category.query.filter(Category.budget_id == budget_id).all()
-    if detailed:
-        print("called detailed")
-        return jsonify([category.to_dict_with_transactions() for category in categories]), 200
-    else:
-        return jsonify([category.to_dict() for category in categories]), 200
+    query = db.session.query(*Category.columns(time_used=detailed)).filter(Category.budget_id == budget_id)
+    categories, next_cursor = paginate(query, Category.category_id, page)
+    return page_response([category._asdict() for category in categories], next_cursor), 200
 
 @category_bp.post('')
+@idempotent(Category)
 def create_category(user_id, budget_id):
     data = request.get_json()
 
@@ -38,11 +44,13 @@ def create_category(user_id, budget_id):
     )
 
     db.session.add(category)
+    Budget.bump_revision(budget_id)
     db.session.commit()
 
     return jsonify(category.to_dict()), 201
 
 @category_bp.get('/<int:category_id>')
+@cached
 def get_category(user_id, budget_id, category_id):
     category = Category.query.get_or_404(category_id)
     return jsonify(category.to_dict()), 200
@@ -53,12 +61,14 @@ def update_category(user_id, budget_id, category_id):
     if not data or not data.get("category_name") or not data.get("time_allocated"):
         return jsonify({'error': 'Category name and time allocated are required'}), 400
 
-    category = Category.query.filter(Category.category_id == category_id).first()
+    category = Category.query.filter(Category.category_id == category_id).with_for_update().first()
     if category is None:
         return jsonify({'error': 'Category not found'}), 404
 
+    # Locked before its budget, the order every write to a category takes
+    Budget.bump_revision(category.budget_id)
     category.category_name = data.get("category_name")
-    category.time_allocated = timedelta(data.get("time_allocated"))
+    category.time_allocated = timedelta(seconds=data.get("time_allocated"))
 
     db.session.commit()
 
@@ -66,11 +76,15 @@ def update_category(user_id, budget_id, category_id):
 
 @category_bp.delete('/<int:category_id>')
 def delete_category(user_id, budget_id, category_id):
-    category = Category.query.filter(Category.category_id == category_id).first()
+    category = Category.query.filter(Category.category_id == category_id).with_for_update().first()
 
     if category is None:
         return jsonify({'error': 'Category not found'}), 404
 
+    Budget.bump_revision(category.budget_id)
+    # Its transactions are removed by the cascade, take their time off the group and budget
+    category.add_time_used(-category.time_used)
+
     db.session.delete(category)
     db.session.commit()
 
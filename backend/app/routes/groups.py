@@ -1,23 +1,37 @@
 """
 Author:  Orion Hess
 Created: 2025-12-09
-Edited:  2025-12-09
+Edited:  2026-10-17
 
 Routes for group management
 """
 
 from flask import Blueprint, jsonify, request
+from app.cache import cached
 from app.database import db
-from app.models import Group, Category
+from app.idempotency import idempotent
+from app.models import Budget, Group, Category
+from app.pagination import PAGE_ERROR, get_page, paginate, page_response
 
 group_bp = Blueprint('groups', __name__)
 
+def _lock_group(group_id):
+    """The group read again FOR UPDATE, None if a write committed since the first read deleted it"""
+    return Group.query.filter(Group.group_id == group_id).with_for_update().populate_existing().first()
+
 @group_bp.get('')
+@cached
 def get_groups(user_id, budget_id):
-    groups = Group.query.filter(Group.budget_id == budget_id).all()
-    return jsonify([group.to_dict() for group in groups]), 200
+    page = get_page()
+    if page is None:
+        return jsonify({'error': PAGE_ERROR}), 400
+
+    query = db.session.query(*Group.columns()).filter(Group.budget_id == budget_id)
+    groups, next_cursor = paginate(query, Group.group_id, page)
+    return page_response([group._asdict() for group in groups], next_cursor), 200
 
 @group_bp.post('')
+@idempotent(Group)
 def create_group(user_id, budget_id):
     data = request.get_json()
 
@@ -30,11 +44,13 @@ def create_group(user_id, budget_id):
     )
 
     db.session.add(group)
+    Budget.bump_revision(budget_id)
     db.session.commit()
 
     return jsonify(group.to_dict()), 201
 
 @group_bp.get('/<int:group_id>')
+@cached
 def get_group(user_id, budget_id, group_id):
     group = Group.query.get_or_404(group_id)
     return jsonify(group.to_dict()), 200
@@ -49,6 +65,11 @@ def update_group(user_id, budget_id, group_id):
     if group is None:
         return jsonify({'error': 'Group not found.'}), 404
 
+    # Locked after its budget, the order transaction writes take, see Category.add_time_used
+    Budget.bump_revision(group.budget_id)
+    group = _lock_group(group_id)
+    if group is None:
+        return jsonify({'error': 'Group not found.'}), 404
     group.group_name = data.get('group_name')
 
     db.session.commit()
@@ -62,16 +83,24 @@ def delete_group(user_id, budget_id, group_id):
     if group is None:
         return jsonify({'error': 'Group not found.'}), 404
 
+    Budget.bump_revision(group.budget_id)
+    group = _lock_group(group_id)
+    if group is None:
+        return jsonify({'error': 'Group not found.'}), 404
     db.session.delete(group)
     db.session.commit()
 
     return jsonify({'message': 'Group deleted.'}), 200
 
 @group_bp.get('/<int:group_id>/categories')
+@cached
 def get_group_categories(user_id, budget_id, group_id):
+    page = get_page()
+    if page is None:
+        return jsonify({'error': PAGE_ERROR}), 400
+
     detailed = request.args.get('detailed', 'false').lower() == 'true'
-    categories = Category.query.filter(Category.budget_id == budget_id, Category.group_id == group_id).all()
-    if detailed:
-        return jsonify([category.to_dict_with_transactions() for category in categories]), 200
-    else:
-        return jsonify([category.to_dict() for category in categories]), 200
\ No newline at end of file
+    query = db.session.query(*Category.columns(time_used=detailed)) \
+        .filter(Category.budget_id == budget_id, Category.group_id == group_id)
+    categories, next_cursor = paginate(query, Category.category_id, page)
+    return page_response([category._asdict() for category in categories], next_cursor), 200
\ No newline at end of file
@@ -1,44 +1,247 @@
 """
 Author:  Orion Hess
 Created: 2025-12-09
-Edited:  2025-12-11
+Edited:  2026-10-17
 
 Routes for transaction management
 """
 
-from flask import Blueprint, jsonify, request
+import json
+import math
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func, insert, select
 from app.database import db
-from app.models import Transaction
-from datetime import timedelta
+from app.idempotency import KEY_ERROR, applied_keys, idempotent, valid_key
+from app.models import AppliedWrite, Budget, Category, CategoryDailyUsage, Group, Transaction
+from app.pagination import PAGE_ERROR, get_page, paginate, page_response
+from datetime import datetime, timedelta
 
 transaction_bp = Blueprint('transactions', __name__)
 
+# Longest period one transaction may log, or take off when negative
+MAX_PERIOD = timedelta(days=366)
+PERIOD_ERROR = f"Period must be a number of seconds, at most {MAX_PERIOD.total_seconds():.0f} either way."
+
+
+def parse_period(value):
+    """
+    Read the period of a transaction from a json body
+    :param value: Number of seconds
+    :return: The period, or None if it is not a finite number within MAX_PERIOD
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    if abs(value) > MAX_PERIOD.total_seconds():
+        return None
+    return timedelta(seconds=value)
+
 
 @transaction_bp.get('')
 def get_transactions(user_id, budget_id, category_id):
-    transactions = Transaction.query.filter(Transaction.category_id == category_id).all()
-    return jsonify([transaction.to_dict() for transaction in transactions]), 200
+    page = get_page()
+    if page is None:
+        return jsonify({'error': PAGE_ERROR}), 400
+
+    # Optional date_time range, start inclusive and end exclusive
+    try:
+        start = request.args.get('start')
+        start = datetime.fromisoformat(start) if start else None
+        end = request.args.get('end')
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 date times.'}), 400
+
+    query = db.session.query(*Transaction.columns()).filter(Transaction.category_id == category_id)
+    if start is not None:
+        query = query.filter(Transaction.date_time >= start)
+    if end is not None:
+        query = query.filter(Transaction.date_time < end)
+
+    transactions, next_cursor = paginate(query, Transaction.transaction_id, page)
+    return page_response([transaction._asdict() for transaction in transactions], next_cursor), 200
 
 
 @transaction_bp.post('')
+@idempotent(Transaction)
 def create_transaction(user_id, budget_id, category_id):
     data = request.get_json()
 
     if not data.get('transaction_name') or not data.get('period'):
         return jsonify({'error': 'Transaction name and period are required.'}), 400
+    period = parse_period(data.get('period'))
+    if period is None:
+        return jsonify({'error': PERIOD_ERROR}), 400
 
+    category = Category.query.filter(Category.category_id == category_id).with_for_update().first()
+    if category is None:
+        return jsonify({'error': 'Category not found'}), 404
+
+    Budget.bump_revision(category.budget_id)
     transaction = Transaction(
         transaction_name=data.get('transaction_name'),
-        period=timedelta(seconds=data.get('period')),
+        period=period,
         category_id=category_id
     )
 
     db.session.add(transaction)
+    db.session.flush()
+    category.add_time_used(transaction.period)
+    CategoryDailyUsage.add({(category_id, transaction.date_time.date()): transaction.period})
     db.session.commit()
 
     return jsonify(transaction.to_dict()), 201
 
 
+@transaction_bp.post('/bulk')
+def create_transactions(user_id, budget_id, category_id):
+    """
+    Create many transactions at once, from a json array or an NDJSON body
+
+    Items may set category_id to log against another category of the same budget,
+    and date_time to log an entry after the fact. Valid items are inserted with
+    batched multi row inserts, invalid ones are reported without failing the rest.
+    Items may also set an idempotency_key, see app.idempotency, an item whose key was
+    applied before is reported with status 200 and the id of the transaction it logged.
+    """
+    limit = current_app.config['BULK_MAX_ITEMS']
+    too_many = jsonify({'error': f"At most {limit} transactions per request."}), 413
+    if request.mimetype == 'application/x-ndjson':
+        # Read a line at a time, and stop reading once there are too many
+        items = []
+        for line in request.stream:
+            if not line.strip():
+                continue
+            if len(items) == limit:
+                return too_many
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a json array or NDJSON of transactions.'}), 400
+        if len(items) > limit:
+            return too_many
+
+    # Lock every category written to, in id order like the single transaction routes
+    category_ids = {category_id}
+    category_ids.update(item['category_id'] for item in items
+                        if isinstance(item, dict) and type(item.get('category_id')) is int)
+    categories = {
+        category.category_id: category
+        for category in Category.query
+        .filter(Category.budget_id == budget_id, Category.category_id.in_(category_ids))
+        .order_by(Category.category_id)
+        .with_for_update()
+    }
+
+    # Looked up once the categories are locked, a request sent again waits for the first to commit
+    applied = applied_keys(item['idempotency_key'] for item in items
+                           if isinstance(item, dict) and valid_key(item.get('idempotency_key')))
+
+    results = [None] * len(items)
+    rows, indexes, keys = [], [], []
+    seen = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {'index': index, 'status': 400, 'error': 'Transaction must be a json object.'}
+            continue
+        key = item.get('idempotency_key')
+        if key is not None and (not valid_key(key) or key in seen):
+            results[index] = {'index': index, 'status': 400,
+                              'error': KEY_ERROR if not valid_key(key) else 'Idempotency key repeated in the request.'}
+            continue
+        if key in applied:
+            results[index] = {'index': index, 'status': 200, 'transaction_id': applied[key]}
+            continue
+        if not item.get('transaction_name') or not item.get('period'):
+            results[index] = {'index': index, 'status': 400, 'error': 'Transaction name and period are required.'}
+            continue
+        period = parse_period(item['period'])
+        if period is None:
+            results[index] = {'index': index, 'status': 400, 'error': PERIOD_ERROR}
+            continue
+        item_category_id = item.get('category_id', category_id)
+        # Not isinstance, true and false are ints that would match the categories with ids 1 and 0
+        if type(item_category_id) is not int:
+            results[index] = {'index': index, 'status': 400, 'error': 'category_id must be an integer.'}
+            continue
+        if item_category_id not in categories:
+            results[index] = {'index': index, 'status': 404, 'error': 'Category not found'}
+            continue
+        try:
+            date_time = datetime.fromisoformat(item['date_time']) if item.get('date_time') else None
+        except (TypeError, ValueError):
+            results[index] = {'index': index, 'status': 400, 'error': 'date_time must be an ISO 8601 date time.'}
+            continue
+
+        rows.append({
+            'transaction_name': item['transaction_name'],
+            'period': period,
+            'category_id': item_category_id,
+            'date_time': date_time,
+        })
+        indexes.append(index)
+        keys.append(key)
+        seen.add(key)
+
+    if rows:
+        # Lock the budget, then the groups of the categories in id order like the categories,
+        # add_time_used would otherwise lock the groups in the order of the items.
+        # Bumped before the insert to stamp the rows with the new revision, a value keeps the insert batched.
+        revision = Budget.bump_revision(budget_id)[budget_id]
+        group_ids = {categories[row['category_id']].group_id for row in rows} - {None}
+        Group.query.filter(Group.group_id.in_(group_ids)).order_by(Group.group_id).with_for_update().all()
+
+        time_used = {}
+        for row in rows:
+            time_used[row['category_id']] = time_used.get(row['category_id'], timedelta(0)) + row['period']
+        for item_category_id in sorted(time_used):
+            categories[item_category_id].add_time_used(time_used[item_category_id])
+
+        # Rows without a date_time get the database's time, like the server side default of single inserts.
+        # Filled in here, an SQL default in the insert would make it one statement per row.
+        now = None
+        daily_usage = {}
+        for row in rows:
+            if row['date_time'] is None:
+                if now is None:
+                    now = db.session.execute(select(func.now())).scalar_one()
+                row['date_time'] = now
+            row['revision'] = revision
+            key = (row['category_id'], row['date_time'].date())
+            daily_usage[key] = daily_usage.get(key, timedelta(0)) + row['period']
+
+        # SQLite cannot return the ids in the order of the rows in one batch, and inserts a row at a time
+        # when asked to. It hands out ids in row order though, under its single writer lock.
+        sqlite = db.engine.dialect.name == 'sqlite'
+        statement = insert(Transaction).returning(Transaction.transaction_id, sort_by_parameter_order=not sqlite)
+        inserted = db.session.execute(statement, rows).all()
+        if sqlite:
+            inserted.sort()
+
+        CategoryDailyUsage.add(daily_usage)
+        applied_rows = [{'idempotency_key': key, 'record_id': transaction_id}
+                        for key, (transaction_id,) in zip(keys, inserted) if key is not None]
+        if applied_rows:
+            db.session.execute(insert(AppliedWrite), applied_rows)
+        db.session.commit()
+
+        for index, (transaction_id,) in zip(indexes, inserted):
+            results[index] = {'index': index, 'status': 201, 'transaction_id': transaction_id}
+
+    succeeded = sum(result['status'] < 300 for result in results)
+    if not succeeded and items:
+        status = 400
+    elif succeeded < len(items):
+        status = 207
+    else:
+        status = 201
+    return jsonify({'results': results}), status
+
+
 @transaction_bp.get('/<int:transaction_id>')
 def get_transaction(user_id, budget_id, category_id, transaction_id):
     transaction = Transaction.query.get_or_404(transaction_id)
@@ -50,13 +253,26 @@ def update_transaction(user_id, budget_id, category_id, transaction_id):
     data = request.get_json()
     if not data or not data.get("transaction_name") or not data.get("period"):
         return jsonify({'error': 'Transaction name and period are required'}), 400
+    period = parse_period(data.get("period"))
+    if period is None:
+        return jsonify({'error': PERIOD_ERROR}), 400
 
     transaction = Transaction.query.filter(Transaction.transaction_id == transaction_id).first()
     if transaction is None:
         return jsonify({'error': 'Transaction not found'}), 404
 
+    category = Category.query.filter(Category.category_id == transaction.category_id).with_for_update().one()
+    # Read it again under the lock, a write committed since the first read may have changed or removed it
+    transaction = Transaction.query.filter(Transaction.transaction_id == transaction_id) \
+        .with_for_update().populate_existing().first()
+    if transaction is None:
+        return jsonify({'error': 'Transaction not found'}), 404
+    Budget.bump_revision(category.budget_id)
+    category.add_time_used(period - transaction.period)
+    CategoryDailyUsage.add({(transaction.category_id, transaction.date_time.date()): period - transaction.period})
+
     transaction.transaction_name = data.get("transaction_name")
-    transaction.period = timedelta(data.get("period"))
+    transaction.period = period
 
     db.session.commit()
 
@@ -70,6 +286,16 @@ def delete_transaction(user_id, budget_id, category_id, transaction_id):
     if transaction is None:
         return jsonify({'error': 'Transaction not found'}), 404
 
+    category = Category.query.filter(Category.category_id == transaction.category_id).with_for_update().one()
+    # Read it again under the lock, a write committed since the first read may have changed or removed it
+    transaction = Transaction.query.filter(Transaction.transaction_id == transaction_id) \
+        .with_for_update().populate_existing().first()
+    if transaction is None:
+        return jsonify({'error': 'Transaction not found'}), 404
+    Budget.bump_revision(category.budget_id)
+    category.add_time_used(-transaction.period)
+    CategoryDailyUsage.add({(transaction.category_id, transaction.date_time.date()): -transaction.period})
+
     db.session.delete(transaction)
     db.session.commit()
 
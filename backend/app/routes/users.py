@@ -1,22 +1,33 @@
 """
 Author:  Orion Hess
 Created: 2025-12-03
-Edited:  2025-12-11
+Edited:  2026-10-17
 
 Routes for user management
 """
 
-from flask import Blueprint, jsonify, request
+import io
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy.exc import IntegrityError
 from app.database import db
-from app.models import User
+from app.idempotency import idempotent
+from app.models import ImportJob, User
+from app.pagination import PAGE_ERROR, get_page, paginate, page_response
+from app.transfer import FORMATS, export_csv, export_ndjson, import_records, read_records
 
 user_bp = Blueprint('user', __name__, url_prefix='/api/users')
 
 @user_bp.get('')
 def get_users():
-    """Get all users"""
-    users = User.query.order_by(User.user_id.desc()).all()
-    return jsonify([user.to_dict() for user in users]), 200
+    """Get a page of users, newest first"""
+    page = get_page()
+    if page is None:
+        return jsonify({'error': PAGE_ERROR}), 400
+
+    query = db.session.query(*User.columns())
+    users, next_cursor = paginate(query, User.user_id, page, descending=True)
+    return page_response([user._asdict() for user in users], next_cursor), 200
 
 @user_bp.get('/<int:user_id>')
 def get_user(user_id):
@@ -24,7 +35,56 @@ def get_user(user_id):
     user = User.query.get_or_404(user_id)
     return jsonify(user.to_dict()), 200
 
+@user_bp.get('/<int:user_id>/export')
+def export_user(user_id):
+    """Stream a user with all their budgets, groups, categories and transactions, as ?format=ndjson (default) or csv"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(FORMATS)}."}), 400
+
+    if db.session.get(User, user_id) is None:
+        return jsonify({'error': 'User not found'}), 404
+
+    export = export_csv if export_format == 'csv' else export_ndjson
+    return Response(
+        stream_with_context(export(user_id, current_app.config['EXPORT_BATCH_SIZE'])),
+        mimetype=FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename=user-{user_id}.{export_format}'},
+    )
+
+@user_bp.post('/import')
+def import_user():
+    """
+    Create a user from an export, sent as the body in ?format=ndjson (default) or csv
+
+    Records are committed a chunk at a time. If the import fails part way, sending the
+    same file again with ?job=<job_id> from the error resumes after the last committed chunk.
+    """
+    import_format = request.args.get('format', 'ndjson')
+    if import_format not in FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(FORMATS)}."}), 400
+
+    job_id = request.args.get('job', type=int)
+    if job_id is None:
+        job = ImportJob(records_done=0, finished=False)
+        db.session.add(job)
+        db.session.commit()
+    else:
+        job = db.session.get(ImportJob, job_id)
+        if job is None:
+            return jsonify({'error': 'Import job not found'}), 404
+
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    try:
+        import_records(job, read_records(stream, import_format), current_app.config['IMPORT_CHUNK_SIZE'])
+    except (ValueError, IntegrityError) as error:
+        message = str(error.orig) if isinstance(error, IntegrityError) else str(error)
+        return jsonify({'error': message, 'job_id': job.job_id, 'records_done': job.records_done}), 400
+
+    return jsonify(job.to_dict()), 201
+
 @user_bp.post('')
+@idempotent(User)
 def create_user():
     """Create a user"""
     data = request.get_json()
@@ -1,16 +1,50 @@
 """
 Author: Orion Hess
 Created: 2025-12-03
-Updated: 2025-12-10
+Updated: 2026-10-17
 
-Entry point for running the Flask application.
+Entry points for running the Flask application.
 """
 
+from gunicorn.app.base import BaseApplication
+
 from app import create_app
+from app.config import Config
+
 
 def main():
+    """Run Flask's development server, with the reloader and debugger"""
     app = create_app()
     app.run(debug=True)
 
+
+class Server(BaseApplication):
+    """Gunicorn server loading the app in each worker"""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Workers each create their own app, so no database connection is shared across a fork
+        return create_app()
+
+
+def serve():
+    """Run the production server, with worker processes and threads sized by Config"""
+    Server({
+        'bind': Config.WEB_BIND,
+        'workers': Config.WEB_WORKERS,
+        'threads': Config.WEB_THREADS,
+        'worker_class': 'gthread',
+        'timeout': Config.WEB_TIMEOUT,
+        'accesslog': '-',
+    }).run()
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
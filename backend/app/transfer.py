@@ -0,0 +1,285 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Export and import of a user's data tree as NDJSON or CSV
+
+Every row is one record with a type, written parents first: the user, then its
+budgets, groups, categories and transactions, each ordered by id. Records keep their
+ids and the ids of their parents. Running totals are left out, they follow from the
+transactions. Rows are read with a server side cursor and written as they arrive, so
+memory use does not grow with the size of the tree.
+
+An import creates a new user with new ids. It reads the records as a stream and
+inserts them a chunk at a time, one database transaction per chunk. The ids given to
+the records so far are kept in import_id_map, and the number of records committed in
+import_job, so an interrupted import resumes after its last committed chunk when given
+the same file again.
+"""
+
+import csv
+import io
+import itertools
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Integer, Interval, func, insert, select
+
+from app.database import db
+from app.models import Budget, Category, CategoryDailyUsage, Group, ImportIdMap, ImportJob, Transaction, User
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Columns of each record type, in the order they are exported
+RECORDS = {
+    'user': (User.user_id, User.username, User.email, User.created_at),
+    'budget': (Budget.budget_id, Budget.user_id, Budget.budget_name),
+    'group': (Group.group_id, Group.budget_id, Group.group_name),
+    'category': (Category.category_id, Category.budget_id, Category.group_id,
+                 Category.category_name, Category.time_allocated),
+    'transaction': (Transaction.transaction_id, Transaction.category_id, Transaction.transaction_name,
+                    Transaction.period, Transaction.date_time),
+}
+
+# Columns referring to a parent record, with the type of that record
+PARENTS = {
+    'budget': (('user_id', 'user'),),
+    'group': (('budget_id', 'budget'),),
+    'category': (('budget_id', 'budget'), ('group_id', 'group')),
+    'transaction': (('category_id', 'category'),),
+}
+
+# Columns the database fills in when a record leaves them out
+SERVER_DEFAULTS = {'user': 'created_at', 'transaction': 'date_time'}
+
+# A csv has one header, the union of the columns of every record type
+CSV_COLUMNS = ['type'] + list(dict.fromkeys(column.key for columns in RECORDS.values() for column in columns))
+
+
+def _export_queries(user_id: int):
+    """Yield the record type and the select of every table, parents first"""
+    budget_ids = select(Budget.budget_id).where(Budget.user_id == user_id)
+    yield 'user', select(*RECORDS['user']).where(User.user_id == user_id)
+    yield 'budget', select(*RECORDS['budget']).where(Budget.user_id == user_id).order_by(Budget.budget_id)
+    yield 'group', select(*RECORDS['group']).where(Group.budget_id.in_(budget_ids)).order_by(Group.group_id)
+    yield 'category', select(*RECORDS['category']) \
+        .where(Category.budget_id.in_(budget_ids)).order_by(Category.category_id)
+    yield 'transaction', select(*RECORDS['transaction']) \
+        .join(Category, Category.category_id == Transaction.category_id) \
+        .where(Category.budget_id.in_(budget_ids)).order_by(Transaction.transaction_id)
+
+
+def _value(value):
+    """Intervals are exported as seconds and date times in ISO 8601"""
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_records(user_id: int, batch_size: int):
+    """
+    Yield every record of a user's tree as a dictionary with its type
+    :param user_id: User to export
+    :param batch_size: Rows fetched from the cursor at a time
+    """
+    for record_type, query in _export_queries(user_id):
+        for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+            record = {'type': record_type}
+            record.update((key, _value(value)) for key, value in row._mapping.items())
+            yield record
+
+
+def export_ndjson(user_id: int, batch_size: int):
+    """Yield the export as chunks of NDJSON lines, a chunk per batch of rows"""
+    lines = []
+    for record in export_records(user_id, batch_size):
+        lines.append(json.dumps(record))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_csv(user_id: int, batch_size: int):
+    """Yield the export as chunks of csv, the header first and then a chunk per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS)
+    writer.writeheader()
+    rows = 0
+    for record in export_records(user_id, batch_size):
+        writer.writerow(record)
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def read_records(stream, import_format: str):
+    """
+    Yield the records of an export
+    :param stream: Text stream of the export
+    :param import_format: One of FORMATS
+    """
+    if import_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {number} is not valid json.")
+
+
+def _parse(record) -> tuple[str, dict]:
+    """
+    Convert a record from either format to column values
+    :return: Tuple of the record type and a dictionary of its columns
+    """
+    if not isinstance(record, dict) or record.get('type') not in RECORDS:
+        raise ValueError(f"Record type must be one of {', '.join(RECORDS)}.")
+    values = {}
+    for column in RECORDS[record['type']]:
+        value = record.get(column.key)
+        try:
+            if value is None or value == '':
+                value = None
+            elif isinstance(column.type, Integer):
+                value = int(value)
+            elif isinstance(column.type, Interval):
+                value = timedelta(seconds=float(value))
+            elif isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            else:
+                value = str(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{record['type']} has an invalid {column.key}: {value!r}.")
+        values[column.key] = value
+    if values[RECORDS[record['type']][0].key] is None:
+        raise ValueError(f"{record['type']} has no {RECORDS[record['type']][0].key}.")
+    return record['type'], values
+
+
+def _mapped(job: ImportJob, record_type: str, old_ids) -> dict:
+    """Return the new ids already given to records of a type, by their id in the import"""
+    if not old_ids:
+        return {}
+    return dict(db.session.query(ImportIdMap.old_id, ImportIdMap.new_id).filter(
+        ImportIdMap.job_id == job.job_id,
+        ImportIdMap.record_type == record_type,
+        ImportIdMap.old_id.in_(old_ids),
+    ))
+
+
+def _import_chunk(job: ImportJob, records: list[tuple[str, dict]]) -> None:
+    """Insert a chunk of records, parents before children, and add the transactions to the running totals"""
+    for record_type, columns in RECORDS.items():
+        key = columns[0].key
+        rows = [values for values_type, values in records if values_type == record_type]
+        # Skip records inserted before, an import may be given overlapping files
+        done = _mapped(job, record_type, {row[key] for row in rows})
+        rows = [row for row in rows if row[key] not in done]
+        if not rows:
+            continue
+        if record_type == 'user' and (len(rows) > 1 or job.user_id is not None):
+            raise ValueError('An import holds a single user.')
+
+        for parent_key, parent_type in PARENTS.get(record_type, ()):
+            parents = _mapped(job, parent_type, {row[parent_key] for row in rows if row[parent_key] is not None})
+            for row in rows:
+                if row[parent_key] is None:
+                    continue
+                if row[parent_key] not in parents:
+                    raise ValueError(f"{record_type} {row[key]} refers to {parent_type} {row[parent_key]}, "
+                                     f"which is not among the records before it.")
+                row[parent_key] = parents[row[parent_key]]
+
+        model = columns[0].class_
+        old_ids = [row.pop(key) for row in rows]
+        if record_type in ('group', 'category', 'transaction'):
+            # Stamped with the new revision of their budgets, so clients syncing changes get them
+            if record_type == 'transaction':
+                categories = {category.category_id: category for category in Category.query
+                              .filter(Category.category_id.in_({row['category_id'] for row in rows}))
+                              .order_by(Category.category_id).with_for_update()}
+                owners = [categories[row['category_id']].budget_id for row in rows]
+            else:
+                owners = [row['budget_id'] for row in rows]
+            revisions = Budget.bump_revision(*set(owners))
+            for row, budget_id in zip(rows, owners):
+                row['revision'] = revisions[budget_id]
+        if record_type in SERVER_DEFAULTS:
+            # Filled in with the database's time here, an SQL default in the insert makes it a statement per row
+            default_key = SERVER_DEFAULTS[record_type]
+            if any(row[default_key] is None for row in rows):
+                now = db.session.execute(select(func.now())).scalar_one()
+                for row in rows:
+                    if row[default_key] is None:
+                        row[default_key] = now
+        # The ids are mapped in row order. SQLite inserts a row at a time when asked to return them in order,
+        # and hands them out in row order anyway, as the bulk transaction route relies on.
+        sqlite = db.engine.dialect.name == 'sqlite'
+        statement = insert(model).returning(columns[0], *[c for c in columns if c.key == 'date_time'],
+                                            sort_by_parameter_order=not sqlite)
+        inserted = db.session.execute(statement, rows).all()
+        if sqlite:
+            inserted.sort()
+        db.session.execute(insert(ImportIdMap), [
+            {'job_id': job.job_id, 'record_type': record_type, 'old_id': old_id, 'new_id': row[0]}
+            for old_id, row in zip(old_ids, inserted)
+        ])
+
+        if record_type == 'user':
+            job.user_id = inserted[0][0]
+        elif record_type == 'transaction':
+            _add_usage(rows, inserted, categories)
+
+
+def _add_usage(rows: list[dict], inserted, categories: dict[int, Category]) -> None:
+    """Add imported transactions to the running totals and the daily rollup, like the transaction routes"""
+    time_used, daily_usage = {}, {}
+    for row, (_, date_time) in zip(rows, inserted):
+        time_used[row['category_id']] = time_used.get(row['category_id'], timedelta(0)) + row['period']
+        day = (row['category_id'], date_time.date())
+        daily_usage[day] = daily_usage.get(day, timedelta(0)) + row['period']
+    for category_id in sorted(time_used):
+        categories[category_id].add_time_used(time_used[category_id])
+    CategoryDailyUsage.add(daily_usage)
+
+
+def import_records(job: ImportJob, records, chunk_size: int, progress=None) -> ImportJob:
+    """
+    Import the records of an export, committing a chunk at a time
+    :param job: Job to run, records it has already committed are skipped
+    :param records: Iterable of records, as read by read_records
+    :param chunk_size: Records per database transaction
+    :param progress: Called with the job after every committed chunk
+    :return: The finished job
+    :raises ValueError: When a record is invalid, the job keeps its committed chunks and can be resumed
+    """
+    if job.finished:
+        return job
+    records = itertools.islice(records, job.records_done, None)
+    try:
+        while chunk := list(itertools.islice(records, chunk_size)):
+            _import_chunk(job, [_parse(record) for record in chunk])
+            job.records_done += len(chunk)
+            db.session.commit()
+            if progress:
+                progress(job)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # The id map only serves resuming, it is no longer needed
+    ImportIdMap.query.filter(ImportIdMap.job_id == job.job_id).delete()
+    job.finished = True
+    db.session.commit()
+    return job
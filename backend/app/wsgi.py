@@ -0,0 +1,11 @@
+"""
+Author: Orion Hess
+Created: 2026-10-17
+Updated: 2026-10-17
+
+WSGI application for servers other than app.run.serve, e.g. `gunicorn app.wsgi:app`
+"""
+
+from app import create_app
+
+app = create_app()
@@ -0,0 +1,7 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Benchmarks for the time budgeting backend
+"""
@@ -0,0 +1,121 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Time the list routes before and after the foreign key indexes of migration 0003
+
+Needs an empty scratch database in DATABASE_URL, for example a fresh local Postgres:
+
+    cd backend
+    DATABASE_URL=postgresql://localhost/time_budgeting_bench python -m benchmarks.indexes
+
+The schema is migrated to the latest revision and seeded (1,000,000 transactions by
+default). The indexes under test are dropped, the list routes are timed, then the
+indexes are created again and the routes are timed again. Migrating to 0002 instead
+would leave out columns the current models and routes read.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from flask_migrate import upgrade
+from sqlalchemy import Index, inspect, text
+
+from app import create_app
+from app.config import Config
+from app.database import db
+from benchmarks.seed import DEFAULT_SCALE, scale_total, seed
+
+
+# Indexes of migration 0003, and the later one that also serves lookups by category_id alone
+INDEXES = ('ix_budget_user_id', 'ix_group_budget_id', 'ix_category_budget_id', 'ix_category_group_id',
+           'ix_transaction_category_id_date_time', 'ix_transaction_date_time', 'ix_authorizes_authorized_id',
+           'ix_transaction_category_id_revision')
+
+
+def indexes_under_test() -> list[Index]:
+    by_name = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    return [by_name[name] for name in INDEXES]
+
+
+def list_routes(scale: dict) -> dict[str, str]:
+    """Return the list routes to time, against the last user so nothing is served from the front of a table"""
+    user_id = scale['users']
+    budget_id = user_id * scale['budgets_per_user']
+    group_id = budget_id * scale['groups_per_budget']
+    category_id = group_id * scale['categories_per_group']
+    budget = f"/api/users/{user_id}/budgets/{budget_id}"
+    month_ago = (datetime.now() - timedelta(days=30)).isoformat(timespec='seconds')
+    return {
+        'budgets': f"/api/users/{user_id}/budgets",
+        'groups': f"{budget}/groups",
+        'categories': f"{budget}/categories",
+        'categories detailed': f"{budget}/categories?detailed=true",
+        'group categories': f"{budget}/groups/{group_id}/categories?detailed=true",
+        'transactions': f"{budget}/categories/{category_id}/transactions",
+        'transactions last month': f"{budget}/categories/{category_id}/transactions?start={month_ago}",
+    }
+
+
+def time_routes(client, routes: dict[str, str], repeat: int) -> dict[str, float]:
+    """Return the median latency in milliseconds of each route"""
+    results = {}
+    for name, url in routes.items():
+        client.get(url)  # warm up
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            samples.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+        results[name] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions-per-category', type=int, default=DEFAULT_SCALE['transactions_per_category'])
+    parser.add_argument('--users', type=int, default=DEFAULT_SCALE['users'])
+    parser.add_argument('--repeat', type=int, default=20, help='Requests per route, the median is reported')
+    args = parser.parse_args()
+
+    scale = dict(DEFAULT_SCALE, users=args.users, transactions_per_category=args.transactions_per_category)
+    app = create_app(Config)
+    client = app.test_client()
+
+    with app.app_context():
+        if inspect(db.engine).get_table_names():
+            sys.exit(f"{db.engine.url.render_as_string()} is not empty, point DATABASE_URL at a scratch database")
+
+        upgrade()
+        print(f"Seeding {scale_total(scale):,} transactions...")
+        seed(scale)
+        routes = list_routes(scale)
+        indexes = indexes_under_test()
+
+        def analyze():
+            if db.engine.dialect.name == 'postgresql':
+                with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                    connection.execute(text('ANALYZE'))
+
+        for index in indexes:
+            index.drop(db.engine)
+        analyze()
+        before = time_routes(client, routes, args.repeat)
+        for index in indexes:
+            index.create(db.engine)
+        analyze()
+        after = time_routes(client, routes, args.repeat)
+
+    print(f"\n{'route':25} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name in routes:
+        print(f"{name:25} {before[name]:10.2f} {after[name]:10.2f} {before[name] / after[name]:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
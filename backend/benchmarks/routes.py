@@ -0,0 +1,278 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Time every route of the API against a seeded database, and catch regressions
+
+    cd backend
+    python -m benchmarks.routes --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.routes --compare results/<older commit>.json
+
+By default a fresh SQLite database is created in a temporary directory. Pass
+--database-url with an empty scratch database to run against a local Postgres instead.
+The schema is migrated, seeded with a dataset of the given scale (the same seed always
+gives the same data), and every route is requested in process through the test client,
+so no server or network is needed. The read cache is off unless --cache is given, so
+reads are measured against the database.
+
+Results are written as JSON. With --compare, routes whose median latency grew by more
+than --threshold over an earlier result are reported, and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask_migrate import upgrade
+from sqlalchemy import inspect
+
+from app import create_app
+from app.config import Config
+from app.database import db
+from benchmarks.seed import DEFAULT_SCALE, scale_total, seed
+
+# Routes served by create_app itself rather than the API blueprints
+UNTIMED_ENDPOINTS = {'static', 'health_check', 'metrics', 'cache_stats'}
+
+
+def make_config(database_url: str, cache: bool):
+    """Return the configuration class of a benchmark run"""
+    engine_options = {} if database_url.startswith('sqlite') else Config.SQLALCHEMY_ENGINE_OPTIONS
+    return type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options,
+        'CACHE_MAX_BYTES': Config.CACHE_MAX_BYTES if cache else 0,
+        'CACHE_REDIS_URL': None,
+    })
+
+
+def route_cases(client, scale: dict) -> list[tuple]:
+    """
+    Return the requests to time, against the last user so nothing is served from the front of a table
+    :return: List of name, method and a function giving the url and keyword arguments of the
+        client call. The function runs before every timed request, untimed, so it can create
+        the row a write request needs.
+    """
+    user_id = scale['users']
+    budget_id = user_id * scale['budgets_per_user']
+    group_id = budget_id * scale['groups_per_budget']
+    category_id = group_id * scale['categories_per_group']
+    transaction_id = category_id * scale['transactions_per_category']
+    user = f"/api/users/{user_id}"
+    budget = f"{user}/budgets/{budget_id}"
+    category = f"{budget}/categories/{category_id}"
+    month_ago = (datetime.now() - timedelta(days=30)).isoformat(timespec='seconds')
+    quarter_ago = (datetime.now() - timedelta(days=90)).date().isoformat()
+    year_ago = (datetime.now() - timedelta(days=365)).date().isoformat()
+
+    def fixed(url, **kwargs):
+        return lambda: (url, kwargs)
+
+    def created(url, body, key, **kwargs):
+        """Create a row to write to, and return the url of that row"""
+        def setup():
+            return f"{url}/{client.post(url, json=body).json[key]}", kwargs
+        return setup
+
+    def latest(url):
+        """Ask for the changes since the current revision, like a client whose copy is up to date"""
+        return lambda: (f"{url}?since={client.get(url).json['revision']}", {})
+
+    # A small user with 100 transactions, exported once, to import
+    small = client.post('/api/users', json={'username': 'small', 'email': 'small@example.com'}).json['user_id']
+    small_budget = client.post(f"/api/users/{small}/budgets", json={'budget_name': 'Small'}).json['budget_id']
+    small_category = client.post(f"/api/users/{small}/budgets/{small_budget}/categories",
+                                 json={'category_name': 'Small', 'time_allocated': 3600}).json['category_id']
+    client.post(f"/api/users/{small}/budgets/{small_budget}/categories/{small_category}/transactions/bulk",
+                json=[{'transaction_name': 'Small', 'period': 60}] * 100)
+    export = client.get(f"/api/users/{small}/export").get_data()
+
+    return [
+        ('users', 'GET', fixed('/api/users')),
+        ('user', 'GET', fixed(user)),
+        ('create user', 'POST', fixed('/api/users', json={'username': 'bench', 'email': 'bench@example.com'})),
+        ('update user', 'PATCH', fixed(user, json={'username': f"user{user_id}", 'email': f"user{user_id}@example.com"})),
+        ('delete user', 'DELETE', created('/api/users', {'username': 'bench', 'email': 'bench@example.com'}, 'user_id')),
+        ('export ndjson', 'GET', fixed(f"{user}/export")),
+        ('export csv', 'GET', fixed(f"{user}/export?format=csv")),
+        ('import ndjson', 'POST', fixed('/api/users/import', data=export, content_type='application/x-ndjson')),
+
+        ('budgets', 'GET', fixed(f"{user}/budgets")),
+        ('budget', 'GET', fixed(budget)),
+        ('budget snapshot', 'GET', fixed(f"{budget}/snapshot")),
+        ('budget changes', 'GET', fixed(f"{budget}/changes")),
+        ('budget changes since latest', 'GET', latest(f"{budget}/changes")),
+        ('usage by week', 'GET', fixed(f"{budget}/usage?bucket=week&start={quarter_ago}")),
+        ('usage by group and month', 'GET', fixed(f"{budget}/usage?bucket=month&group_by=group&start={year_ago}")),
+        ('create budget', 'POST', fixed(f"{user}/budgets", json={'budget_name': 'Bench'})),
+        ('update budget', 'PATCH', fixed(budget, json={'budget_name': f"Budget {budget_id}"})),
+        ('delete budget', 'DELETE', created(f"{user}/budgets", {'budget_name': 'Bench'}, 'budget_id')),
+
+        ('groups', 'GET', fixed(f"{budget}/groups")),
+        ('group', 'GET', fixed(f"{budget}/groups/{group_id}")),
+        ('group categories', 'GET', fixed(f"{budget}/groups/{group_id}/categories?detailed=true")),
+        ('create group', 'POST', fixed(f"{budget}/groups", json={'group_name': 'Bench'})),
+        ('update group', 'PATCH', fixed(f"{budget}/groups/{group_id}", json={'group_name': f"Group {group_id}"})),
+        ('delete group', 'DELETE', created(f"{budget}/groups", {'group_name': 'Bench'}, 'group_id')),
+
+        ('categories', 'GET', fixed(f"{budget}/categories")),
+        ('categories detailed', 'GET', fixed(f"{budget}/categories?detailed=true")),
+        ('category', 'GET', fixed(category)),
+        ('create category', 'POST', fixed(f"{budget}/categories", json={'category_name': 'Bench', 'time_allocated': 3600})),
+        ('update category', 'PATCH', fixed(category, json={'category_name': f"Category {category_id}", 'time_allocated': 36000})),
+        ('delete category', 'DELETE', created(f"{budget}/categories", {'category_name': 'Bench', 'time_allocated': 3600}, 'category_id')),
+
+        ('transactions', 'GET', fixed(f"{category}/transactions")),
+        ('transactions last month', 'GET', fixed(f"{category}/transactions?start={month_ago}")),
+        ('transaction', 'GET', fixed(f"{category}/transactions/{transaction_id}")),
+        ('create transaction', 'POST', fixed(f"{category}/transactions", json={'transaction_name': 'Bench', 'period': 600})),
+        ('create 100 transactions', 'POST', fixed(f"{category}/transactions/bulk",
+                                                  json=[{'transaction_name': 'Bench', 'period': 60}] * 100)),
+        ('update transaction', 'PATCH', created(f"{category}/transactions", {'transaction_name': 'Bench', 'period': 600},
+                                                'transaction_id', json={'transaction_name': 'Bench', 'period': 1})),
+        ('delete transaction', 'DELETE', created(f"{category}/transactions", {'transaction_name': 'Bench', 'period': 600},
+                                                 'transaction_id')),
+    ]
+
+
+def time_cases(app, client, cases: list[tuple], repeat: int) -> dict:
+    """Return the median and 95th percentile latency in milliseconds, and the query count, of each case"""
+    results = {}
+    for name, method, setup in cases:
+        samples = []
+        for attempt in range(repeat + 1):
+            url, kwargs = setup()
+            start = time.perf_counter()
+            response = client.open(url, method=method, **kwargs)
+            # Streamed bodies are generated as they are read, so read them inside the timing
+            body = response.get_data()
+            elapsed = (time.perf_counter() - start) * 1000
+            response.close()
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} returned {response.status_code}: {body.decode()}")
+            if attempt:  # the first request warms up
+                samples.append(elapsed)
+
+        queries = re.search(r'desc="(\d+) queries"', response.headers.get('Server-Timing', ''))
+        endpoint = app.url_map.bind('localhost').match(url.split('?')[0], method=method)[0]
+        results[name] = {
+            'method': method,
+            'endpoint': endpoint,
+            'median_ms': round(statistics.median(samples), 3),
+            'p95_ms': round(statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0], 3),
+            'queries': int(queries.group(1)) if queries else None,
+        }
+    return results
+
+
+def untimed_endpoints(app, results: dict) -> list[str]:
+    """Return the API endpoints no case requested, so new routes are not silently left out"""
+    timed = {(result['endpoint'], result['method']) for result in results.values()}
+    return sorted(f"{method} {rule.rule}" for rule in app.url_map.iter_rules()
+                  for method in rule.methods - {'HEAD', 'OPTIONS'}
+                  if rule.endpoint not in UNTIMED_ENDPOINTS and (rule.endpoint, method) not in timed)
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_ms: float) -> list[str]:
+    """Return a line per route slower than in the baseline by more than threshold and min_ms"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+        ratio = result['median_ms'] / before['median_ms']
+        if ratio > 1 + threshold and result['median_ms'] - before['median_ms'] > min_ms:
+            regressions.append(f"{name}: {before['median_ms']:.2f} ms -> {result['median_ms']:.2f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Empty scratch database, a temporary SQLite file by default')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--budgets-per-user', type=int, default=DEFAULT_SCALE['budgets_per_user'])
+    parser.add_argument('--groups-per-budget', type=int, default=DEFAULT_SCALE['groups_per_budget'])
+    parser.add_argument('--categories-per-group', type=int, default=DEFAULT_SCALE['categories_per_group'])
+    parser.add_argument('--transactions-per-category', type=int, default=DEFAULT_SCALE['transactions_per_category'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20, help='Requests per route, after one to warm up')
+    parser.add_argument('--cache', action='store_true', help='Leave the read cache on')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Earlier results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown reported as a regression, 0.2 is 20%%')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    scale = {key: getattr(args, key) for key in DEFAULT_SCALE}
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url or f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+        app = create_app(make_config(database_url, args.cache))
+        client = app.test_client()
+
+        with app.app_context():
+            if inspect(db.engine).get_table_names():
+                sys.exit(f"{db.engine.url.render_as_string()} is not empty, point --database-url at a scratch database")
+            upgrade()
+            print(f"Seeding {scale_total(scale):,} transactions...")
+            seed(scale, seed=args.seed)
+            dialect = db.engine.dialect.name
+
+            results = time_cases(app, client, route_cases(client, scale), args.repeat)
+            db.session.remove()
+            db.engine.dispose()
+
+    print(f"\n{'route':28} {'method':7} {'median ms':>10} {'p95 ms':>9} {'queries':>8}")
+    for name, result in results.items():
+        print(f"{name:28} {result['method']:7} {result['median_ms']:10.2f} {result['p95_ms']:9.2f} {result['queries']!s:>8}")
+    for route in untimed_endpoints(app, results):
+        print(f"Not timed: {route}")
+
+    report = {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'dialect': dialect,
+        'python': platform.python_version(),
+        'scale': scale,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'cache': args.cache,
+        'routes': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if (baseline['dialect'], baseline['scale']) != (dialect, scale):
+            print(f"Warning: {args.compare} was run on {baseline['dialect']} at another scale, timings may not compare")
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        print(f"\n{len(regressions)} regressions against {baseline.get('commit') or args.compare}")
+        for line in regressions:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
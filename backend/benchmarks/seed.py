@@ -0,0 +1,118 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Seed a database with a generated dataset of a given scale
+
+Rows are written with batched multi row inserts straight through the engine, so a
+million transactions take minutes rather than the hours populate-data.py would need.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.database import db
+from app.models import Budget, Category, CategoryDailyUsage, Group, Transaction, User
+
+# users × budgets × groups × categories × transactions, 1,000,000 transactions in total
+DEFAULT_SCALE = {
+    'users': 100,
+    'budgets_per_user': 5,
+    'groups_per_budget': 5,
+    'categories_per_group': 8,
+    'transactions_per_category': 50,
+}
+
+
+def scale_total(scale: dict) -> int:
+    """Return the number of transactions a scale produces"""
+    return (scale['users'] * scale['budgets_per_user'] * scale['groups_per_budget']
+            * scale['categories_per_group'] * scale['transactions_per_category'])
+
+
+def _flush_all(tables: dict, batch_size: int) -> None:
+    """Insert the queued rows of every table, parents first"""
+    for model, rows in tables.items():
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(model), rows[start:start + batch_size])
+        rows.clear()
+
+
+def seed(scale: dict, seed: int = 0, batch_size: int = 10000) -> None:
+    """
+    Fill an empty database with users, budgets, groups, categories and transactions
+
+    Running totals and the daily usage rollup are computed while generating, so they match the transactions.
+    Transactions are spread over the year before now.
+    :param scale: Counts of each level, see DEFAULT_SCALE
+    :param seed: Seed for the random generator, the same seed gives the same data
+    :param batch_size: Number of rows per insert statement
+    """
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    year = 365 * 24 * 60 * 60
+
+    tables = {User: [], Budget: [], Group: [], Category: [], Transaction: [], CategoryDailyUsage: []}
+    budget_id = group_id = category_id = transaction_id = 0
+
+    for user_id in range(1, scale['users'] + 1):
+        tables[User].append({'user_id': user_id, 'username': f"user{user_id}", 'email': f"user{user_id}@example.com"})
+        for _ in range(scale['budgets_per_user']):
+            # Build one budget at a time so its totals are known before its rows are queued
+            budget_id += 1
+            budget = {'budget_id': budget_id, 'budget_name': f"Budget {budget_id}",
+                      'user_id': user_id, 'time_used': timedelta(0)}
+            groups, categories, transactions = [], [], []
+            for _ in range(scale['groups_per_budget']):
+                group_id += 1
+                group = {'group_id': group_id, 'group_name': f"Group {group_id}",
+                         'budget_id': budget_id, 'time_used': timedelta(0)}
+                groups.append(group)
+                for _ in range(scale['categories_per_group']):
+                    category_id += 1
+                    category = {'category_id': category_id, 'category_name': f"Category {category_id}",
+                                'time_allocated': timedelta(hours=rng.randint(1, 20)),
+                                'budget_id': budget_id, 'group_id': group_id, 'time_used': timedelta(0)}
+                    categories.append(category)
+                    days = {}
+                    for _ in range(scale['transactions_per_category']):
+                        transaction_id += 1
+                        period = timedelta(seconds=rng.randint(900, 28800))
+                        category['time_used'] += period
+                        date_time = now - timedelta(seconds=rng.randint(0, year))
+                        days[date_time.date()] = days.get(date_time.date(), timedelta(0)) + period
+                        transactions.append({
+                            'transaction_id': transaction_id,
+                            'transaction_name': f"Transaction {transaction_id}",
+                            'period': period,
+                            'date_time': date_time,
+                            'category_id': category_id,
+                        })
+                    tables[CategoryDailyUsage].extend(
+                        {'category_id': category_id, 'day': day, 'time_used': time_used}
+                        for day, time_used in days.items()
+                    )
+                    group['time_used'] += category['time_used']
+                budget['time_used'] += group['time_used']
+
+            tables[Budget].append(budget)
+            tables[Group].extend(groups)
+            tables[Category].extend(categories)
+            tables[Transaction].extend(transactions)
+            if len(tables[Transaction]) >= batch_size:
+                _flush_all(tables, batch_size)
+
+    _flush_all(tables, batch_size)
+
+    # Ids were given explicitly, move the sequences past them
+    if db.engine.dialect.name == 'postgresql':
+        for table, key in (('user', 'user_id'), ('budget', 'budget_id'), ('group', 'group_id'),
+                           ('category', 'category_id'), ('transaction', 'transaction_id')):
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', '{key}'), "
+                f"(SELECT COALESCE(MAX({key}), 1) FROM \"{table}\"))"
+            ))
+    db.session.commit()
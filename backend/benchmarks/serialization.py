@@ -0,0 +1,77 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Compare loading and serializing a transaction list as models or as selected rows
+
+Needs a seeded database in DATABASE_URL, see benchmarks.seed or sql-based-populate.py:
+
+    cd backend
+    DATABASE_URL=postgresql://localhost/time_budgeting_bench python -m benchmarks.serialization --rows 100000
+
+Times the two halves of a list route separately: loading --rows transactions, as models
+turned into dictionaries by to_dict or as tuples of the listed columns, and encoding them,
+with Flask's default provider or with FastJSONProvider. Rows hold raw intervals, which
+only FastJSONProvider encodes, so rows are not timed with the default provider.
+"""
+
+import argparse
+import statistics
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app
+from app.config import Config
+from app.database import db
+from app.json_provider import FastJSONProvider, orjson
+from app.models import Transaction
+
+
+def median_ms(function, repeat: int):
+    """Return the median time of a function in milliseconds, and its last result"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each step, the median is reported')
+    args = parser.parse_args()
+
+    app = create_app(Config)
+    providers = {'default': DefaultJSONProvider(app), 'fast': FastJSONProvider(app)}
+
+    with app.test_request_context():
+        def load_models():
+            db.session.expunge_all()
+            models = Transaction.query.order_by(Transaction.transaction_id).limit(args.rows).all()
+            return [transaction.to_dict() for transaction in models]
+
+        def load_rows():
+            rows = db.session.query(*Transaction.columns()).order_by(Transaction.transaction_id).limit(args.rows)
+            return [row._asdict() for row in rows]
+
+        loads = {'models': (load_models, ('default', 'fast')), 'rows': (load_rows, ('fast',))}
+        results = []
+        for load_name, (load, provider_names) in loads.items():
+            load_ms, items = median_ms(load, args.repeat)
+            for provider_name in provider_names:
+                provider = providers[provider_name]
+                encode_ms, response = median_ms(lambda: provider.response(items).get_data(), args.repeat)
+                results.append((load_name, provider_name, load_ms, encode_ms, len(response)))
+
+    print(f"{len(items):,} transactions, orjson {'installed' if orjson else 'not installed'}\n")
+    print(f"{'load':8} {'encode':8} {'load ms':>9} {'encode ms':>10} {'total ms':>9} {'bytes':>11}")
+    for load_name, provider_name, load_ms, encode_ms, size in results:
+        print(f"{load_name:8} {provider_name:8} {load_ms:9.1f} {encode_ms:10.1f} {load_ms + encode_ms:9.1f} {size:11,}")
+
+
+if __name__ == '__main__':
+    main()
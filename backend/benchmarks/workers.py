@@ -0,0 +1,121 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Measure requests per second of the production server against its number of workers
+
+Needs a seeded database in DATABASE_URL, for example one loaded by sql-based-populate.py:
+
+    cd backend
+    DATABASE_URL=postgresql://localhost/time_budgeting_bench python -m benchmarks.workers --workers 1 2 4 8
+
+For each worker count the server is started with `serve-backend` settings from the
+environment, the read routes of the first user are requested by --clients threads for
+--duration seconds, and the server is stopped again.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+
+def routes(base: str) -> list[str]:
+    """Return the read routes to request, against the first user and budget"""
+    budget = f"{base}/api/users/1/budgets/1"
+    return [
+        f"{base}/api/users/1/budgets",
+        f"{budget}/snapshot",
+        f"{budget}/groups",
+        f"{budget}/categories?detailed=true",
+        f"{budget}/categories/1/transactions",
+    ]
+
+
+def wait_until_up(base: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base}/health", timeout=1).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not start")
+
+
+def drive(urls: list[str], clients: int, duration: float) -> tuple[int, int, list[float]]:
+    """
+    Request the urls round robin from several threads
+    :return: Tuple of the completed and failed request counts and the latencies in milliseconds
+    """
+    completed, failed, latencies = [0], [0], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        session = requests.Session()
+        i = offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = session.get(urls[i % len(urls)], timeout=10).ok
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    completed[0] += 1
+                    latencies.append(elapsed)
+                else:
+                    failed[0] += 1
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return completed[0], failed[0], latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 4)), help='Threads per worker')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds of load per worker count')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    urls = routes(base)
+    rows = []
+    for workers in args.workers:
+        env = dict(os.environ, WEB_BIND=f"127.0.0.1:{args.port}", WEB_WORKERS=str(workers), WEB_THREADS=str(args.threads))
+        server = subprocess.Popen([sys.executable, '-c', 'from app.run import serve; serve()'],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(base)
+            drive(urls, args.clients, 1.0)  # warm up every worker
+            completed, failed, latencies = drive(urls, args.clients, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0
+        rows.append((workers, completed / args.duration, statistics.median(latencies) if latencies else 0.0, p95, failed))
+        print(f"{workers} workers done")
+
+    print(f"\n{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for workers, rps, p50, p95, failed in rows:
+        print(f"{workers:7} {rps:9.1f} {p50:8.2f} {p95:8.2f} {failed:7}")
+
+
+if __name__ == '__main__':
+    main()
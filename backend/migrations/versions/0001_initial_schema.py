@@ -0,0 +1,85 @@
+"""Initial schema
+
+Databases created by db.create_all() before migrations existed already have this
+schema, mark them with `flask db stamp 0001` and upgrade from there.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user',
+        sa.Column('user_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('authorizes',
+        sa.Column('authorizer_id', sa.Integer(), nullable=False),
+        sa.Column('authorized_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['authorized_id'], ['user.user_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['authorizer_id'], ['user.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('authorizer_id', 'authorized_id')
+    )
+    op.create_table('budget',
+        sa.Column('budget_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('budget_name', sa.String(length=80), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('budget_id')
+    )
+    op.create_table('device',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('device_name', sa.String(length=80), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'device_name')
+    )
+    op.create_table('group',
+        sa.Column('group_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('group_name', sa.String(length=80), nullable=False),
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['budget_id'], ['budget.budget_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('group_id')
+    )
+    op.create_table('category',
+        sa.Column('category_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('category_name', sa.String(length=80), nullable=False),
+        sa.Column('time_allocated', sa.Interval(), nullable=False),
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['budget_id'], ['budget.budget_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['group_id'], ['group.group_id'], ),
+        sa.PrimaryKeyConstraint('category_id')
+    )
+    op.create_table('transaction',
+        sa.Column('transaction_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('transaction_name', sa.String(length=80), nullable=False),
+        sa.Column('period', sa.Interval(), nullable=False),
+        sa.Column('date_time', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['category.category_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('transaction_id')
+    )
+
+
+def downgrade():
+    op.drop_table('transaction')
+    op.drop_table('category')
+    op.drop_table('group')
+    op.drop_table('device')
+    op.drop_table('budget')
+    op.drop_table('authorizes')
+    op.drop_table('user')
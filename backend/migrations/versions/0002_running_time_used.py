@@ -0,0 +1,43 @@
+"""Running time used totals on categories, groups and budgets
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('budget', 'group', 'category'):
+        op.add_column(table, sa.Column('time_used', sa.Interval(), server_default='0', nullable=False))
+
+    # Backfill from the transactions already logged
+    op.execute('''
+        UPDATE category SET time_used = usage.total
+        FROM (SELECT category_id, SUM(period) AS total FROM "transaction" GROUP BY category_id) AS usage
+        WHERE category.category_id = usage.category_id
+    ''')
+    op.execute('''
+        UPDATE "group" SET time_used = usage.total
+        FROM (SELECT group_id, SUM(time_used) AS total FROM category WHERE group_id IS NOT NULL GROUP BY group_id) AS usage
+        WHERE "group".group_id = usage.group_id
+    ''')
+    op.execute('''
+        UPDATE budget SET time_used = usage.total
+        FROM (SELECT budget_id, SUM(time_used) AS total FROM category GROUP BY budget_id) AS usage
+        WHERE budget.budget_id = usage.budget_id
+    ''')
+
+
+def downgrade():
+    for table in ('category', 'group', 'budget'):
+        op.drop_column(table, 'time_used')
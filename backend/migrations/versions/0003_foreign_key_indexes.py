@@ -0,0 +1,43 @@
+"""Indexes on foreign key lookup paths
+
+Every list route and cascade delete filters on these columns. The composite
+transaction index serves time ranged reads within a category, and category only
+lookups through its leading column. On Postgres the indexes are built concurrently
+so upgrading a live database does not block writes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_budget_user_id', 'budget', ['user_id']),
+    ('ix_group_budget_id', 'group', ['budget_id']),
+    ('ix_category_budget_id', 'category', ['budget_id']),
+    ('ix_category_group_id', 'category', ['group_id']),
+    ('ix_transaction_category_id_date_time', 'transaction', ['category_id', 'date_time']),
+    ('ix_transaction_date_time', 'transaction', ['date_time']),
+    ('ix_authorizes_authorized_id', 'authorizes', ['authorized_id']),
+)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""Daily time used rollup per category
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('category_daily_usage',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('time_used', sa.Interval(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['category.category_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('category_id', 'day')
+    )
+
+    # Backfill from the transactions already logged
+    op.execute('''
+        INSERT INTO category_daily_usage (category_id, day, time_used)
+        SELECT category_id, CAST(date_time AS DATE), SUM(period) FROM "transaction"
+        GROUP BY category_id, CAST(date_time AS DATE)
+    ''')
+
+
+def downgrade():
+    op.drop_table('category_daily_usage')
@@ -0,0 +1,41 @@
+"""Import jobs and their id maps, for resumable imports
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('import_job',
+    sa.Column('job_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('records_done', sa.Integer(), nullable=False),
+    sa.Column('finished', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_table('import_id_map',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('record_type', sa.String(length=16), nullable=False),
+    sa.Column('old_id', sa.Integer(), nullable=False),
+    sa.Column('new_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['import_job.job_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('job_id', 'record_type', 'old_id')
+    )
+
+
+def downgrade():
+    op.drop_table('import_id_map')
+    op.drop_table('import_job')
@@ -0,0 +1,24 @@
+"""Revision counter on budgets, for ETags
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 16:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('budget', sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('budget', 'revision')
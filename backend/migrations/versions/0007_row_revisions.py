@@ -0,0 +1,44 @@
+"""Revision of the last write on groups, categories and transactions, and tombstones of deleted ones
+
+Rows already stored keep revision 0, a client first syncs a budget in full and only
+asks for the rows changed since the revision it got after that.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('group', 'category', 'transaction'):
+        op.add_column(table, sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_transaction_category_id_revision', 'transaction', ['category_id', 'revision'])
+
+    op.create_table('deleted_row',
+    sa.Column('deleted_row_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('budget_id', sa.Integer(), nullable=False),
+    sa.Column('record_type', sa.String(length=16), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['budget_id'], ['budget.budget_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('deleted_row_id')
+    )
+    op.create_index('ix_deleted_row_budget_id_revision', 'deleted_row', ['budget_id', 'revision'])
+
+
+def downgrade():
+    op.drop_index('ix_deleted_row_budget_id_revision', table_name='deleted_row')
+    op.drop_table('deleted_row')
+    op.drop_index('ix_transaction_category_id_revision', table_name='transaction')
+    for table in ('group', 'category', 'transaction'):
+        op.drop_column(table, 'revision')
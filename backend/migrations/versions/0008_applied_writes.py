@@ -0,0 +1,31 @@
+"""Idempotency keys of the creates applied, so a client can send a write again safely
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('applied_write',
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('idempotency_key')
+    )
+    op.create_index('ix_applied_write_created_at', 'applied_write', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_applied_write_created_at', table_name='applied_write')
+    op.drop_table('applied_write')
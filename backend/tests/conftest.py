@@ -0,0 +1,52 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Fixtures of the backend tests, an application on a SQLite file emptied before each test
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.config import Config
+from app.database import db
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The application, created once, its blueprints can only be registered on one"""
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+        # SQLite's pool takes none of the Postgres pool options
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        # Every request reaches its view, so query counts do not depend on what ran before
+        CACHE_MAX_BYTES = 0
+        CACHE_REDIS_URL = None
+
+    return create_app(TestConfig)
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app.test_client()
+
+
+@pytest.fixture
+def queries(app):
+    """Statements sent to the database, counted while the test runs"""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', count)
@@ -0,0 +1,38 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Smoke tests of the benchmarks, run at a tiny scale so schema changes cannot quietly break them
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def run_benchmark(module, *args, env=None):
+    """Run a benchmark in its own process, each one creates its own app"""
+    result = subprocess.run([sys.executable, '-m', module, *args], cwd=BACKEND, capture_output=True, text=True,
+                            env=dict(os.environ, **(env or {})), timeout=300)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_indexes(tmp_path):
+    output = run_benchmark('benchmarks.indexes', '--users', '1', '--transactions-per-category', '1', '--repeat', '1',
+                           env={'DATABASE_URL': f"sqlite:///{tmp_path / 'indexes.db'}"})
+    assert 'speedup' in output
+
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_routes(cache):
+    output = run_benchmark('benchmarks.routes', '--users', '1', '--budgets-per-user', '1', '--groups-per-budget', '1',
+                           '--categories-per-group', '2', '--transactions-per-category', '2', '--repeat', '1',
+                           *(['--cache'] if cache else []))
+    assert 'create transaction' in output
@@ -0,0 +1,89 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Tests of the budget routes
+"""
+
+from tests.test_categories import count_queries, create_budget
+
+
+def test_changes_returns_rows_written_and_deleted_since_a_revision(client):
+    budget, _ = create_budget(client, 2, transactions_per_category=1)
+    full = client.get(f"{budget}/changes").json
+    assert full['full'] and len(full['categories']) == 2 and len(full['transactions']) == 2
+
+    category_id = full['categories'][0]['category_id']
+    transaction_id = client.post(f"{budget}/categories/{category_id}/transactions",
+                                 json={'transaction_name': 'New', 'period': 60}).json['transaction_id']
+    deleted_id = full['transactions'][1]['transaction_id']
+    assert client.delete(f"{budget}/categories/{full['transactions'][1]['category_id']}"
+                         f"/transactions/{deleted_id}").status_code == 200
+
+    changes = client.get(f"{budget}/changes?since={full['revision']}").json
+    assert not changes['full']
+    assert changes['revision'] == full['revision'] + 2
+    assert [t['transaction_id'] for t in changes['transactions']] == [transaction_id]
+    assert sorted(c['category_id'] for c in changes['categories']) == sorted(c['category_id'] for c in full['categories'])
+    assert changes['deleted']['transactions'] == [deleted_id]
+
+    latest = client.get(f"{budget}/changes?since={changes['revision']}").json
+    assert latest['transactions'] == [] and latest['categories'] == [] and latest['deleted']['transactions'] == []
+
+
+def test_changes_pages_the_transactions(client):
+    budget, _ = create_budget(client, 2, transactions_per_category=3)
+    response = client.get(f"{budget}/changes?limit=2")
+    first = response.json
+    assert len(first['categories']) == 2 and len(first['transactions']) == 2
+
+    transactions = first['transactions']
+    while 'Link' in response.headers:
+        response = client.get(response.headers['Link'].split('>')[0].lstrip('<'))
+        assert response.json['categories'] == [] and response.json['revision'] == first['revision']
+        transactions += response.json['transactions']
+    assert [t['transaction_id'] for t in transactions] == \
+           sorted(t['transaction_id'] for t in client.get(f"{budget}/changes").json['transactions'])
+    assert len(transactions) == 6
+
+
+def test_write_bumps_the_revision_once_and_stamps_each_row_once(client, queries):
+    budget, _ = create_budget(client, 1, transactions_per_category=0)
+    category = f"{budget}/categories/{client.get(f'{budget}/categories').json[0]['category_id']}"
+    queries.clear()
+    assert client.post(f"{category}/transactions", json={'transaction_name': 'a', 'period': 60}).status_code == 201
+    updates = [statement for statement in queries if statement.startswith('UPDATE')]
+    assert sum('revision=(budget.revision' in statement for statement in updates) == 1
+    # The category is written once, its revision along with its time used
+    assert sum(statement.startswith('UPDATE category ') for statement in updates) == 1
+    assert not any(statement.startswith('UPDATE "transaction"') for statement in updates)
+
+
+def test_snapshot_nests_categories_under_their_groups(client):
+    budget, group_id = create_budget(client, 2, grouped=True)
+    client.post(f"{budget}/categories", json={'category_name': 'Ungrouped', 'time_allocated': 60})
+    client.post(f"{budget}/groups", json={'group_name': 'Empty'})
+
+    snapshot = client.get(f"{budget}/snapshot").json
+    assert snapshot['time_used'] == client.get(budget).json['time_used'] == 360
+    assert [c['category_name'] for c in snapshot['categories']] == ['Ungrouped']
+    assert [g['group_name'] for g in snapshot['groups']] == ['Test', 'Empty']
+    assert snapshot['groups'][0]['categories'] == client.get(f"{budget}/groups/{group_id}/categories?detailed=true").json
+    assert snapshot['groups'][1]['categories'] == []
+
+
+def test_snapshot_is_one_query(client, queries):
+    counts = []
+    for categories in (1, 10):
+        budget, _ = create_budget(client, categories, transactions_per_category=0, grouped=True)
+        _, count = count_queries(client, queries, f"{budget}/snapshot")
+        counts.append(count)
+    # The snapshot, and the revision its ETag is made of
+    assert counts == [2, 2]
+
+
+def test_snapshot_of_another_users_budget_is_not_found(client):
+    budget, _ = create_budget(client, 1)
+    other = client.post('/api/users', json={'username': 'other', 'email': 'other@example.com'}).json['user_id']
+    assert client.get(f"/api/users/{other}/budgets/{budget.rsplit('/', 1)[1]}/snapshot").status_code == 404
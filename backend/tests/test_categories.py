@@ -0,0 +1,51 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Tests of the category routes
+"""
+
+import pytest
+
+
+def create_budget(client, categories, transactions_per_category=3, grouped=False):
+    """Create a user and a budget with categories holding transactions, return the budget's url and group id"""
+    user_id = client.post('/api/users', json={'username': 'test', 'email': 'test@example.com'}).json['user_id']
+    budget = f"/api/users/{user_id}/budgets"
+    budget += f"/{client.post(budget, json={'budget_name': 'Test'}).json['budget_id']}"
+    group_id = client.post(f"{budget}/groups", json={'group_name': 'Test'}).json['group_id'] if grouped else None
+    for i in range(categories):
+        category_id = client.post(f"{budget}/categories", json={
+            'category_name': f"Category {i}", 'time_allocated': 3600, 'group_id': group_id,
+        }).json['category_id']
+        client.post(f"{budget}/categories/{category_id}/transactions/bulk",
+                    json=[{'transaction_name': 'Test', 'period': 60}] * transactions_per_category)
+    return budget, group_id
+
+
+def count_queries(client, queries, url):
+    """Return the response of a GET and the number of statements it ran"""
+    queries.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return response, len(queries)
+
+
+@pytest.mark.parametrize('grouped', [False, True])
+def test_detailed_listing_query_count_does_not_grow_with_categories(client, queries, grouped):
+    counts = []
+    for categories in (1, 10):
+        budget, group_id = create_budget(client, categories, grouped=grouped)
+        url = f"{budget}/groups/{group_id}/categories?detailed=true" if grouped else f"{budget}/categories?detailed=true"
+        response, count = count_queries(client, queries, url)
+        assert len(response.json) == categories
+        counts.append(count)
+    assert counts[0] == counts[1]
+
+
+def test_detailed_listing_sums_transactions(client):
+    budget, _ = create_budget(client, 2, transactions_per_category=4)
+    categories = client.get(f"{budget}/categories?detailed=true").json
+    assert [category['time_used'] for category in categories] == [240, 240]
+    assert 'time_used' not in client.get(f"{budget}/categories").json[0]
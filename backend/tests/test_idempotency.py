@@ -0,0 +1,79 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Tests of idempotency keys on creates
+"""
+
+from tests.test_categories import create_budget
+from tests.test_transactions import time_used
+
+
+def category_url(client):
+    budget, _ = create_budget(client, 1, transactions_per_category=0)
+    return f"{budget}/categories/{client.get(f'{budget}/categories').json[0]['category_id']}"
+
+
+def test_create_sent_again_is_applied_once(client):
+    category = category_url(client)
+    headers = {'Idempotency-Key': 'install.1'}
+    body = {'transaction_name': 'a', 'period': 60}
+    created = client.post(f"{category}/transactions", json=body, headers=headers)
+    assert created.status_code == 201
+    again = client.post(f"{category}/transactions", json=body, headers=headers)
+    assert again.status_code == 200
+    # Answered with the row the first one created, as the client would have read it
+    assert again.json == created.json
+    assert len(client.get(f"{category}/transactions").json) == 1
+    assert time_used(client, category) == 60
+
+    assert client.post(f"{category}/transactions", json=body, headers={'Idempotency-Key': 'install.2'}).status_code == 201
+    assert time_used(client, category) == 120
+
+
+def test_refused_create_does_not_use_up_its_key(client):
+    category = category_url(client)
+    headers = {'Idempotency-Key': 'install.1'}
+    assert client.post(f"{category}/transactions", json={'transaction_name': 'a'}, headers=headers).status_code == 400
+    assert client.post(f"{category}/transactions", json={'transaction_name': 'a', 'period': 60},
+                       headers=headers).status_code == 201
+    assert client.post(f"{category}/transactions", json={}, headers={'Idempotency-Key': 'x' * 65}).status_code == 400
+
+
+def test_bulk_sent_again_is_applied_once(client):
+    category = category_url(client)
+    items = [{'transaction_name': 'a', 'period': 60, 'idempotency_key': f"install.{i}"} for i in range(3)]
+    first = client.post(f"{category}/transactions/bulk", json=items)
+    assert first.status_code == 201
+
+    # The first two sent again along with a new one
+    items.append({'transaction_name': 'a', 'period': 60, 'idempotency_key': 'install.3'})
+    again = client.post(f"{category}/transactions/bulk", json=items[:2] + items[3:])
+    assert again.status_code == 201
+    assert [result['status'] for result in again.json['results']] == [200, 200, 201]
+    assert [result['transaction_id'] for result in again.json['results'][:2]] == \
+           [result['transaction_id'] for result in first.json['results'][:2]]
+    assert time_used(client, category) == 240
+
+
+def test_bulk_rejects_a_key_repeated_in_the_request(client):
+    category = category_url(client)
+    item = {'transaction_name': 'a', 'period': 60, 'idempotency_key': 'install.1'}
+    response = client.post(f"{category}/transactions/bulk", json=[item, item, dict(item, idempotency_key=1)])
+    assert [result['status'] for result in response.json['results']] == [201, 400, 400]
+    assert time_used(client, category) == 60
+
+
+def test_create_sent_again_returns_the_row_of_each_kind(client):
+    headers = {'Idempotency-Key': 'install.user'}
+    body = {'username': 'again', 'email': 'again@example.com'}
+    user = client.post('/api/users', json=body, headers=headers).json
+    assert client.post('/api/users', json=body, headers=headers).json == user
+
+    budget, _ = create_budget(client, 1, transactions_per_category=0)
+    for endpoint, body in (('groups', {'group_name': 'g'}), ('categories', {'category_name': 'c', 'time_allocated': 60})):
+        headers = {'Idempotency-Key': f"install.{endpoint}"}
+        created = client.post(f"{budget}/{endpoint}", json=body, headers=headers)
+        assert created.status_code == 201
+        assert client.post(f"{budget}/{endpoint}", json=body, headers=headers).json == created.json
@@ -0,0 +1,44 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Tests of the request instrumentation
+"""
+
+import logging
+
+from flask import Response
+from sqlalchemy import insert
+
+from app.database import db
+from app.instrumentation import finish_request, start_request
+from app.models import User
+
+
+def run_in_request(app, statements):
+    """Run statements as a request would, and return the response finish_request hands back"""
+    with app.test_request_context('/api/users', method='POST'):
+        start_request()
+        for statement, parameters in statements:
+            db.session.execute(statement, parameters)
+        db.session.rollback()
+        return finish_request(Response())
+
+
+def test_batched_insert_is_one_statement(app, client, caplog):
+    users = [{'username': f"user {i}", 'email': 'user@example.com'} for i in range(20)]
+    # A batch per row, like SQLite's inserts that return their ids in row order
+    statement = insert(User).returning(User.user_id).execution_options(insertmanyvalues_page_size=1)
+    with caplog.at_level(logging.WARNING):
+        response = run_in_request(app, [(statement, users)])
+    assert 'N+1' not in caplog.text
+    assert '"1 queries"' in response.headers['Server-Timing']
+
+
+def test_repeated_statements_are_reported(app, client, caplog):
+    statement = insert(User).returning(User.user_id)
+    user = {'username': 'user', 'email': 'user@example.com'}
+    with caplog.at_level(logging.WARNING):
+        run_in_request(app, [(statement, user)] * app.config['N_PLUS_ONE_THRESHOLD'])
+    assert 'Likely N+1 queries' in caplog.text
@@ -0,0 +1,127 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Tests of the transaction routes
+"""
+
+import pytest
+from sqlalchemy import event, text
+
+from app.database import db
+from tests.test_categories import create_budget
+
+
+@pytest.fixture
+def category(client):
+    """Url of a category without transactions"""
+    budget, _ = create_budget(client, 1, transactions_per_category=0)
+    return f"{budget}/categories/{client.get(f'{budget}/categories').json[0]['category_id']}"
+
+
+def time_used(client, category):
+    return client.get(category.rsplit('/categories/', 1)[0] + '/categories?detailed=true').json[0]['time_used']
+
+
+def test_update_reads_period_in_seconds(client, category):
+    transaction_id = client.post(f"{category}/transactions", json={'transaction_name': 'a', 'period': 60}).json['transaction_id']
+    response = client.patch(f"{category}/transactions/{transaction_id}", json={'transaction_name': 'a', 'period': 1})
+    assert response.status_code == 201
+    assert response.json['period'] == 1
+    assert time_used(client, category) == 1
+
+
+@pytest.mark.parametrize('period', ['1e400', '-1e400', '1e12', '"60"', 'true'])
+def test_create_and_update_reject_invalid_periods(client, category, period):
+    body = f'{{"transaction_name": "a", "period": {period}}}'
+    assert client.post(f"{category}/transactions", data=body, content_type='application/json').status_code == 400
+    transaction_id = client.post(f"{category}/transactions", json={'transaction_name': 'a', 'period': 60}).json['transaction_id']
+    response = client.patch(f"{category}/transactions/{transaction_id}", data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert time_used(client, category) == 60
+
+
+def test_update_category_reads_time_allocated_in_seconds(client, category):
+    client.patch(category, json={'category_name': 'b', 'time_allocated': 7200})
+    assert client.get(category).json['time_allocated'] == 7200
+
+
+def test_bulk_rejects_invalid_periods_per_item(client, category):
+    # NDJSON lines are parsed one at a time, where 1e400 reads as infinity
+    lines = '{"transaction_name": "a", "period": 60}\n{"transaction_name": "b", "period": 1e400}\n' \
+            '{"transaction_name": "c", "period": 1e12}\n{"transaction_name": "d", "period": "30"}\n' \
+            '{"transaction_name": "e", "period": 30}\n'
+    response = client.post(f"{category}/transactions/bulk", data=lines, content_type='application/x-ndjson')
+    assert response.status_code == 207
+    assert [result['status'] for result in response.json['results']] == [201, 400, 400, 400, 201]
+
+    response = client.post(f"{category}/transactions/bulk", json=[{'transaction_name': 'f', 'period': 1e12}])
+    assert response.status_code == 400
+    assert time_used(client, category) == 90
+
+
+def test_bulk_returns_ids_in_item_order(client, category):
+    items = [{'transaction_name': f"t{i}", 'period': i + 1} for i in range(50)]
+    items[10]['date_time'] = '2026-01-02T03:04:05'
+    results = client.post(f"{category}/transactions/bulk", json=items).json['results']
+    for item, result in zip(items, results):
+        transaction = client.get(f"{category}/transactions/{result['transaction_id']}").json
+        assert (transaction['transaction_name'], transaction['period']) == (item['transaction_name'], item['period'])
+    assert client.get(f"{category}/transactions/{results[10]['transaction_id']}").json['date_time'] == '2026-01-02T03:04:05'
+
+
+def test_bulk_query_count_does_not_grow_with_items(client, category, queries):
+    counts = []
+    for size in (1, 100):
+        queries.clear()
+        response = client.post(f"{category}/transactions/bulk", json=[{'transaction_name': 'a', 'period': 60}] * size)
+        assert response.status_code == 201
+        counts.append(len(queries))
+    assert counts[0] == counts[1]
+
+
+def test_bulk_ndjson_stops_reading_at_the_limit(app, client, category, monkeypatch):
+    monkeypatch.setitem(app.config, 'BULK_MAX_ITEMS', 3)
+    lines = '{"transaction_name": "a", "period": 60}\n'
+    assert client.post(f"{category}/transactions/bulk", data=lines * 3,
+                       content_type='application/x-ndjson').status_code == 201
+    response = client.post(f"{category}/transactions/bulk", data=lines * 4, content_type='application/x-ndjson')
+    assert response.status_code == 413
+    assert time_used(client, category) == 180
+
+
+@pytest.mark.parametrize('method', ['patch', 'delete'])
+def test_update_and_delete_read_the_transaction_under_the_category_lock(app, client, category, method):
+    """A delete committed between the first read and the category lock leaves nothing to update"""
+    transaction_id = client.post(f"{category}/transactions", json={'transaction_name': 'a', 'period': 60}).json['transaction_id']
+    with app.app_context():
+        engine = db.engine
+
+    deleted = []
+
+    def delete_first(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM category' in statement and not deleted:
+            deleted.append(statement)
+            with engine.begin() as other:
+                other.execute(text('DELETE FROM "transaction"'))
+
+    event.listen(engine, 'before_cursor_execute', delete_first)
+    try:
+        response = getattr(client, method)(f"{category}/transactions/{transaction_id}",
+                                           json={'transaction_name': 'a', 'period': 30})
+    finally:
+        event.remove(engine, 'before_cursor_execute', delete_first)
+    assert response.status_code == 404
+    # The other delete bypassed the routes, so the total still holds the removed transaction
+    assert time_used(client, category) == 60
+
+
+@pytest.mark.parametrize('category_id', ['true', 'false', '1.0', '"1"'])
+def test_bulk_rejects_category_ids_that_are_not_integers(client, category, category_id):
+    # The first category of the first budget has id 1, which true equals
+    body = f'[{{"transaction_name": "a", "period": 60, "category_id": {category_id}}}]'
+    response = client.post(f"{category}/transactions/bulk", data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.json['results'][0]['error'] == 'category_id must be an integer.'
+    assert time_used(client, category) == 0
@@ -0,0 +1,48 @@
+"""
+Author:  Orion Hess
+Created: 2026-10-17
+Edited:  2026-10-17
+
+Tests of the user routes
+"""
+
+from tests.test_categories import create_budget
+
+
+def export(client, budget):
+    """Export the user owning a budget"""
+    return client.get(f"/api/users/{budget.split('/')[3]}/export").get_data()
+
+
+def import_user(client, export):
+    """Import an export, return the import job"""
+    response = client.post('/api/users/import', data=export, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    return response.json
+
+
+def test_import_copies_the_data_tree(client):
+    budget, _ = create_budget(client, 3, transactions_per_category=2, grouped=True)
+    original = client.get(f"{budget}/changes").json
+    job = import_user(client, export(client, budget))
+
+    imported_budget = client.get(f"/api/users/{job['user_id']}/budgets").json[0]['budget_id']
+    imported = client.get(f"/api/users/{job['user_id']}/budgets/{imported_budget}/changes").json
+    assert imported['budget']['time_used'] == original['budget']['time_used']
+    assert [(c['category_name'], c['time_used']) for c in imported['categories']] == \
+           [(c['category_name'], c['time_used']) for c in original['categories']]
+    # Each transaction lands in the category its old id mapped to
+    categories = {c['category_id']: c['category_name'] for c in imported['categories']}
+    assert sorted(categories[t['category_id']] for t in imported['transactions']) == \
+           sorted(c['category_name'] for c in original['categories'] for _ in range(2))
+
+
+def test_import_query_count_does_not_grow_with_transactions(client, queries):
+    counts = []
+    for transactions in (1, 30):
+        budget, _ = create_budget(client, 1, transactions_per_category=transactions)
+        data = export(client, budget)
+        queries.clear()
+        import_user(client, data)
+        counts.append(len(queries))
+    assert counts[0] == counts[1]
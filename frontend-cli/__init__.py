@@ -1,22 +1,39 @@
 """
 Author: Orion Hess
 Created: 2025-12-3
-Updated: 2025-12-3
+Updated: 2026-10-17
 
 Dead simple frontend
 """
 
+import argparse
 
 import view
+from helpers import term
 from model import Model
 
 
 def main():
-    model = Model("http://localhost:5000", debug_mode=False)
-    while True:
-        current_screen = model.get_screen()
-        current_screen.display()
-        current_screen.options()
+    parser = argparse.ArgumentParser(description="Time budgeting cli")
+    parser.add_argument("--url", default="http://localhost:5000", help="Url of the backend")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Seconds to wait for the backend")
+    parser.add_argument("--debug", action="store_true", help="Print debug messages and request timings")
+    parser.add_argument("--journal", help="File of the writes waiting to sync and the local copies of budgets,"
+                        " under ~/.config/time-budget by default")
+    args = parser.parse_args()
+
+    model = Model(args.url, debug_mode=args.debug, timeout=args.timeout, journal_path=args.journal)
+    renderer = view.Renderer()
+    try:
+        while True:
+            # Browsing stays in one fullscreen cbreak session, only left for options that prompt for input
+            with term.fullscreen(), term.cbreak(), term.hidden_cursor():
+                renderer.reset()
+                action = view.run(model, renderer)
+            print(term.home + term.clear, end="")
+            action()
+    finally:
+        model.close()
 
 
 if __name__ == "__main__":
@@ -1,101 +1,250 @@
 """
 Author: Orion Hess
 Created: 2025-12-11
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 Handle api calls
 """
 
-from typing import Union, Any
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Optional, Union, Any
+from urllib.parse import urljoin, urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache import ResponseCache
 from helpers import debug, error
 
+if TYPE_CHECKING:
+    from journal import Journal
+
+# Bytes of a body read between two checks of a cancellable GET
+CHUNK_SIZE = 16 * 1024
+
+
+class Cancelled(Exception):
+    """Raised by a GET given up because its cancel event was set"""
+
 
 class ApiHandler:
-    def __init__(self, url: str, debug_mode: bool) -> None:
+    def __init__(self, url: str, debug_mode: bool, timeout: float = 5.0, retries: int = 3,
+                 cache_ttl: float = 30.0, cache_size: int = 256) -> None:
         self.url = url
         self.debug_mode = debug_mode
+        self.timeout = timeout
+        self.cache = ResponseCache(cache_ttl, cache_size)
+        # Writes are recorded here and sent in the background, see journal.Syncer
+        self.journal: Optional["Journal"] = None
+
+        # One keep-alive session for every call, so navigation reuses the connection
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=["GET", "HEAD", "DELETE"],
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # (method, url, status, milliseconds) of the latest requests
+        self.timings: deque[tuple[str, str, int, float]] = deque(maxlen=100)
+
+        # endpoint -> result of the GET in progress, so a prefetch and a read of the same page share one request
+        self.in_flight: dict[str, Future] = {}
+        self.in_flight_lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Make a request on the session, timing it
+        :param method: HTTP method
+        :param url: Full url to request
+        :return: The response
+        """
+        start = time.perf_counter()
+        response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.timings.append((method, url, response.status_code, elapsed))
+        debug(self.debug_mode, f"{method} {url} returned {response.status_code} in {elapsed:.1f} ms")
+        return response
+
+    def get_page(self, endpoint: str, cancelled: Optional[threading.Event] = None) -> tuple[int, Any, Optional[str]]:
+        """
+        GET one page of an endpoint through the cache
 
-    def get_api(self, endpoint: str) -> Union[list[dict[str, Any]], dict[str, Any], None]:
+        Fresh cache entries are answered without a request, stale ones are revalidated
+        with their ETag. The returned data may be shared with the cache, do not modify it.
+        If another thread is already fetching the page, its result is waited for instead.
+        :param endpoint: Endpoint relative to the api root, including its query
+        :param cancelled: Event that, once set, gives up the request and closes its connection
+        :return: Tuple of status code, json data and the endpoint of the next page if there is one
+        :raises Cancelled: When cancelled was set before the response was read
+        """
+        with self.in_flight_lock:
+            flight = self.in_flight.get(endpoint)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[endpoint] = Future()
+        if not leader:
+            debug(self.debug_mode, f"Waiting for request in flight: {endpoint}")
+            try:
+                return flight.result()
+            except Cancelled:
+                # The request waited for was a prefetch given up, make one of our own
+                return self.get_page(endpoint, cancelled)
+
+        try:
+            result = self._fetch_page(endpoint, cancelled)
+            flight.set_result(result)
+            return result
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self.in_flight_lock:
+                del self.in_flight[endpoint]
+
+    def _fetch_page(self, endpoint: str, cancelled: Optional[threading.Event]) -> tuple[int, Any, Optional[str]]:
+        cached = self.cache.get(endpoint)
+        headers = {}
+        if cached is not None:
+            etag, (data, next_page), fresh = cached
+            if fresh:
+                debug(self.debug_mode, f"Cache hit: {endpoint}")
+                return 200, data, next_page
+            if etag:
+                headers["If-None-Match"] = etag
+
+        generation = self.cache.generation
+        if cancelled is None:
+            response = self.request("GET", f"{self.url}/api/{endpoint}", headers=headers)
+        else:
+            if cancelled.is_set():
+                raise Cancelled(endpoint)
+            # Streamed, so the body is read in chunks that the cancel event is checked between
+            response = self.request("GET", f"{self.url}/api/{endpoint}", headers=headers, stream=True)
+        with response:
+            if response.status_code == 304 and cached is not None:
+                self.cache.put(endpoint, etag, (data, next_page), generation)
+                return 200, data, next_page
+            if response.status_code != 200:
+                return response.status_code, None, None
+
+            data = response.json() if cancelled is None else self._read_json(response, cancelled)
+        next_page = None
+        if "next" in response.links:
+            # The link is relative to the server root, keep it relative to the api root like endpoints
+            next_url = urlsplit(urljoin(response.url, response.links["next"]["url"]))
+            next_page = next_url.path.removeprefix("/api/") + (f"?{next_url.query}" if next_url.query else "")
+        self.cache.put(endpoint, response.headers.get("ETag"), (data, next_page), generation)
+        return 200, data, next_page
+
+    @staticmethod
+    def _read_json(response: requests.Response, cancelled: threading.Event) -> Any:
+        """
+        Read the json body of a streamed response, giving up between chunks once cancelled is set
+        :raises Cancelled: When cancelled is set, closing the response then drops its connection
+        """
+        chunks = []
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if cancelled.is_set():
+                raise Cancelled(response.url)
+            chunks.append(chunk)
+        if cancelled.is_set():
+            raise Cancelled(response.url)
+        return json.loads(b"".join(chunks))
+
+    def get_api(self, endpoint: str, all_pages: bool = True) -> Union[list[dict[str, Any]], dict[str, Any], None]:
         """
         Call GET method on the given endpoint with the given data
 
         :param endpoint: The endpoint to get from
+        :param all_pages: Follow the next links of a paged list and return every item
         :return: Dictionary of json response
         """
         query = f"{self.url}/api/{endpoint}"
         debug(self.debug_mode, f"Querying: {query}")
         try:
-            response = requests.get(query)
-            debug(self.debug_mode, f"Response: {response}")
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
+            status, result, next_page = self.get_page(endpoint)
+            if status == 200:
+                while all_pages and next_page:
+                    debug(self.debug_mode, f"Querying next page: {next_page}")
+                    status, page, next_page = self.get_page(next_page)
+                    if status != 200:
+                        raise requests.HTTPError(f"Next page returned {status}")
+                    result = result + page
+                return result
+            elif status == 404:
                 error(f"Endpoint {query} not found, returned 404")
             else:
-                error(f"Something went wrong, returned {response.status_code}")
+                error(f"Something went wrong, returned {status}")
         except Exception:
             return None
 
-    def post_api(self, endpoint: str, data: dict[str, str]) -> Union[dict[str, str], None]:
+    def get_list(self, endpoint: str) -> tuple[Optional[list[dict[str, Any]]], Optional[str]]:
         """
-        Call POST method on the given endpoint with the given data
-        :param endpoint: the endpoint to post to
-        :param data: the data to post
-        :return: Dictionary of json response
+        Call GET method on one page of a paged list
+        :param endpoint: The endpoint of the list, or of a later page as returned by this method
+        :return: Tuple of the items, or None on failure, and the endpoint of the next page if there is one
         """
-        query = f"{self.url}/api/{endpoint}"
-        debug(self.debug_mode, f"Posting data to: {query}\nData: {data}")
+        debug(self.debug_mode, f"Querying page: {self.url}/api/{endpoint}")
         try:
-            response = requests.post(query, json=data)
-            debug(self.debug_mode, f"Response: {response}")
-            if response.status_code == 201:
-                return response.json()
-            elif response.status_code == 404:
-                error(f"Endpoint {query} not found, returned 404")
+            status, page, next_page = self.get_page(endpoint)
+            if status == 200:
+                return page, next_page
+            elif status == 404:
+                error(f"Endpoint {endpoint} not found, returned 404")
             else:
-                error(f"Something went wrong, returned {response.status_code}")
+                error(f"Something went wrong, returned {status}")
         except Exception as e:
-            error(f"Something went wrong, errored with code {e}")
+            error(f"Something went wrong, errored with {e}")
+        return None, None
 
-    def delete_api(self, endpoint: str) -> Union[dict[str, str], None]:
+    def send(self, method: str, endpoint: str, data: Optional[dict[str, Any]] = None,
+             headers: Optional[dict[str, str]] = None) -> requests.Response:
         """
-        Call DELETE method on the given endpoint
-        :param endpoint: the endpoint to delete
-        :return: json response
+        Send a write to the server now, dropping the cached responses it can change
+        :param method: HTTP method
+        :param endpoint: The endpoint to write to
+        :param data: Json body, if any
+        :param headers: Extra request headers, if any
+        :return: The response
         """
         query = f"{self.url}/api/{endpoint}"
-        debug(self.debug_mode, f"Deleting: {query}")
-        try:
-            response = requests.delete(query)
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
-                error(f"Endpoint {endpoint} not found, returned 404")
-            else:
-                error(f"Something went wrong, returned {response.status_code}")
-        except Exception:
-            return None
+        debug(self.debug_mode, f"Sending {method} to: {query}\nData: {data}")
+        response = self.request(method, query, json=data, headers=headers)
+        self.cache.invalidate(endpoint)
+        return response
+
+    def post_api(self, endpoint: str, data: dict[str, str]) -> None:
+        """
+        Call POST method on the given endpoint with the given data, once the journal sends it
+        :param endpoint: the endpoint to post to
+        :param data: the data to post
+        """
+        self.journal.record("POST", endpoint, data)
 
-    def patch_api(self, endpoint: str, data: dict[str, str]) -> Union[dict[str, str], None]:
+    def delete_api(self, endpoint: str) -> None:
+        """
+        Call DELETE method on the given endpoint, once the journal sends it
+        :param endpoint: the endpoint to delete
         """
-        Call PATCH method on the given endpoint
+        self.journal.record("DELETE", endpoint)
+
+    def patch_api(self, endpoint: str, data: dict[str, str]) -> None:
+        """
+        Call PATCH method on the given endpoint, once the journal sends it
         :param endpoint: The endpoint to update
         :param data: The data to send
-        :return: Dictionary of json response
         """
-        query = f"{self.url}/api/{endpoint}"
-        debug(self.debug_mode, f"Updating: {query}\nData: {data}")
-        try:
-            response = requests.patch(query, json=data)
-            if response.status_code == 201:
-                return response.json()
-            elif response.status_code == 404:
-                error(f"Endpoint {endpoint} not found, returned 404")
-            else:
-                error(f"Something went wrong, returned {response.status_code}")
-        except Exception:
-            return None
+        self.journal.record("PATCH", endpoint, data)
 
     def push_api(self, endpoint: str, data):
         pass
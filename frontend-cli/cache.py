@@ -0,0 +1,92 @@
+"""
+Author: Orion Hess
+Created: 2026-10-17
+Updated: 2026-10-17
+
+Cache of api responses
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def within(path: str, prefix: str) -> bool:
+    """
+    Check if a path is the prefix itself or below it
+    :param path: Endpoint path, e.g. users/1/budgets/2
+    :param prefix: Path to compare against, e.g. users/1
+    """
+    return path == prefix or path.startswith(prefix + "/")
+
+
+class ResponseCache:
+    """
+    Least recently used cache of GET responses, keyed by endpoint
+
+    Entries younger than the ttl are served without a request, older ones are
+    revalidated with their ETag so an unchanged list comes back as a 304.
+    Safe to share between the prefetch threads and the main one.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 256) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # endpoint -> (etag, data, time stored)
+        self.entries: OrderedDict[str, tuple[Optional[str], Any, float]] = OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped by every invalidation, see put
+        self.generation = 0
+
+    def get(self, endpoint: str) -> Optional[tuple[Optional[str], Any, bool]]:
+        """
+        Look up an endpoint
+        :return: Tuple of etag, data and whether it is still fresh, or None if not cached
+        """
+        with self.lock:
+            entry = self.entries.get(endpoint)
+            if entry is None:
+                return None
+            self.entries.move_to_end(endpoint)
+        etag, data, stored = entry
+        return etag, data, time.monotonic() - stored < self.ttl
+
+    def put(self, endpoint: str, etag: Optional[str], data: Any, generation: Optional[int] = None) -> None:
+        """
+        Store a response, evicting the least recently used entries past max_entries
+        :param generation: The generation read before the request was sent. If the cache was
+            invalidated since, the response may predate a write and is not stored.
+        """
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[endpoint] = (etag, data, time.monotonic())
+            self.entries.move_to_end(endpoint)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, endpoint: str) -> None:
+        """
+        Drop the entries a write to the endpoint can change
+
+        That is every collection and item on the path to it, everything below it,
+        and within a budget every list other than transactions, since categories,
+        groups and budgets carry running totals of the time used.
+        """
+        path = endpoint.split("?")[0].strip("/")
+        parts = path.split("/")
+        budget = "/".join(parts[:4]) if len(parts) >= 4 and parts[2] == "budgets" else None
+
+        with self.lock:
+            self.generation += 1
+            for key in list(self.entries):
+                key_path = key.split("?")[0]
+                if (within(path, key_path) or within(key_path, path)
+                        or (budget and within(key_path, budget) and "/transactions" not in key_path)):
+                    del self.entries[key]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
@@ -1,21 +1,26 @@
 """
 Author: Orion Hess
 Created: 2025-12-11
-Updated: 2022-12-11
+Updated: 2026-10-17
 
 Miscellaneous helper functions
 """
 
-import os
-import sys
+from collections import deque
 from datetime import timedelta
 
 import colorama
+from blessed import Terminal
 from colorama import init, Fore, Style
 from tabulate import tabulate
 
 colorama.init(autoreset=True)
 
+term = Terminal()
+
+# Messages for the user, shown under the current screen until the next key press
+messages: deque[str] = deque(maxlen=10)
+
 
 def get_interval(message: str) -> timedelta:
     """
@@ -47,7 +52,7 @@ def debug(debug_mode: bool, message: str) -> None:
     """
     if debug_mode:
         for line in message.split("\n"):
-            print(Fore.GREEN + f"DEBUG: {line}")
+            messages.append(Fore.GREEN + f"DEBUG: {line}")
 
 
 def error(message: str) -> None:
@@ -56,7 +61,7 @@ def error(message: str) -> None:
     :param message: Error message to display
     """
     for line in message.split("\n"):
-        print(Fore.RED + f"ERROR: {line}")
+        messages.append(Fore.RED + f"ERROR: {line}")
 
 
 def validate_choice(message: str) -> bool:
@@ -84,23 +89,16 @@ def print_dict(data: dict, headers: list[str], display_headers: list[str]) -> No
     print(tabulate(list, headers=display_headers, tablefmt="pipe"))
 
 
-if sys.platform == "win32":
-    def clear_console():
-        os.system("cls")
-else:
-    def clear_console():
-        os.system("clear")
-
-from blessed import Terminal
 
-term = Terminal()
-
-def get_key():
-    with term.cbreak():
-        key = term.inkey(timeout=0.1)
-        if not key:
-            return None
-
-        if key.name:
-            return key.name  # 'KEY_UP', 'KEY_DOWN', 'KEY_LEFT', 'KEY_RIGHT'
-        return str(key)
\ No newline at end of file
+def read_key(timeout: float | None = None) -> str | None:
+    """
+    Block until a key is pressed, the terminal has to be in cbreak mode
+    :param timeout: Seconds to wait at most, forever if None
+    :return: Name of the key, e.g. KEY_UP, or the character typed, None on timeout
+    """
+    key = term.inkey(timeout=timeout)
+    if not key:
+        return None
+    if key.name:
+        return key.name  # 'KEY_UP', 'KEY_DOWN', 'KEY_LEFT', 'KEY_RIGHT'
+    return str(key)
@@ -0,0 +1,307 @@
+"""
+Author: Orion Hess
+Created: 2026-10-17
+Updated: 2026-10-17
+
+Journal of writes, kept on disk and sent to the server in the background
+
+Creates, edits and deletes are recorded in a SQLite file under the user's config
+directory and return at once. A Syncer thread sends them in the order they were made:
+runs of transactions logged in one budget go in a single bulk request, every other write
+on its own. While the server cannot be reached, or answers with a server error, writes
+stay in the journal and are retried with a growing delay, even across restarts. Writes
+the server rejects are reported as errors and dropped.
+
+A create may have been applied when its response was lost, so each one is sent with an
+idempotency key, the id of this install followed by its mutation id, and the server
+answers one sent again without applying it twice.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import requests
+
+from api import ApiHandler
+from helpers import debug, error
+
+# users/<user_id>/budgets/<budget_id>/categories/<category_id>/transactions
+TRANSACTIONS = re.compile(r"^(users/\d+/budgets/\d+)/categories/(\d+)/transactions$")
+
+# Collection name in an endpoint -> kind of the display items it holds
+KINDS = {"users": "user", "budgets": "budget", "groups": "group", "categories": "category", "transactions": "transaction"}
+
+
+def default_path() -> str:
+    config = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(config, "time-budget", "journal.db")
+
+
+class Journal:
+    """
+    Writes waiting to be sent to one server, persisted in SQLite
+
+    The pending writes are also kept in memory, in order, so the model can render them
+    without touching the disk. Safe to share between the syncer and the main thread.
+    """
+
+    def __init__(self, path: str, url: str) -> None:
+        self.url = url
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS mutation ("
+            " mutation_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " url TEXT NOT NULL,"
+            " method TEXT NOT NULL,"
+            " endpoint TEXT NOT NULL,"
+            " body TEXT,"
+            " created_at TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Made once per journal file, it tells this install's writes apart from those of others
+        self.connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('install_id', ?)", (uuid.uuid4().hex,))
+        self.install_id = self.connection.execute("SELECT value FROM meta WHERE key = 'install_id'").fetchone()[0]
+        self.connection.commit()
+        self.lock = threading.Lock()
+        # Set when a write is recorded, see Syncer
+        self.recorded = threading.Event()
+
+        rows = self.connection.execute(
+            "SELECT mutation_id, method, endpoint, body, created_at FROM mutation WHERE url = ? ORDER BY mutation_id",
+            (url,))
+        self.pending: list[dict[str, Any]] = [
+            {"mutation_id": mutation_id, "method": method, "endpoint": endpoint,
+             "body": json.loads(body) if body is not None else None, "created_at": created_at}
+            for mutation_id, method, endpoint, body, created_at in rows
+        ]
+        # Ids of the writes being sent
+        self.in_flight: set[int] = set()
+        if self.pending:
+            self.recorded.set()
+
+    def record(self, method: str, endpoint: str, body: Optional[dict[str, Any]] = None) -> None:
+        """
+        Record a write to send
+        :param method: POST, PATCH or DELETE
+        :param endpoint: Endpoint relative to the api root
+        :param body: Json body, if any
+        """
+        # Naive UTC, like the server's default for the time a transaction is logged
+        created_at = datetime.now(timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO mutation (url, method, endpoint, body, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.url, method, endpoint, json.dumps(body) if body is not None else None, created_at))
+            self.connection.commit()
+            self.pending.append({"mutation_id": cursor.lastrowid, "method": method, "endpoint": endpoint,
+                                 "body": body, "created_at": created_at})
+        self.recorded.set()
+
+    def idempotency_key(self, m: dict[str, Any]) -> str:
+        """Return the key the server knows a write by, the same every time it is sent"""
+        return f"{self.install_id}.{m['mutation_id']}"
+
+    def discard(self, mutation_id: int) -> bool:
+        """
+        Drop a write before it is sent
+        :return: False if it is already being sent, or was sent
+        """
+        with self.lock:
+            if mutation_id in self.in_flight or not any(m["mutation_id"] == mutation_id for m in self.pending):
+                return False
+            self._delete([mutation_id])
+        return True
+
+    def begin(self, limit: int) -> list[dict[str, Any]]:
+        """
+        Take the next writes to send, so they can no longer be discarded
+        :param limit: Most writes to take
+        :return: The oldest pending writes
+        """
+        with self.lock:
+            batch = self.pending[:limit]
+            self.in_flight.update(m["mutation_id"] for m in batch)
+            return batch
+
+    def done(self, mutation_ids: list[int]) -> None:
+        """Drop writes that were sent, or rejected"""
+        with self.lock:
+            self._delete(mutation_ids)
+            self.in_flight.difference_update(mutation_ids)
+
+    def retry(self, mutation_ids: list[int]) -> None:
+        """Keep writes that could not be sent, to try again later"""
+        with self.lock:
+            self.connection.executemany("UPDATE mutation SET attempts = attempts + 1 WHERE mutation_id = ?",
+                                        [(mutation_id,) for mutation_id in mutation_ids])
+            self.connection.commit()
+            self.in_flight.difference_update(mutation_ids)
+
+    def release(self, mutation_ids: list[int]) -> None:
+        """Give back writes taken but not sent"""
+        with self.lock:
+            self.in_flight.difference_update(mutation_ids)
+
+    def _delete(self, mutation_ids: list[int]) -> None:
+        self.connection.executemany("DELETE FROM mutation WHERE mutation_id = ?",
+                                    [(mutation_id,) for mutation_id in mutation_ids])
+        self.connection.commit()
+        dropped = set(mutation_ids)
+        self.pending = [m for m in self.pending if m["mutation_id"] not in dropped]
+
+    def creates(self, *endpoints: str) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Return the creates waiting to be sent to any of the endpoints, newest first
+        :return: Tuples of the kind of display item created and the write
+        """
+        with self.lock:
+            return [(KINDS[m["endpoint"].rsplit("/", 1)[-1]], m) for m in reversed(self.pending)
+                    if m["method"] == "POST" and m["endpoint"] in endpoints]
+
+    def pending_time(self) -> dict[int, float]:
+        """Return the seconds waiting to be logged, per category id"""
+        time_used = {}
+        with self.lock:
+            for m in self.pending:
+                match = TRANSACTIONS.match(m["endpoint"]) if m["method"] == "POST" else None
+                if match:
+                    category_id = int(match[2])
+                    time_used[category_id] = time_used.get(category_id, 0) + m["body"]["period"]
+        return time_used
+
+    def pending_targets(self) -> dict[tuple[str, int], str]:
+        """Return the method of the latest edit or delete waiting to be sent, per display item kind and id"""
+        targets = {}
+        with self.lock:
+            for m in self.pending:
+                parts = m["endpoint"].split("?")[0].split("/")
+                if m["method"] in ("PATCH", "DELETE") and len(parts) >= 2 and parts[-2] in KINDS:
+                    targets[KINDS[parts[-2]], int(parts[-1])] = m["method"]
+        return targets
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.pending)
+
+
+class ServerError(Exception):
+    pass
+
+
+class Syncer(threading.Thread):
+    """Send the writes of a journal to the server in the background"""
+
+    def __init__(self, journal: Journal, api_handler: ApiHandler, on_change: Callable[[], None],
+                 batch_size: int = 500, max_delay: float = 60.0) -> None:
+        super().__init__(name="sync", daemon=True)
+        self.journal = journal
+        self.api_handler = api_handler
+        # Called after writes reach the server, so the model can refetch what they changed
+        self.on_change = on_change
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        # Seconds until the next attempt after a failure, 0 while the server is reachable
+        self.delay = 0.0
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.journal.recorded.wait(timeout=self.delay or None)
+            self.journal.recorded.clear()
+            if self.stopped.is_set():
+                return
+            try:
+                self.flush()
+                self.delay = 0.0
+            except (requests.RequestException, ServerError) as e:
+                self.delay = min(max(self.delay * 2, 1.0), self.max_delay)
+                debug(self.api_handler.debug_mode, f"Sync failed, retrying in {self.delay:.0f} s: {e}")
+
+    def stop(self) -> None:
+        """Stop after the current request, unsent writes stay in the journal for the next run"""
+        self.stopped.set()
+        self.journal.recorded.set()
+
+    def flush(self) -> None:
+        """Send every pending write, raising on the first that fails to reach the server"""
+        while not self.stopped.is_set():
+            batch = self.journal.begin(self.batch_size)
+            if not batch:
+                return
+            # Send the first write, along with the transactions logged in the same budget right after it
+            match = TRANSACTIONS.match(batch[0]["endpoint"]) if batch[0]["method"] == "POST" else None
+            if match:
+                size = 1
+                while (size < len(batch) and batch[size]["method"] == "POST"
+                       and (following := TRANSACTIONS.match(batch[size]["endpoint"]))
+                       and following[1] == match[1]):
+                    size += 1
+            else:
+                size = 1
+            self.journal.release([m["mutation_id"] for m in batch[size:]])
+            batch = batch[:size]
+
+            try:
+                if match:
+                    self.send_transactions(match[1], batch)
+                else:
+                    self.send(batch[0])
+            except Exception:
+                self.journal.retry([m["mutation_id"] for m in batch])
+                raise
+            self.on_change()
+
+    def send_transactions(self, budget: str, batch: list[dict[str, Any]]) -> None:
+        """Log transactions through the bulk endpoint of their budget, dated when they were recorded"""
+        items = [dict(m["body"], category_id=int(TRANSACTIONS.match(m["endpoint"])[2]), date_time=m["created_at"],
+                      idempotency_key=self.journal.idempotency_key(m))
+                 for m in batch]
+        response = self.api_handler.send("POST", f"{budget}/categories/{items[0]['category_id']}/transactions/bulk",
+                                         items)
+        if response.status_code >= 500:
+            raise ServerError(f"Bulk log returned {response.status_code}")
+        # send only dropped the cached list of the category posted to
+        for category_id in {item["category_id"] for item in items[1:]}:
+            self.api_handler.cache.invalidate(f"{budget}/categories/{category_id}/transactions")
+        results = response.json().get("results") if response.status_code in (201, 207, 400) else None
+        if results is None:
+            self.reject(batch, self.reason(response))
+            return
+        # 200 for a transaction logged by an earlier attempt whose response was lost
+        for m, result in zip(batch, results):
+            if result["status"] >= 300:
+                self.reject([m], result.get("error", f"returned {result['status']}"))
+        self.journal.done([m["mutation_id"] for m in batch])
+
+    def send(self, m: dict[str, Any]) -> None:
+        # Edits and deletes come out the same when applied twice, creates are told apart by their key
+        headers = {"Idempotency-Key": self.journal.idempotency_key(m)} if m["method"] == "POST" else None
+        response = self.api_handler.send(m["method"], m["endpoint"], m["body"], headers)
+        if response.status_code >= 500:
+            raise ServerError(f"{m['method']} {m['endpoint']} returned {response.status_code}")
+        # Deleting something already gone is what was asked for
+        if response.status_code >= 400 and not (m["method"] == "DELETE" and response.status_code == 404):
+            self.reject([m], self.reason(response))
+            return
+        self.journal.done([m["mutation_id"]])
+
+    def reject(self, batch: list[dict[str, Any]], reason: str) -> None:
+        """Report and drop writes the server refused, sending them again would fail the same way"""
+        for m in batch:
+            error(f"Could not sync {m['method']} {m['endpoint']}: {reason}")
+        self.journal.done([m["mutation_id"] for m in batch])
+
+    @staticmethod
+    def reason(response: requests.Response) -> str:
+        try:
+            return response.json()["error"]
+        except (ValueError, KeyError, TypeError):
+            return f"returned {response.status_code}"
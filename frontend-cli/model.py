@@ -1,28 +1,41 @@
 """
 Author: Orion Hess
 Created: 2025-12-03
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 Model handling the logic of the cli frontend
 """
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import timedelta
 from typing import Union, Any
 
 import colorama
+import requests
 from colorama import init, Fore, Style
 
 import view
 from api import ApiHandler
-from helpers import debug, interval_to_str
+from helpers import debug, error, interval_to_str
 from operations.user import User
 from operations.budget import Budget
 from operations.category import Category
 from operations.group import Group
+from journal import Journal, Syncer, default_path
 from operations.transaction import Transaction
+from prefetch import Prefetcher
+from replica import Replica
 
 colorama.init(autoreset=True)
 
 
+def category_item(c: dict[str, Any]) -> tuple:
+    return ("category", c["category_id"], (c["category_name"], c["time_allocated"], c["time_used"]))
+
+
+def transaction_item(t: dict[str, Any]) -> tuple:
+    return ("transaction", t["transaction_id"], (t["transaction_name"], t["period"]))
+
+
 class Model:
     # Login data
     user_id: int | None = None
@@ -39,19 +52,88 @@ class Model:
     # Items available for selection/display
     selection_index: int = None
     display_items: list[tuple[str, int, Union[str, tuple]]] = []
+    # Endpoint of the next page of a paged list, loaded as the cursor nears the end of the items
+    next_page: str | None = None
+    # First item in view and how many fit, set by list
+    viewport_top: int = 0
+    viewport_rows: int = 20
+    # Index of the first group on the home screen, the categories after it are indented
+    first_group: int | None = None
 
     up_to_date: bool = False
 
-    def __init__(self, url: str, debug_mode: bool = True) -> None:
+    # Pull of the selected budget's changes into the replica in progress, and whether the last one failed
+    pulling: Future | None = None
+    pull_failed: bool = False
+
+    def __init__(self, url: str, debug_mode: bool = True, timeout: float = 5.0, journal_path: str | None = None) -> None:
         self.url = url
         self.debug_mode = debug_mode
 
-        self.api_handler = ApiHandler(self.url, self.debug_mode)
+        self.api_handler = ApiHandler(self.url, self.debug_mode, timeout)
+        # Writes return at once and are shown as pending until the syncer has sent them
+        self.journal = Journal(journal_path or default_path(), self.url)
+        # Budgets opened before are listed from their local copy, kept up to date in the background
+        self.replica = Replica(journal_path or default_path(), self.url)
+        self.puller = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replica")
+        self.api_handler.journal = self.journal
+        self.syncer = Syncer(self.journal, self.api_handler, on_change=self.synced)
+        self.syncer.start()
         self.user = User(self.api_handler)
         self.budget = Budget(self.api_handler)
         self.category = Category(self.api_handler)
         self.group = Group(self.api_handler)
         self.transaction = Transaction(self.api_handler)
+        self.prefetcher = Prefetcher(self.api_handler)
+
+    def close(self) -> None:
+        """Stop the background threads, writes not sent yet stay in the journal"""
+        self.prefetcher.shutdown()
+        self.puller.shutdown(wait=False, cancel_futures=True)
+        self.syncer.stop()
+        # Let a send in flight record its outcome, or it is sent again on the next run
+        self.syncer.join(timeout=self.api_handler.timeout)
+
+    def synced(self) -> None:
+        """Refetch the current list once writes have reached the server"""
+        self.up_to_date = False
+
+    def pull(self) -> None:
+        """Bring the copy of the selected budget up to date in the background, unless a pull is in progress"""
+        if self.selected_budget is None or (self.pulling is not None and not self.pulling.done()):
+            return
+        self.pulling = self.puller.submit(self._pull, self.user_id, self.selected_budget)
+
+    def _pull(self, user_id: int, budget_id: int) -> None:
+        try:
+            changed = self.replica.pull(self.api_handler, user_id, budget_id)
+            self.pull_failed = False
+        except requests.RequestException as e:
+            self.pull_failed = True
+            debug(self.debug_mode, f"Pull of budget {budget_id} failed: {e}")
+            return
+        if changed and budget_id == self.selected_budget:
+            self.up_to_date = False
+
+    def syncing(self) -> bool:
+        """Return True while writes wait to be sent or the selected budget is being pulled"""
+        return len(self.journal) > 0 or (self.pulling is not None and not self.pulling.done())
+
+    def sync_status(self) -> str | None:
+        """
+        Describe the writes waiting to be sent, and the state of the copy of the selected budget
+        :return: Status line, or None when everything is in sync
+        """
+        statuses = []
+        pending = len(self.journal)
+        if pending:
+            status = f"{pending} change{'s' if pending != 1 else ''} waiting to sync"
+            if self.syncer.delay:
+                status += f", server unreachable, retrying every {self.syncer.delay:.0f} s"
+            statuses.append(status)
+        if self.selected_budget is not None and self.pull_failed and self.replica.has(self.selected_budget):
+            statuses.append("Showing the local copy, the server could not be reached")
+        return "; ".join(statuses) or None
 
     def get_screen(self):
         if not self.user_id:
@@ -78,6 +160,7 @@ class Model:
             self.selection_index = len(self.display_items) - 1
             return
         self.selection_index = (self.selection_index - 1) % len(self.display_items)
+        self.prefetch_highlighted()
 
     def highlight_down(self):
         # If there are no items, keep index None
@@ -88,6 +171,90 @@ class Model:
             self.selection_index = 0
             return
         self.selection_index = (self.selection_index + 1) % len(self.display_items)
+        self.prefetch_highlighted()
+
+    def page_up(self) -> None:
+        if len(self.display_items) == 0:
+            return
+        self.selection_index = max((self.selection_index or 0) - self.viewport_rows, 0)
+        self.prefetch_highlighted()
+
+    def page_down(self) -> None:
+        if len(self.display_items) == 0:
+            return
+        self.selection_index = min((self.selection_index or 0) + self.viewport_rows, len(self.display_items) - 1)
+        self.prefetch_highlighted()
+
+    def highlight_top(self) -> None:
+        if len(self.display_items) == 0:
+            return
+        self.selection_index = 0
+        self.prefetch_highlighted()
+
+    def highlight_bottom(self) -> None:
+        """
+        Highlight the last item, loading every page left of a paged list
+        """
+        while self.next_page and self.load_more():
+            pass
+        if len(self.display_items) == 0:
+            return
+        self.selection_index = len(self.display_items) - 1
+        self.prefetch_highlighted()
+
+    def load_more(self) -> bool:
+        """
+        Load the next page of the current list
+        :return: True if a page was loaded
+        """
+        if self.next_page is None:
+            return False
+        items, next_page = self.api_handler.get_list(self.next_page)
+        if items is None:
+            return False
+        item = transaction_item if self.selected_category is not None else category_item
+        self.display_items.extend(item(i) for i in items)
+        self.next_page = next_page
+        return True
+
+    def child_endpoint(self, item: tuple) -> str | None:
+        """
+        Return the endpoint listed when the item is selected, the same the list methods request
+        :param item: Display item
+        :return: Endpoint relative to the api root, or None if the item has no children
+        """
+        # The lists of a budget with a local copy are read from it
+        replicated = self.selected_budget is not None and self.replica.has(self.selected_budget)
+        match item:
+            case ('user', x, _):
+                return f"users/{x}/budgets"
+            case ('budget', x, _) if not self.replica.has(x):
+                return f"users/{self.user_id}/budgets/{x}/snapshot"
+            case ('group', x, _) if not replicated:
+                return f"users/{self.user_id}/budgets/{self.selected_budget}/groups/{x}/categories?detailed=true"
+            case ('category', x, _) if not replicated:
+                return f"users/{self.user_id}/budgets/{self.selected_budget}/categories/{x}/transactions"
+        return None
+
+    def prefetch_highlighted(self) -> None:
+        """
+        Fetch the children of the highlighted item and its neighbours in the background,
+        so selecting one is answered from the cache
+        """
+        if len(self.display_items) == 0:
+            self.prefetcher.cancel()
+            return
+        index = self.selection_index or 0
+        nearby = [self.display_items[i % len(self.display_items)] for i in (index, index + 1, index - 1)]
+        endpoints = []
+        for item in nearby:
+            endpoint = self.child_endpoint(item)
+            if endpoint is not None and endpoint not in endpoints:
+                endpoints.append(endpoint)
+        # And the next page of the list once the cursor is within two screens of its end
+        if self.next_page and index + 2 * self.viewport_rows >= len(self.display_items):
+            endpoints.append(self.next_page)
+        self.prefetcher.prefetch(endpoints)
 
     def validate_index(self) -> bool:
         """
@@ -149,16 +316,15 @@ class Model:
             case ('group', x, _):
                 self.group.group_update(self.user_id, self.selected_budget, x)
             case ('transaction', x, _):
-                self.transaction.transaction_update(self.user_id, self.selected_budget, x)
+                self.transaction.transaction_update(self.user_id, self.selected_budget, self.selected_category, x)
+            case ('pending', _, _):
+                error("This item is not synced yet, edit it once it is")
             case _:
                 raise Exception(f"Invalid selection: {self.display_items[self.selection_index]}")
-        self.up_to_date = False
 
     def delete_item(self):
         self.validate_index()
 
-        self.up_to_date = False
-
         match self.display_items[self.selection_index]:
             case ('user', x, _):
                 self.user.user_delete(x)
@@ -170,6 +336,10 @@ class Model:
                 self.group.group_delete(self.user_id, self.selected_budget, x)
             case ('transaction', x, _):
                 self.transaction.transaction_delete(self.user_id, self.selected_budget, self.selected_category, x)
+            case ('pending', x, _):
+                # Not sent yet, so dropping it from the journal is the whole delete
+                if not self.journal.discard(x):
+                    error("This item is being synced, delete it once it is")
             case _:
                 raise Exception(f"Invalid selection: {self.display_items[self.selection_index]}")
 
@@ -196,11 +366,24 @@ class Model:
         if not self.user_id: raise Exception("Called general list without user_id set")
         if not self.selected_budget: raise Exception("Called general list without budget_id set")
 
-    def list(self) -> None:
+    def list(self, rows: int) -> list[str]:
         """
-        List groups and categories within a budget
+        List the items of the current screen that fit in the viewport, fetching them if they are out of date.
+        Only the items in view are formatted, and the pages of a paged list are loaded as the cursor nears their end.
+        Within a budget that has a local copy the items are read from it, and the copy is pulled in the background.
+        :param rows: Number of lines available
+        :return: Lines to display
         """
+        lines = []
+        if self.selected_category is not None:
+            lines.append(f"Category selected: {self.selected_category} - {self.selected_category_name}")
+        elif self.selected_group is not None:
+            lines.append(f"Group selected: {self.selected_group} - {self.selected_group_name}")
+
         if not self.up_to_date:
+            self.next_page = None
+            self.first_group = None
+            self.viewport_top = 0
             if self.user_id is None:
                 users = self.user.user_list()
                 self.display_items.clear()
@@ -217,100 +400,173 @@ class Model:
                         ("budget", b["budget_id"], b["budget_name"]) for b in budgets
                     ]
                     self.up_to_date = True
+            elif self.replica.has(self.selected_budget):
+                self.list_replica()
+                self.up_to_date = True
             elif self.selected_category is not None:
-                print(f"Category selected: {self.selected_category} - {self.selected_category_name}")
-                transactions = self.transaction.transaction_list(
+                transactions, self.next_page = self.transaction.transaction_list(
                     self.user_id,
                     self.selected_budget,
                     self.selected_category
                 )
                 self.display_items.clear()
-                if transactions:
-                    self.display_items = [
-                        ("transaction", t["transaction_id"], (t["transaction_name"], t["period"])) for t in transactions
-                    ]
+                # Even when empty, the transactions waiting to sync are listed
+                if transactions is not None:
+                    self.display_items = [transaction_item(t) for t in transactions]
                     self.up_to_date = True
             elif self.selected_group is not None:
-                print(f"Group selected: {self.selected_group} - {self.selected_group_name}")
-                categories = self.category.category_list(
+                categories, self.next_page = self.category.category_list(
                     self.user_id,
                     self.selected_budget,
                     self.selected_group
                 )
                 self.display_items.clear()
                 if categories:
-                    self.display_items = [
-                        ("category", c["category_id"], (c["category_name"], c["time_allocated"], c["time_used"])) for c in categories
-                    ]
+                    self.display_items = [category_item(c) for c in categories]
                     self.up_to_date = True
             else:
                 self.list_categories_and_groups()
                 self.up_to_date = True
-
-        ungrouped = True
-        for index, item in enumerate(self.display_items):
+            # Bring the copy of the budget up to date, or make one on its first visit
+            self.pull()
+            refreshed = True
+        else:
+            refreshed = False
+        self.show_pending()
+
+        rows = max(rows - len(lines), 1)
+        # Load further pages while the cursor is within a screen of the end of what is loaded
+        loaded = len(self.display_items)
+        while self.next_page and (self.selection_index or 0) + rows >= len(self.display_items):
+            if not self.load_more():
+                break
+        if refreshed or len(self.display_items) != loaded:
+            self.prefetch_highlighted()
+
+        # Keep a line for the position when the list does not fit
+        overflow = len(self.display_items) > rows or self.next_page is not None
+        if overflow:
+            rows = max(rows - 1, 1)
+        self.viewport_rows = rows
+
+        # Scroll the viewport only as far as needed to keep the selection in view
+        selected = min(self.selection_index or 0, max(len(self.display_items) - 1, 0))
+        top = max(min(self.viewport_top, selected), selected - rows + 1)
+        self.viewport_top = top = max(min(top, len(self.display_items) - rows), 0)
+        bottom = min(top + rows, len(self.display_items))
+
+        # Writes not sent yet are shown as if they were done
+        pending_time = self.journal.pending_time()
+        pending_targets = self.journal.pending_targets()
+        for index in range(top, bottom):
+            item = self.display_items[index]
             # Display selected item
-            if index == self.selection_index:
-                print(" -> ", end="")
-            else:
-                print("    ", end="")
+            line = " -> " if index == self.selection_index else "    "
 
             if item[0] == "group":
-                ungrouped = False
-                print(Fore.LIGHTGREEN_EX + f"{item[2]}")
+                line += Fore.LIGHTGREEN_EX + f"{item[2]}"
             elif item[0] == "category":
                 # Tab in categories for distinction from groups
                 offset = 35
-                if not ungrouped:
+                if self.first_group is not None and index > self.first_group:
                     offset -= 2
-                    print("  ", end="")
+                    line += "  "
                 name, time_allocated, time_used = item[2]
-                print(Fore.LIGHTCYAN_EX + f"{name:{offset}} {time_used/time_allocated*100:>3.0f}% used")
+                time_used += pending_time.get(item[1], 0)
+                line += Fore.LIGHTCYAN_EX + f"{name:{offset}} {time_used/time_allocated*100:>3.0f}% used"
             elif item[0] == "transaction":
                 name, period = item[2]
-                print(Fore.LIGHTMAGENTA_EX + f"{name:35}" + interval_to_str(period))
+                line += Fore.LIGHTMAGENTA_EX + f"{name:35}" + interval_to_str(period)
+            elif item[0] == "pending":
+                kind, body = item[2]
+                if kind == "transaction":
+                    line += Style.DIM + Fore.LIGHTMAGENTA_EX + f"{body['transaction_name']:35}" + interval_to_str(body["period"])
+                elif kind == "category":
+                    line += Style.DIM + Fore.LIGHTCYAN_EX + body["category_name"]
+                elif kind == "group":
+                    line += Style.DIM + Fore.LIGHTGREEN_EX + body["group_name"]
+                elif kind == "budget":
+                    line += Style.DIM + Fore.LIGHTBLUE_EX + body["budget_name"]
+                else:
+                    line += Style.DIM + Fore.LIGHTBLUE_EX + body["username"] + " - " + body["email"]
+                line += "  (not synced)"
             else:
-                print(Fore.LIGHTBLUE_EX + f"{item[2]}")
+                line += Fore.LIGHTBLUE_EX + f"{item[2]}"
+            if (item[0], item[1]) in pending_targets:
+                line += Style.DIM + ("  (deleting)" if pending_targets[item[0], item[1]] == "DELETE" else "  (editing)")
+            lines.append(line)
+
+        if overflow:
+            more = "+" if self.next_page else ""
+            lines.append(Style.DIM + f"    {top + 1}-{bottom} of {len(self.display_items)}{more}")
+        return lines
+
+    def show_pending(self) -> None:
+        """Put the items created on the current screen and waiting to sync at the top of its list, newest first"""
+        shown = 0
+        while shown < len(self.display_items) and self.display_items[shown][0] == "pending":
+            shown += 1
+        pending = [("pending", m["mutation_id"], (kind, m["body"])) for kind, m in self.pending_creates()]
+        self.display_items[:shown] = pending
+        if self.first_group is not None:
+            self.first_group += len(pending) - shown
+
+    def pending_creates(self) -> "list[tuple[str, dict[str, Any]]]":
+        """Return the creates waiting to sync that the current screen lists, see Journal.creates"""
+        if self.user_id is None:
+            return self.journal.creates("users")
+        budgets = f"users/{self.user_id}/budgets"
+        if self.selected_budget is None:
+            return self.journal.creates(budgets)
+        budget = f"{budgets}/{self.selected_budget}"
+        if self.selected_category is not None:
+            return self.journal.creates(f"{budget}/categories/{self.selected_category}/transactions")
+        if self.selected_group is not None:
+            return [(kind, m) for kind, m in self.journal.creates(f"{budget}/categories")
+                    if m["body"].get("group_id") == self.selected_group]
+        return self.journal.creates(f"{budget}/groups", f"{budget}/categories")
 
-    def list_categories_and_groups(self) -> None:
+    def list_replica(self) -> None:
+        """List the items of the current screen within the selected budget from its local copy"""
+        if self.selected_category is not None:
+            self.display_items = [transaction_item(t) for t in self.replica.transactions(self.selected_category)]
+        elif self.selected_group is not None:
+            self.display_items = [category_item(c) for c in self.replica.categories(self.selected_group)]
+        else:
+            self.list_categories_and_groups(self.replica.snapshot(self.selected_budget))
+
+    def list_categories_and_groups(self, snapshot: dict[str, Any] | None = None) -> None:
+        """
+        List the categories and groups of the selected budget
+        :param snapshot: Snapshot to list, fetched from the server if not given
+        """
         self.validate_user_budget_ids()
-        categories = self.category.category_list(self.user_id, self.selected_budget) # self.api_handler.get_api(f"users/{self.user_id}/budgets/{self.selected_budget}/categories")
-        groups = self.group.group_list(self.user_id, self.selected_budget) # self.api_handler.get_api(f"users/{self.user_id}/budgets/{self.selected_budget}/groups")
+        if snapshot is None:
+            snapshot = self.budget.budget_snapshot(self.user_id, self.selected_budget)
 
-        if categories is None or groups is None:
+        if snapshot is None:
             return
 
         self.display_items.clear()
 
-        grouped = {}
-        ungrouped = []
-
-        for c in categories:
-            group_id = c["group_id"]
-            if group_id is None:
-                ungrouped.append(("category", c["category_id"], (c["category_name"], c["time_allocated"], c["time_used"])))
-            else:
-                if group_id not in grouped:
-                    grouped[group_id] = []
-                grouped[group_id].append(("category", c["category_id"], (c["category_name"], c["time_allocated"], c["time_used"])))
-
-        self.display_items.extend(ungrouped)
+        # Ungrouped categories first, then each group followed by its categories
+        for c in snapshot["categories"]:
+            self.display_items.append(category_item(c))
 
-        for g in groups:
+        if snapshot["groups"]:
+            self.first_group = len(self.display_items)
+        for g in snapshot["groups"]:
             self.display_items.append(("group", g["group_id"], g["group_name"]))
-
-            if g["group_id"] in grouped.keys():
-                self.display_items.extend(grouped[g["group_id"]])
+            for c in g["categories"]:
+                self.display_items.append(category_item(c))
 
     def user_create(self) -> None:
         self.user.user_create()
-        self.up_to_date = False
 
     def budget_create(self) -> None:
         if self.user_id is None:
             return
         self.budget.budget_create(self.user_id)
-        self.up_to_date = False
 
     def category_create(self) -> None:
         self.validate_user_budget_ids()
@@ -318,22 +574,18 @@ class Model:
             self.category.category_create(self.user_id, self.selected_budget)
         else:
             self.category.category_create(self.user_id, self.selected_budget, self.selected_group)
-        self.up_to_date = False
 
     def group_create(self) -> None:
         self.validate_user_budget_ids()
         self.group.group_create(self.user_id, self.selected_budget)
-        self.up_to_date = False
 
     def transaction_create(self) -> None:
         self.validate_user_budget_ids()
         self.validate_index()
         if self.selected_category is not None:
             self.transaction.transaction_create(self.user_id, self.selected_budget, self.selected_category)
-            self.up_to_date = False
         elif self.display_items[self.selection_index][0] == "category":
             category_id = self.display_items[self.selection_index][1]
             self.transaction.transaction_create(self.user_id, self.selected_budget, category_id)
-            self.up_to_date = False
         else:
-            print("Create a transaction with a category selected!")
+            error("Create a transaction with a category selected!")
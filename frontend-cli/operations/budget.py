@@ -1,7 +1,7 @@
 """
 Author: Orion Hess
 Created: 2025-12-11
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 Class for budget interactions
 """
@@ -49,5 +49,12 @@ class Budget:
         budgets = self.api_handler.get_api(f"users/{user_id}/budgets")
         return budgets
 
+    def budget_snapshot(self, user_id, budget_id) -> dict[str, Any] | None:
+        """
+        Get a budget with its groups and their categories nested
+        :return: Budget dictionary, ungrouped categories under categories and the rest under groups
+        """
+        return self.api_handler.get_api(f"users/{user_id}/budgets/{budget_id}/snapshot")
+
     def budget_info(self):
         pass
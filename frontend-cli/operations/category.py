@@ -1,7 +1,7 @@
 """
 Author: Orion Hess
 Created: 2025-12-11
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 Class for category interactions
 """
@@ -42,16 +42,14 @@ class Category:
         if validate_choice("Are you sure you want to delete this category?"):
             response = self.api_handler.delete_api(f"users/{user_id}/budgets/{budget_id}/categories/{category_id}")
 
-    def category_list(self, user_id, budget_id, group_id=None) -> list[dict[str, Any]] | None:
+    def category_list(self, user_id, budget_id, group_id=None) -> tuple[list[dict[str, Any]] | None, str | None]:
         """
-        Return a list of categories
-        :return: List of categories
+        Return the first page of categories, fetch the rest with ApiHandler.get_list
+        :return: Tuple of categories and the endpoint of the next page if there is one
         """
         if group_id is None:
-            response = self.api_handler.get_api(f"users/{user_id}/budgets/{budget_id}/categories?detailed=true")
-        else:
-            response = self.api_handler.get_api(f"users/{user_id}/budgets/{budget_id}/groups/{group_id}/categories?detailed=true")
-        return response
+            return self.api_handler.get_list(f"users/{user_id}/budgets/{budget_id}/categories?detailed=true")
+        return self.api_handler.get_list(f"users/{user_id}/budgets/{budget_id}/groups/{group_id}/categories?detailed=true")
 
 
     def category_info(self):
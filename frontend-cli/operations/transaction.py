@@ -1,7 +1,7 @@
 """
 Author: Orion Hess
 Created: 2025-12-11
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 Class for transaction interactions
 """
@@ -49,10 +49,13 @@ class Transaction:
         if validate_choice("Are you sure you want to delete this transaction?"):
             response = self.api_handler.delete_api(f"users/{user_id}/budgets/{budget_id}/categories/{category_id}/transactions/{transaction_id}")
 
-    def transaction_list(self, user_id, budget_id, category_id) -> list[dict[str, Any]] | None:
-        response = self.api_handler.get_api(
+    def transaction_list(self, user_id, budget_id, category_id) -> tuple[list[dict[str, Any]] | None, str | None]:
+        """
+        Return the first page of transactions, fetch the rest with ApiHandler.get_list
+        :return: Tuple of transactions and the endpoint of the next page if there is one
+        """
+        return self.api_handler.get_list(
             f"users/{user_id}/budgets/{budget_id}/categories/{category_id}/transactions")
-        return response
 
     def transaction_info(self):
         pass
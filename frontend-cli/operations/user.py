@@ -1,7 +1,7 @@
 """
 Author: Orion Hess
 Created: 2025-12-11
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 Class for user interactions
 """
@@ -44,9 +44,7 @@ class User:
         """
         Print users to console
         """
-        users = self.api_handler.get_api("users")
-        if users is not None:
-            users = users[:15]
+        users = self.api_handler.get_api("users?limit=15", all_pages=False)
         return users
 
     def user_info(self) -> None:
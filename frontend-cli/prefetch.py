@@ -0,0 +1,80 @@
+"""
+Author: Orion Hess
+Created: 2026-10-17
+Updated: 2026-10-17
+
+Background prefetching of the lists the user is likely to open next
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from api import ApiHandler, Cancelled
+from helpers import debug
+
+
+class Prefetcher:
+    """
+    Fetch the first page of endpoints into the response cache on a small thread pool
+
+    Each call to prefetch replaces the wanted endpoints. Prefetches of endpoints no longer
+    wanted are cancelled: queued ones never start, and a request already sent is given up
+    between chunks of its body, its connection closed and nothing cached. The wait for the
+    response headers cannot be interrupted, it is bounded by the api handler's timeout.
+    """
+
+    def __init__(self, api_handler: ApiHandler, workers: int = 2) -> None:
+        self.api_handler = api_handler
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        # endpoint -> future of the prefetches queued or running, and the event that cancels its request
+        self.pending: dict[str, tuple[Future, threading.Event]] = {}
+        # Reentrant, a done callback runs in the calling thread when the future is already done
+        self.lock = threading.RLock()
+
+    def prefetch(self, endpoints: list[str]) -> None:
+        """
+        Fetch the given endpoints in the background, cancelling the prefetch of any other
+        :param endpoints: Endpoints relative to the api root, most wanted first
+        """
+        with self.lock:
+            for endpoint, (future, cancelled) in list(self.pending.items()):
+                if endpoint not in endpoints:
+                    del self.pending[endpoint]
+                    future.cancel()
+                    cancelled.set()
+
+            for endpoint in endpoints:
+                if endpoint in self.pending:
+                    continue
+                cached = self.api_handler.cache.get(endpoint)
+                if cached is not None and cached[2]:
+                    continue
+                cancelled = threading.Event()
+                future = self.executor.submit(self._fetch, endpoint, cancelled)
+                self.pending[endpoint] = future, cancelled
+                future.add_done_callback(lambda done, endpoint=endpoint: self._forget(endpoint, done))
+
+    def _fetch(self, endpoint: str, cancelled: threading.Event) -> None:
+        """Fetch the first page of an endpoint, lists load their later pages as they are scrolled"""
+        try:
+            self.api_handler.get_page(endpoint, cancelled)
+        except Cancelled:
+            debug(self.api_handler.debug_mode, f"Prefetch of {endpoint} cancelled")
+        except Exception as e:
+            # A failed prefetch only costs the foreground request it would have saved
+            debug(self.api_handler.debug_mode, f"Prefetch of {endpoint} failed: {e}")
+
+    def _forget(self, endpoint: str, future: Future) -> None:
+        with self.lock:
+            pending = self.pending.get(endpoint)
+            if pending is not None and pending[0] is future:
+                del self.pending[endpoint]
+
+    def cancel(self) -> None:
+        """Cancel every prefetch"""
+        self.prefetch([])
+
+    def shutdown(self) -> None:
+        """Cancel every prefetch and stop the threads, without waiting for requests in flight"""
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
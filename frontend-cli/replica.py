@@ -0,0 +1,188 @@
+"""
+Author: Orion Hess
+Created: 2026-10-17
+Updated: 2026-10-17
+
+Local copy of budgets, for reads that need neither the server nor the network
+
+The groups, categories and transactions of the budgets opened are kept in SQLite, in
+the same file as the journal, along with the revision of the budget they were read at.
+Each pull asks the server's changes route only for the rows written since that revision,
+and the budget's revision ETag turns a pull with nothing new into an empty 304.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Any, Optional
+from urllib.parse import urljoin
+
+from api import ApiHandler
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS replica_budget ("
+    " url TEXT NOT NULL, budget_id INTEGER NOT NULL, revision INTEGER NOT NULL,"
+    " budget_name TEXT NOT NULL, time_used REAL NOT NULL,"
+    " PRIMARY KEY (url, budget_id))",
+    "CREATE TABLE IF NOT EXISTS replica_group ("
+    " url TEXT NOT NULL, group_id INTEGER NOT NULL, budget_id INTEGER NOT NULL,"
+    " group_name TEXT NOT NULL, time_used REAL NOT NULL,"
+    " PRIMARY KEY (url, group_id))",
+    "CREATE TABLE IF NOT EXISTS replica_category ("
+    " url TEXT NOT NULL, category_id INTEGER NOT NULL, budget_id INTEGER NOT NULL, group_id INTEGER,"
+    " category_name TEXT NOT NULL, time_allocated REAL NOT NULL, time_used REAL NOT NULL,"
+    " PRIMARY KEY (url, category_id))",
+    "CREATE TABLE IF NOT EXISTS replica_transaction ("
+    " url TEXT NOT NULL, transaction_id INTEGER NOT NULL, budget_id INTEGER NOT NULL, category_id INTEGER NOT NULL,"
+    " transaction_name TEXT NOT NULL, period REAL NOT NULL, date_time TEXT NOT NULL,"
+    " PRIMARY KEY (url, transaction_id))",
+    "CREATE INDEX IF NOT EXISTS ix_replica_transaction_category ON replica_transaction (url, category_id)",
+)
+
+GROUP_COLUMNS = ("group_id", "budget_id", "group_name", "time_used")
+CATEGORY_COLUMNS = ("category_id", "budget_id", "group_id", "category_name", "time_allocated", "time_used")
+TRANSACTION_COLUMNS = ("transaction_id", "category_id", "transaction_name", "period", "date_time")
+
+
+class Replica:
+    """
+    Copies of budgets read from one server, persisted in SQLite
+
+    Rows are returned as the dictionaries the list routes return. Safe to share between
+    the thread pulling changes and the main thread.
+    """
+
+    def __init__(self, path: str, url: str) -> None:
+        self.url = url
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+        self.lock = threading.Lock()
+
+    def revision(self, budget_id: int) -> Optional[int]:
+        """Return the revision the copy of a budget was read at, or None if there is no copy"""
+        with self.lock:
+            row = self.connection.execute("SELECT revision FROM replica_budget WHERE url = ? AND budget_id = ?",
+                                          (self.url, budget_id)).fetchone()
+        return row["revision"] if row else None
+
+    def has(self, budget_id: int) -> bool:
+        return self.revision(budget_id) is not None
+
+    def pull(self, api_handler: ApiHandler, user_id: int, budget_id: int) -> bool:
+        """
+        Bring the copy of a budget up to date, reading the whole budget if there is no copy yet
+        :return: True if the copy changed
+        :raises requests.RequestException: When the server cannot be reached or fails
+        """
+        endpoint = f"users/{user_id}/budgets/{budget_id}/changes"
+        headers = {}
+        revision = self.revision(budget_id)
+        if revision is not None:
+            endpoint += f"?since={revision}"
+            # The tag of the budget's views at that revision, answered 304 while nothing was written
+            headers["If-None-Match"] = f'W/"b{budget_id}.{revision}"'
+
+        response = api_handler.request("GET", f"{api_handler.url}/api/{endpoint}", headers=headers)
+        if response.status_code == 304:
+            return False
+        if response.status_code == 404:
+            return self.drop(budget_id)
+        response.raise_for_status()
+        changes = response.json()
+        # Later pages hold more transactions, stored along with the first so the copy never lands half read
+        while "next" in response.links:
+            response = api_handler.request("GET", urljoin(response.url, response.links["next"]["url"]))
+            response.raise_for_status()
+            changes["transactions"].extend(response.json()["transactions"])
+        self.apply(budget_id, changes)
+        return True
+
+    def apply(self, budget_id: int, changes: dict[str, Any]) -> None:
+        """Store the rows of a response of the changes route, in one transaction"""
+        with self.lock, self.connection:
+            if changes["full"]:
+                self._delete(budget_id)
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO replica_group (url, group_id, budget_id, group_name, time_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(self.url, *(g[column] for column in GROUP_COLUMNS)) for g in changes["groups"]])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO replica_category"
+                " (url, category_id, budget_id, group_id, category_name, time_allocated, time_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.url, *(c[column] for column in CATEGORY_COLUMNS)) for c in changes["categories"]])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO replica_transaction"
+                " (url, transaction_id, budget_id, category_id, transaction_name, period, date_time)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.url, t["transaction_id"], budget_id, *(t[column] for column in TRANSACTION_COLUMNS[1:]))
+                 for t in changes["transactions"]])
+
+            deleted = changes["deleted"]
+            self.connection.executemany("DELETE FROM replica_group WHERE url = ? AND group_id = ?",
+                                        [(self.url, group_id) for group_id in deleted["groups"]])
+            # The server deletes the transactions of a category along with it, without tombstones of their own
+            for table in ("replica_category", "replica_transaction"):
+                self.connection.executemany(f"DELETE FROM {table} WHERE url = ? AND category_id = ?",
+                                            [(self.url, category_id) for category_id in deleted["categories"]])
+            self.connection.executemany("DELETE FROM replica_transaction WHERE url = ? AND transaction_id = ?",
+                                        [(self.url, transaction_id) for transaction_id in deleted["transactions"]])
+
+            budget = changes["budget"]
+            self.connection.execute(
+                "INSERT OR REPLACE INTO replica_budget (url, budget_id, revision, budget_name, time_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.url, budget_id, changes["revision"], budget["budget_name"], budget["time_used"]))
+
+    def drop(self, budget_id: int) -> bool:
+        """
+        Forget the copy of a budget
+        :return: True if there was one
+        """
+        with self.lock, self.connection:
+            return self._delete(budget_id)
+
+    def _delete(self, budget_id: int) -> bool:
+        deleted = False
+        for table in ("replica_budget", "replica_group", "replica_category", "replica_transaction"):
+            cursor = self.connection.execute(f"DELETE FROM {table} WHERE url = ? AND budget_id = ?",
+                                             (self.url, budget_id))
+            deleted = deleted or cursor.rowcount > 0
+        return deleted
+
+    def snapshot(self, budget_id: int) -> dict[str, list[dict[str, Any]]]:
+        """Return the categories and groups of a budget nested like the snapshot route, ungrouped categories first"""
+        with self.lock:
+            groups = [dict(row) for row in self.connection.execute(
+                f"SELECT {', '.join(GROUP_COLUMNS)} FROM replica_group WHERE url = ? AND budget_id = ? ORDER BY group_id",
+                (self.url, budget_id))]
+            categories = self.connection.execute(
+                f"SELECT {', '.join(CATEGORY_COLUMNS)} FROM replica_category WHERE url = ? AND budget_id = ?"
+                " ORDER BY category_id",
+                (self.url, budget_id)).fetchall()
+
+        grouped = {group["group_id"]: [] for group in groups}
+        ungrouped = []
+        for category in categories:
+            grouped.get(category["group_id"], ungrouped).append(dict(category))
+        return {"categories": ungrouped, "groups": [dict(group, categories=grouped[group["group_id"]]) for group in groups]}
+
+    def categories(self, group_id: int) -> list[dict[str, Any]]:
+        """Return the categories of a group"""
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(
+                f"SELECT {', '.join(CATEGORY_COLUMNS)} FROM replica_category WHERE url = ? AND group_id = ?"
+                " ORDER BY category_id",
+                (self.url, group_id))]
+
+    def transactions(self, category_id: int) -> list[dict[str, Any]]:
+        """Return the transactions of a category"""
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(
+                f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM replica_transaction WHERE url = ? AND category_id = ?"
+                " ORDER BY transaction_id",
+                (self.url, category_id))]
@@ -1,13 +1,55 @@
 """
 Author: Orion Hess
 Created: 2025-12-03
-Updated: 2025-12-11
+Updated: 2026-10-17
 
 View handling the display of the cli frontend
+
+Screens render to lines instead of printing them. The Renderer draws each frame over the
+previous one, rewriting only the lines that changed, and keys are read blocking, so the
+terminal does nothing between key presses.
 """
 
+from typing import Any, Callable, Optional
+
+from colorama import Style
+
 from model import Model
-from helpers import clear_console, get_key
+from helpers import messages, read_key, term
+
+
+class Renderer:
+    """Draw frames of lines on the terminal, rewriting only the lines that changed since the last one"""
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.size = (0, 0)
+
+    def reset(self) -> None:
+        """Clear the terminal, so the next frame is drawn in full"""
+        self.lines = []
+        self.write(term.home + term.clear)
+
+    def draw(self, lines: list[str]) -> None:
+        if (term.height, term.width) != self.size:
+            self.size = (term.height, term.width)
+            self.reset()
+
+        # Cut to the terminal, a line that wraps would shift every line below it
+        lines = [term.truncate(line, term.width) + term.normal for line in lines[:term.height]]
+        output = [term.move_yx(y, 0) + line + term.clear_eol
+                  for y, line in enumerate(lines)
+                  if y >= len(self.lines) or line != self.lines[y]]
+        if len(lines) < len(self.lines):
+            output.append(term.move_yx(len(lines), 0) + term.clear_eos)
+        self.lines = lines
+        self.write("".join(output))
+
+    @staticmethod
+    def write(text: str) -> None:
+        # Straight to the terminal, past the colorama wrapper of stdout which adds resets to every write
+        term.stream.write(text)
+        term.stream.flush()
 
 
 class Screen:
@@ -15,6 +57,7 @@ class Screen:
     def __init__(self, model: Model):
         self.model = model
         self._keymap = {}
+        # Options that prompt for input run outside the cbreak session, see run
         self._options = [
             {
                 "label": "k/↑ ",
@@ -28,17 +71,39 @@ class Screen:
                 "keys": ["j", "KEY_DOWN"],
                 "func": self.model.highlight_down
             },
+            {
+                "label": "PgUp/PgDn",
+                "desc": "Page up/down",
+                "keys": ["KEY_PGUP"],
+                "func": self.model.page_up
+            },
+            {
+                # Listed with page up
+                "keys": ["KEY_PGDOWN"],
+                "func": self.model.page_down
+            },
+            {
+                "label": "g/G Home/End",
+                "desc": "Top/bottom",
+                "keys": ["KEY_HOME", "g"],
+                "func": self.model.highlight_top
+            },
+            {
+                "keys": ["KEY_END", "G"],
+                "func": self.model.highlight_bottom
+            },
             {
                 "label": "⎋/←",
                 "desc": "Back",
-                "keys": ["ESC", "KEY_LEFT"],
+                "keys": ["KEY_ESCAPE", "KEY_LEFT"],
                 "func": self.model.back
             },
             {
                 "label": "l/→",
                 "desc": "Edit",
                 "keys": ["l", "KEY_RIGHT"],
-                "func": self.model.edit_item
+                "func": self.model.edit_item,
+                "prompts": True,
             },
             {
                 "label": "␣/↩",
@@ -50,7 +115,8 @@ class Screen:
                 "label": "d",
                 "desc": "Delete",
                 "keys": ["d"],
-                "func": self.model.delete_item
+                "func": self.model.delete_item,
+                "prompts": True,
             },
         ]
         self.set_keymap()
@@ -59,23 +125,28 @@ class Screen:
         self._keymap = {}
         for option in self._options:
             for key in option["keys"]:
-                self._keymap[key] = option["func"]
-
-    def display(self):
-        pass
-
-    def options(self) -> None:
-        print()
-        for option in self._options:
-            print(f"{option["label"]:15} {option["desc"]}")
-        while True:
-            key = get_key()
-            if not key: continue
-            if key in self._keymap:
-                clear_console()
-                self._keymap[key]()
-                print()
-                break
+                self._keymap[key] = option
+
+    def header(self) -> list[str]:
+        return []
+
+    def render(self, height: int) -> list[str]:
+        """
+        Render the screen
+        :param height: Number of lines available
+        :return: Lines to display
+        """
+        header = self.header()
+        status = self.model.sync_status()
+        if status:
+            header.append(Style.DIM + status)
+        options = [f"{option['label']:15} {option['desc']}" for option in self._options if "label" in option]
+        items = self.model.list(height - len(header) - len(options) - 1)
+        return header + items + [""] + options
+
+    def option(self, key: str) -> Optional[dict[str, Any]]:
+        """Return the option bound to a key, or None"""
+        return self._keymap.get(key)
 
 
 class Login(Screen):
@@ -87,14 +158,13 @@ class Login(Screen):
                 "desc": "New user",
                 "keys": ["n"],
                 "func": model.user_create,
+                "prompts": True,
             }
         )
         self.set_keymap()
 
-    def display(self):
-        print("You are not logged in")
-        print("Please select a user")
-        self.model.list()
+    def header(self) -> list[str]:
+        return ["You are not logged in", "Please select a user"]
 
 
 class BudgetSelection(Screen):
@@ -106,28 +176,47 @@ class BudgetSelection(Screen):
                 "desc": "New budget",
                 "keys": ["n"],
                 "func": model.budget_create,
+                "prompts": True,
             }
         )
         self.set_keymap()
 
-    def display(self):
-        print(f"You are logged in as user {self.model.user_id}: {self.model.username}")
-        print("Please select a budget")
-        self.model.list()
+    def header(self) -> list[str]:
+        return [f"You are logged in as user {self.model.user_id}: {self.model.username}", "Please select a budget"]
 
 
 class Home(Screen):
     def __init__(self, model: Model):
         super().__init__(model)
         self._options.append(
-            {"label": "s", "desc": "Create group", "keys": ["s"], "func": model.group_create, })
+            {"label": "s", "desc": "Create group", "keys": ["s"], "func": model.group_create, "prompts": True, })
         self._options.append(
-            {"label": "a", "desc": "Create category", "keys": ["a"], "func": model.category_create, })
+            {"label": "a", "desc": "Create category", "keys": ["a"], "func": model.category_create, "prompts": True, })
         self._options.append(
-            {"label": "f", "desc": "Log transaction", "keys": ["f"], "func": model.transaction_create, })
+            {"label": "f", "desc": "Log transaction", "keys": ["f"], "func": model.transaction_create, "prompts": True, })
         self.set_keymap()
 
-    def display(self):
-        print(f"Logged in as user {self.model.user_id}: {self.model.username}")
-        print(f"Budget selected: {self.model.selected_budget} - {self.model.selected_budget_name}")
-        self.model.list()
+    def header(self) -> list[str]:
+        return [f"Logged in as user {self.model.user_id}: {self.model.username}",
+                f"Budget selected: {self.model.selected_budget} - {self.model.selected_budget_name}"]
+
+
+def run(model: Model, renderer: Renderer) -> Callable[[], None]:
+    """
+    Draw screens and act on keys until an option that prompts for input is picked.
+    Has to run in cbreak mode.
+    :return: The function of that option
+    """
+    while True:
+        screen = model.get_screen()
+        shown = [""] + list(messages) if messages else []
+        renderer.draw(screen.render(term.height - len(shown)) + shown)
+        # While writes wait to sync or the budget is pulled, wake up every second to show them landing
+        key = read_key(timeout=1.0 if model.syncing() else None)
+        option = screen.option(key) if key else None
+        if option is None:
+            continue
+        messages.clear()
+        if option.get("prompts"):
+            return option["func"]
+        option["func"]()
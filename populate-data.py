@@ -1,58 +1,137 @@
-import requests
-from faker import Faker
+import argparse
 import random
-from typing import Dict, Any
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from urllib.parse import urljoin
+
+import requests
+from faker import Faker
 
 fake = Faker()
 
 CONFIG = {
-    'base_url': 'http://127.0.0.1:5000/api', 
+    'base_url': 'http://127.0.0.1:5000/api',
     'num_users': 100,
     'num_budgets_per_user': 3,
     'num_groups_per_budget': 10,
     'num_categories_per_group': 10,
     'num_transactions_per_category': 15,
-    'delay_between_requests': 0.00
+    'delay_between_requests': 0.00,
+    'workers': 8,
+    # Load mode
+    'duration': 60,
+    'rate': 0,
+    'read_ratio': 0.8,
+    'sample_budgets': 50,
 }
-session = requests.Session()
+
+# Each worker thread keeps its own keep-alive session
+local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """Return the session of the current thread"""
+    if not hasattr(local, 'session'):
+        local.session = requests.Session()
+    return local.session
+
 
 def log_progress(message: str):
     """Print progress with timestamp"""
     print(f"[{time.strftime('%H:%M:%S')}] {message}")
 
-def post_request(url: str, data: Dict[str, Any]) -> Dict[str, Any]:
-    """Make POST request and return response JSON"""
+
+class Stats:
+    """Thread safe latency samples per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, list] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self):
+        """Print requests per second and latency percentiles per endpoint"""
+        elapsed = time.perf_counter() - self.started
+        print(f"\n{'endpoint':65} {'count':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        total = 0
+        for endpoint in sorted(self.samples):
+            samples = sorted(self.samples[endpoint])
+            total += len(samples)
+            print(f"{endpoint:65} {len(samples):8} {self.errors.get(endpoint, 0):7} {len(samples) / elapsed:8.1f} "
+                  f"{percentile(samples, 50):8.1f} {percentile(samples, 95):8.1f} {percentile(samples, 99):8.1f}")
+        print(f"\n{total:,} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s overall")
+
+
+def percentile(sorted_samples: list, p: float) -> float:
+    """Nearest rank percentile of sorted samples, in milliseconds"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, round(p / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[rank] * 1000
+
+
+stats = Stats()
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Name a request by its route, so requests to different ids are grouped"""
+    path = url[len(CONFIG['base_url']):].split('?')[0]
+    path = re.sub(r'/\d+', '/{id}', path)
+    return f"{method} {path}"
+
+
+def request(method: str, url: str, data: Optional[Any] = None) -> requests.Response:
+    """Make a request, recording its latency"""
+    start = time.perf_counter()
     try:
-        response = session.post(url, json=data)
-        response.raise_for_status()
-        time.sleep(CONFIG['delay_between_requests'])
-        return response.json()
+        response = get_session().request(method, url, json=data)
     except requests.exceptions.RequestException as e:
-        log_progress(f"Error posting to {url}: {e}")
+        stats.record(endpoint_name(method, url), time.perf_counter() - start, False)
+        log_progress(f"Error on {method} {url}: {e}")
         raise
+    stats.record(endpoint_name(method, url), time.perf_counter() - start, response.ok)
+    return response
+
+
+def get_all(url: str) -> list:
+    """GET every page of a list, following the next links of its Link headers"""
+    items = []
+    while url:
+        response = request('GET', url)
+        response.raise_for_status()
+        items += response.json()
+        # The link is relative to the server root
+        url = urljoin(response.url, response.links['next']['url']) if 'next' in response.links else None
+    return items
+
+
+def post_request(url: str, data: Any) -> Dict[str, Any]:
+    """Make POST request and return response JSON"""
+    response = request('POST', url, data)
+    response.raise_for_status()
+    time.sleep(CONFIG['delay_between_requests'])
+    return response.json()
+
+
+def generate_user() -> int:
+    """Generate and post a user, return its ID"""
+    user_data = {
+        'username': fake.name(),
+        'email': fake.email()
+    }
+    response = post_request(f"{CONFIG['base_url']}/users", user_data)
+    return response.get('id') or response.get('user_id')
 
-def generate_users(num_users: int) -> list:
-    """Generate and post users, return list of user IDs"""
-    log_progress(f"Creating {num_users} users...")
-    user_ids = []
-    
-    for i in range(num_users):
-        user_data = {
-            'username': fake.name(),
-            'email': fake.email()
-        }
-        
-        url = f"{CONFIG['base_url']}/users"
-        response = post_request(url, user_data)
-        user_id = response.get('id') or response.get('user_id')
-        user_ids.append(user_id)
-        
-        if (i + 1) % 10 == 0:
-            log_progress(f"  Created {i + 1}/{num_users} users")
-    
-    log_progress(f"✓ Completed creating {num_users} users")
-    return user_ids
 
 def generate_budgets(user_id: int, num_budgets: int) -> list:
     """Generate and post budgets for a user, return list of budget IDs"""
@@ -61,19 +140,19 @@ def generate_budgets(user_id: int, num_budgets: int) -> list:
         'Personal', 'Work', 'Project', 'Team', 'Department',
         'Annual', 'Monthly', 'Weekly', 'Q1', 'Q2', 'Q3', 'Q4'
     ]
-    
+
     for i in range(num_budgets):
         budget_data = {
             'budget_name': f"{random.choice(budget_categories)} Budget {fake.word().capitalize()}"
         }
-        
+
         url = f"{CONFIG['base_url']}/users/{user_id}/budgets"
         response = post_request(url, budget_data)
-        budget_id = response.get('budget_id')
-        budget_ids.append(budget_id)
-    
+        budget_ids.append(response.get('budget_id'))
+
     return budget_ids
 
+
 def generate_groups(user_id: int, budget_id: int, num_groups: int) -> list:
     """Generate and post groups for a budget, return list of group IDs"""
     group_ids = []
@@ -81,127 +160,227 @@ def generate_groups(user_id: int, budget_id: int, num_groups: int) -> list:
         'Reading', 'Exercise', 'Creative Arts', 'Cooking', 'Outdoors',
         'Gaming', 'Work', 'Mindfulness', 'Gaming', 'Social'
     ]
-    
+
     for i in range(num_groups):
         group_data = {
             'group_name': f"{random.choice(group_types)}"
         }
-        
+
         url = f"{CONFIG['base_url']}/users/{user_id}/budgets/{budget_id}/groups"
         response = post_request(url, group_data)
-        group_id = response.get('group_id')
-        group_ids.append(group_id)
-    
+        group_ids.append(response.get('group_id'))
+
     return group_ids
 
+
 def generate_categories(user_id: int, budget_id: int, group_id: int, num_categories: int) -> list:
     """Generate and post categories for a group, return list of category IDs"""
     category_ids = []
     category_names = [
         "Fiction", "Non-fiction", "Poetry", "Graphic novels", "Running", "Weightlifting", "Yoga", "Cycling", "Drawing", "Painting", "Writing", "Playing an instrument", "Baking", "Cooking new cuisines", "Meal prepping", "Language learning", "Coding", "Photography", "Hiking", "Gardening", "Birdwatching", "Volunteering", "Board games", "Video games", "Puzzles", "Meditation", "Journaling", "Deep breathing exercises", "Local sightseeing", "Road trips"
     ]
-    
+
     for i in range(num_categories):
         time_allocated = random.randint(1*60*60, 20 * 60 * 60)
-        
+
         category_data = {
             'category_name': f"{random.choice(category_names)}",
             'time_allocated': time_allocated,
             'group_id': group_id
         }
-        
+
         url = f"{CONFIG['base_url']}/users/{user_id}/budgets/{budget_id}/categories"
         response = post_request(url, category_data)
-        category_id = response.get('id') or response.get('category_id')
-        category_ids.append(category_id)
-    
+        category_ids.append(response.get('id') or response.get('category_id'))
+
     return category_ids
 
-def generate_transactions(user_id: int, budget_id: int, category_id: int, num_transactions: int):
-    """Generate and post transactions for a category"""
+
+def transaction_data() -> Dict[str, Any]:
+    """Generate the data of a random transaction"""
     transaction_types = [
         'Task', 'Meeting', 'Session', 'Activity', 'Sprint',
         'Review', 'Call', 'Workshop', 'Training', 'Discussion'
     ]
-    
+    # Period between 15 minutes and 8 hours (in seconds)
+    return {
+        'transaction_name': f"{random.choice(transaction_types)}: {fake.sentence(nb_words=4)}",
+        'period': random.randint(900, 28800)
+    }
+
+
+def generate_transactions(user_id: int, budget_id: int, category_id: int, num_transactions: int, bulk: bool):
+    """Generate and post transactions for a category"""
+    url = f"{CONFIG['base_url']}/users/{user_id}/budgets/{budget_id}/categories/{category_id}/transactions"
+    if bulk:
+        post_request(f"{url}/bulk", [transaction_data() for _ in range(num_transactions)])
+        return
     for i in range(num_transactions):
-        # Period between 15 minutes and 8 hours (in seconds)
-        period = random.randint(900, 28800)
-        
-        transaction_data = {
-            'transaction_name': f"{random.choice(transaction_types)}: {fake.sentence(nb_words=4)}",
-            'period': period
-        }
-        
-        url = f"{CONFIG['base_url']}/users/{user_id}/budgets/{budget_id}/categories/{category_id}/transactions"
-        post_request(url, transaction_data)
+        post_request(url, transaction_data())
 
-def main():
-    """Main function to generate all test data"""
+
+def populate_user(bulk: bool) -> None:
+    """Create one user and everything below it"""
+    user_id = generate_user()
+    for budget_id in generate_budgets(user_id, CONFIG['num_budgets_per_user']):
+        for group_id in generate_groups(user_id, budget_id, CONFIG['num_groups_per_budget']):
+            category_ids = generate_categories(user_id, budget_id, group_id, CONFIG['num_categories_per_group'])
+            for category_id in category_ids:
+                generate_transactions(user_id, budget_id, category_id,
+                                      CONFIG['num_transactions_per_category'], bulk)
+
+
+def populate(bulk: bool):
+    """Generate all test data, one user per worker at a time"""
     start_time = time.time()
-    
+
     # Calculate total API calls
+    transactions_calls = (
+        CONFIG['num_users'] * CONFIG['num_budgets_per_user'] * CONFIG['num_groups_per_budget'] * CONFIG['num_categories_per_group']
+        * (1 if bulk else CONFIG['num_transactions_per_category'])
+    )
     total_calls = (
         CONFIG['num_users'] +
         CONFIG['num_users'] * CONFIG['num_budgets_per_user'] +
         CONFIG['num_users'] * CONFIG['num_budgets_per_user'] * CONFIG['num_groups_per_budget'] +
         CONFIG['num_users'] * CONFIG['num_budgets_per_user'] * CONFIG['num_groups_per_budget'] * CONFIG['num_categories_per_group'] +
-        CONFIG['num_users'] * CONFIG['num_budgets_per_user'] * CONFIG['num_groups_per_budget'] * CONFIG['num_categories_per_group'] * CONFIG['num_transactions_per_category']
+        transactions_calls
     )
-    
-    log_progress(f"Starting data generation...")
+
+    log_progress(f"Starting data generation with {CONFIG['workers']} workers...")
     log_progress(f"Total API calls to make: {total_calls:,}")
-    log_progress(f"Estimated time: {(total_calls * CONFIG['delay_between_requests']) / 60:.1f} minutes")
-    
-    # Generate users
-    user_ids = generate_users(CONFIG['num_users'])
-    
-    # For each user, generate budgets
-    for user_idx, user_id in enumerate(user_ids):
-        log_progress(f"Processing user {user_idx + 1}/{len(user_ids)} (ID: {user_id})...")
-        
-        budget_ids = generate_budgets(user_id, CONFIG['num_budgets_per_user'])
-        
-        # For each budget, generate groups
-        for budget_idx, budget_id in enumerate(budget_ids):
-            if budget_idx % 10 == 0:
-                log_progress(f"  Budget {budget_idx + 1}/{len(budget_ids)}...")
-            
-            group_ids = generate_groups(user_id, budget_id, CONFIG['num_groups_per_budget'])
-            
-            # For each group, generate categories
-            for group_id in group_ids:
-                category_ids = generate_categories(
-                    user_id, budget_id, group_id, 
-                    CONFIG['num_categories_per_group']
-                )
-                
-                # For each category, generate transactions
-                for category_id in category_ids:
-                    generate_transactions(
-                        user_id, budget_id, category_id,
-                        CONFIG['num_transactions_per_category']
-                    )
-    
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=CONFIG['workers']) as pool:
+        for future in [pool.submit(populate_user, bulk) for _ in range(CONFIG['num_users'])]:
+            future.result()
+            done += 1
+            if done % 10 == 0:
+                log_progress(f"  Created {done}/{CONFIG['num_users']} users")
+
     elapsed_time = time.time() - start_time
-    log_progress(f"\n✓ All done! Total time: {elapsed_time / 60:.1f} minutes")
+    log_progress(f"✓ All done! Total time: {elapsed_time / 60:.1f} minutes")
     log_progress(f"Total records created: {total_calls:,}")
+    stats.report()
+
+
+def discover_targets() -> list:
+    """Find (user, budget, category) ids to aim the load at"""
+    targets = []
+    users = request('GET', f"{CONFIG['base_url']}/users?limit={CONFIG['sample_budgets']}").json()
+    for user in users:
+        user_url = f"{CONFIG['base_url']}/users/{user['user_id']}"
+        for budget in get_all(f"{user_url}/budgets"):
+            budget_url = f"{user_url}/budgets/{budget['budget_id']}"
+            category_ids = [c['category_id'] for c in get_all(f"{budget_url}/categories")]
+            group_ids = [g['group_id'] for g in get_all(f"{budget_url}/groups")]
+            if category_ids:
+                targets.append((user['user_id'], budget['budget_id'], group_ids, category_ids))
+            if len(targets) >= CONFIG['sample_budgets']:
+                return targets
+    return targets
+
+
+def load_step(targets: list):
+    """Make one request of the mixed workload"""
+    user_id, budget_id, group_ids, category_ids = random.choice(targets)
+    budget_url = f"{CONFIG['base_url']}/users/{user_id}/budgets/{budget_id}"
+    category_url = f"{budget_url}/categories/{random.choice(category_ids)}"
+
+    if random.random() >= CONFIG['read_ratio']:
+        request('POST', f"{category_url}/transactions", transaction_data())
+        return
+
+    reads = [
+        f"{CONFIG['base_url']}/users/{user_id}/budgets",
+        f"{budget_url}/categories?detailed=true",
+        f"{budget_url}/groups",
+        f"{category_url}/transactions",
+    ]
+    if group_ids:
+        reads.append(f"{budget_url}/groups/{random.choice(group_ids)}/categories?detailed=true")
+    request('GET', random.choice(reads))
+
+
+def load():
+    """Run the mixed read/write workload for a duration, optionally at a target rate"""
+    log_progress("Discovering budgets to load...")
+    targets = discover_targets()
+    if not targets:
+        log_progress("No budgets with categories found, run populate first")
+        return
+
+    global stats
+    stats = Stats()
+    rate = CONFIG['rate']
+    deadline = time.perf_counter() + CONFIG['duration']
+    lock = threading.Lock()
+    sent = [0]
+
+    def worker():
+        while True:
+            if rate:
+                # Requests are scheduled at fixed intervals shared by all workers
+                with lock:
+                    slot = stats.started + sent[0] / rate
+                    sent[0] += 1
+                delay = slot - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if time.perf_counter() >= deadline:
+                return
+            try:
+                load_step(targets)
+            except requests.exceptions.RequestException:
+                pass
+
+    log_progress(f"Running for {CONFIG['duration']}s with {CONFIG['workers']} workers, "
+                 f"{f'{rate} req/s target' if rate else 'unthrottled'}, {CONFIG['read_ratio']:.0%} reads...")
+    with ThreadPoolExecutor(max_workers=CONFIG['workers']) as pool:
+        for future in [pool.submit(worker) for _ in range(CONFIG['workers'])]:
+            future.result()
+    stats.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate the API with test data or put it under load")
+    parser.add_argument('mode', choices=['populate', 'load'], nargs='?', default='populate',
+                        help="populate creates test data, load runs a mixed read/write workload against it")
+    parser.add_argument('--base-url', default=CONFIG['base_url'])
+    parser.add_argument('--workers', type=int, default=CONFIG['workers'], help="Concurrent workers")
+    parser.add_argument('--users', type=int, default=CONFIG['num_users'], help="Users to create when populating")
+    parser.add_argument('--bulk', action='store_true', help="Post each category's transactions in one bulk request")
+    parser.add_argument('--duration', type=float, default=CONFIG['duration'], help="Seconds to run the load for")
+    parser.add_argument('--rate', type=float, default=CONFIG['rate'], help="Target requests per second, 0 for as fast as possible")
+    parser.add_argument('--read-ratio', type=float, default=CONFIG['read_ratio'], help="Share of load requests that are reads")
+    parser.add_argument('--yes', action='store_true', help="Do not ask for confirmation")
+    args = parser.parse_args()
+
+    CONFIG.update(base_url=args.base_url.rstrip('/'), workers=args.workers, num_users=args.users,
+                  duration=args.duration, rate=args.rate, read_ratio=args.read_ratio)
+
+    if args.mode == 'load':
+        load()
+        return
 
-if __name__ == '__main__':
     print("\n" + "="*60)
     print("API Test Data Generator")
     print("="*60)
     print(f"\nConfiguration:")
     print(f"  Base URL: {CONFIG['base_url']}")
+    print(f"  Workers: {CONFIG['workers']}")
     print(f"  Users: {CONFIG['num_users']}")
     print(f"  Budgets per user: {CONFIG['num_budgets_per_user']}")
     print(f"  Groups per budget: {CONFIG['num_groups_per_budget']}")
     print(f"  Categories per group: {CONFIG['num_categories_per_group']}")
     print(f"  Transactions per category: {CONFIG['num_transactions_per_category']}")
     print("\n" + "="*60 + "\n")
-    
-    confirm = input("This will make a LOT of API calls. Continue? (yes/no): ")
-    if confirm.lower() == 'yes':
-        main()
+
+    if args.yes or input("This will make a LOT of API calls. Continue? (yes/no): ").lower() == 'yes':
+        populate(args.bulk)
     else:
-        print("Cancelled.")
\ No newline at end of file
+        print("Cancelled.")
+
+
+if __name__ == '__main__':
+    main()
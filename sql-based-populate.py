@@ -1,144 +1,278 @@
-import requests
+import abc
+import argparse
+import csv
+import os
 import random
+import shutil
+import tempfile
 from faker import Faker
-import json
-from typing import List, Dict
-import time
 
-fake = Faker()
-
-# Configuration
+# Configuration, per unit of --scale
 NUM_USERS = 100
 NUM_BUDGETS = 3
 NUM_GROUPS = 3
 NUM_CATEGORIES = 5
 NUM_TRANSACTIONS = 15
 
+# Faker is slow, so names are drawn from pools generated once up front
+POOL_SIZE = 1000
+
+TABLES = {
+    "user": ("user_id", "username", "email"),
+    "budget": ("budget_id", "user_id", "budget_name", "time_used"),
+    "group": ("group_id", "budget_id", "group_name", "time_used"),
+    "category": ("category_id", "budget_id", "group_id", "category_name", "time_allocated", "time_used"),
+    "transaction": ("transaction_id", "category_id", "transaction_name", "period"),
+}
+INTERVAL_COLUMNS = {"time_used", "time_allocated", "period"}
+
+# Transactions are dated by the database on load, so their daily rollup is summed there too
+DAILY_USAGE = """INSERT INTO category_daily_usage (category_id, day, time_used)
+SELECT category_id, CAST(date_time AS DATE), SUM(period) FROM "transaction"
+GROUP BY category_id, CAST(date_time AS DATE);"""
+
 # Sample data generators
-def generate_budget_name():
+def generate_budget_name(rng):
     budget_types = ["Personal", "Work", "Project", "Team", "Department"]
     contexts = ["Weekly", "Monthly", "Sprint", "Q1", "Q2", "Q3", "Q4", "2024", "2025"]
-    return f"{random.choice(budget_types)} {random.choice(contexts)} Budget"
+    return f"{rng.choice(budget_types)} {rng.choice(contexts)} Budget"
 
-def generate_group_name():
+def generate_group_name(rng):
     groups = [        'Reading', 'Exercise', 'Creative Arts', 'Cooking', 'Outdoors',
         'Gaming', 'Work', 'Mindfulness', 'Gaming', 'Social']
-    return random.choice(groups)
+    return rng.choice(groups)
 
-def generate_category_name():
+def generate_category_name(rng):
     categories = ["Fiction", "Non-fiction", "Poetry", "Graphic novels", "Running", "Weightlifting", "Yoga", "Cycling", "Drawing", "Painting", "Writing", "Playing an instrument", "Baking", "Cooking new cuisines", "Meal prepping", "Language learning", "Coding", "Photography", "Hiking", "Gardening", "Birdwatching", "Volunteering", "Board games", "Video games", "Puzzles", "Meditation", "Journaling", "Deep breathing exercises", "Local sightseeing", "Road trips"]
-    return random.choice(categories)
+    return rng.choice(categories)
 
-def generate_transaction_name():
+def generate_transaction_name(rng):
     actions = [
-        "Read", 
-        "Practiced", 
-        "Created", 
-        "Cooked", 
-        "Learned", 
-        "Explored", 
-        "Played", 
-        "Meditated", 
-        "Planned", 
+        "Read",
+        "Practiced",
+        "Created",
+        "Cooked",
+        "Learned",
+        "Explored",
+        "Played",
+        "Meditated",
+        "Planned",
         "Photographed"
     ]
 
     subjects = [
-        "fiction book", 
-        "non-fiction article", 
-        "poem", 
-        "painting", 
-        "recipe", 
-        "new language", 
-        "exercise routine", 
-        "board game", 
-        "puzzle", 
+        "fiction book",
+        "non-fiction article",
+        "poem",
+        "painting",
+        "recipe",
+        "new language",
+        "exercise routine",
+        "board game",
+        "puzzle",
         "local landmark"
     ]
-    return f"{random.choice(actions)} {random.choice(subjects)}"
+    return f"{rng.choice(actions)} {rng.choice(subjects)}"
 
-def generate_time_allocated():
-    # Between 30 minutes and 8 hours
-    hours = random.randint(0, 8)
-    minutes = random.randint(0, 59)
-    seconds = random.randint(0, 59)
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+def generate_time_allocated(rng):
+    # Between 30 minutes and 8 hours, in seconds
+    return rng.randint(30 * 60, 8 * 60 * 60)
 
-def generate_time_period():
-    # Between 5 minutes and 4 hours
-    hours = random.randint(0, 4)
-    minutes = random.randint(0, 59)
-    seconds = random.randint(0, 59)
+def generate_time_period(rng):
+    # Between 5 minutes and 4 hours, in seconds
+    return rng.randint(5 * 60, 4 * 60 * 60)
+
+def interval(seconds):
+    """Format seconds as a postgres interval literal, hours may exceed 24"""
+    hours, remainder = divmod(seconds, 60 * 60)
+    minutes, seconds = divmod(remainder, 60)
     return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
 
+class SpoolingWriter(abc.ABC):
+    """
+    Spools rows to a temporary file per table as they are generated, then writes
+    the tables in parent to child order, so memory use does not grow with scale.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.spools = {table: tempfile.TemporaryFile("w+") for table in TABLES}
+
+    def write(self, table, row):
+        self.spools[table].write(self.format_row(table, row))
+
+    @abc.abstractmethod
+    def format_row(self, table, row):
+        """Return a row as the text spooled for its table"""
+
+    def table_header(self, table):
+        return ""
+
+    def table_footer(self, table):
+        return ""
+
+    def finish(self, sequences):
+        with open(self.output_file, "w") as f:
+            f.write("BEGIN;\n\n")
+            for table, spool in self.spools.items():
+                f.write(self.table_header(table))
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                spool.close()
+                f.write(self.table_footer(table))
+            f.write(sequences + "\nCOMMIT;\n")
+        print(f"To execute: psql -U username -d database_name -f {self.output_file}")
+
+
+class SqlWriter(SpoolingWriter):
+    """Writes one INSERT statement per row"""
+
+    def format_row(self, table, row):
+        values = []
+        for column, value in zip(TABLES[table], row):
+            if value is None:
+                values.append("NULL")
+            elif column in INTERVAL_COLUMNS:
+                values.append(f"INTERVAL '{interval(value)}'")
+            elif isinstance(value, str):
+                values.append("'" + value.replace("'", "''") + "'")
+            else:
+                values.append(str(value))
+        return f"INSERT INTO \"{table}\" ({', '.join(TABLES[table])}) VALUES ({', '.join(values)});\n"
+
+    def table_footer(self, table):
+        return "\n"
+
+
+class CopyWriter(SpoolingWriter):
+    """Writes a COPY ... FROM STDIN block per table"""
+
+    @staticmethod
+    def escape(column, value):
+        if value is None:
+            return "\\N"
+        if column in INTERVAL_COLUMNS:
+            return interval(value)
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+    def format_row(self, table, row):
+        return "\t".join(self.escape(c, v) for c, v in zip(TABLES[table], row)) + "\n"
+
+    def table_header(self, table):
+        return f"COPY \"{table}\" ({', '.join(TABLES[table])}) FROM STDIN;\n"
+
+    def table_footer(self, table):
+        return "\\.\n\n"
+
+
+class CsvWriter:
+    """Writes a CSV file per table and a load.sql that imports them with \\copy"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.files = {table: open(os.path.join(output_dir, f"{table}.csv"), "w", newline="") for table in TABLES}
+        self.writers = {table: csv.writer(f) for table, f in self.files.items()}
+        for table, writer in self.writers.items():
+            writer.writerow(TABLES[table])
+
+    def write(self, table, row):
+        self.writers[table].writerow(
+            "" if v is None else interval(v) if c in INTERVAL_COLUMNS else v for c, v in zip(TABLES[table], row)
+        )
+
+    def finish(self, sequences):
+        for f in self.files.values():
+            f.close()
+        with open(os.path.join(self.output_dir, "load.sql"), "w") as f:
+            f.write("BEGIN;\n")
+            for table, columns in TABLES.items():
+                f.write(f"\\copy \"{table}\" ({', '.join(columns)}) FROM '{table}.csv' WITH (FORMAT csv, HEADER)\n")
+            f.write(sequences + "\nCOMMIT;\n")
+        print(f"To execute: cd {self.output_dir} && psql -U username -d database_name -f load.sql")
+
+
+def generate(writer, scale=1.0, seed=0):
+    """Streams generated rows to the writer"""
+
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    names = [fake.name() for _ in range(POOL_SIZE)]
+    emails = [fake.email() for _ in range(POOL_SIZE)]
+    num_users = max(1, round(NUM_USERS * scale))
+
+    print("Generating data...")
+
+    user_id = 1
+    budget_id = 1
+    group_id = 1
+    category_id = 1
+    transaction_id = 1
+
+    for u in range(num_users):
+        writer.write("user", (user_id, rng.choice(names), rng.choice(emails)))
+
+        for b in range(NUM_BUDGETS):
+            # Running totals must match the transactions, so totals are summed on the way up
+            budget_used = 0
+            for g in range(NUM_GROUPS):
+                group_used = 0
+                for c in range(NUM_CATEGORIES):
+                    category_used = 0
+                    for t in range(NUM_TRANSACTIONS):
+                        period = generate_time_period(rng)
+                        category_used += period
+                        writer.write("transaction", (transaction_id, category_id, generate_transaction_name(rng), period))
+                        transaction_id += 1
+
+                    writer.write("category", (category_id, budget_id, group_id, generate_category_name(rng),
+                                              generate_time_allocated(rng), category_used))
+                    group_used += category_used
+                    category_id += 1
+
+                writer.write("group", (group_id, budget_id, generate_group_name(rng), group_used))
+                budget_used += group_used
+                group_id += 1
+
+            writer.write("budget", (budget_id, user_id, generate_budget_name(rng), budget_used))
+            budget_id += 1
+
+        user_id += 1
+        if (u + 1) % 100 == 0:
+            print(f"Generated {u + 1}/{num_users} users...")
+
+    # Ids were given explicitly, move the sequences past them
+    sequences = "\n".join(
+        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', '{columns[0]}'), {max(last - 1, 1)});"
+        for (table, columns), last in zip(TABLES.items(), (user_id, budget_id, group_id, category_id, transaction_id))
+    )
+    writer.finish(sequences + "\n" + DAILY_USAGE)
 
-def generate_sql_inserts(output_file="populate_budget_data.sql"):
-    """Generates SQL INSERT statements for bulk loading"""
-    
-    print("Generating SQL inserts...")
-    
-    with open(output_file, 'w') as f:
-        # Start transaction for performance
-        f.write("BEGIN TRANSACTION;\n\n")
-        
-        user_id = 1
-        budget_id = 1
-        group_id = 1
-        category_id = 1
-        transaction_id = 1
-        
-        # Generate users
-        f.write("-- Inserting users\n")
-        for u in range(NUM_USERS):
-            username = fake.name().replace("'", "''")
-            email = fake.email()
-            f.write(f"INSERT INTO \"user\" (user_id, username, email) VALUES ({user_id}, '{username}', '{email}');\n")
-            
-            # Generate budgets for this user
-            for b in range(NUM_BUDGETS):
-                budget_name = generate_budget_name().replace("'", "''")
-                f.write(f"INSERT INTO \"budget\" (budget_id, user_id, budget_name) VALUES ({budget_id}, {user_id}, '{budget_name}');\n")
-                
-                # Generate groups for this budget
-                for g in range(NUM_GROUPS):
-                    group_name = generate_group_name().replace("'", "''")
-                    f.write(f"INSERT INTO \"group\" (group_id, budget_id, group_name) VALUES ({group_id}, {budget_id}, '{group_name}');\n")
-                    
-                    # Generate categories for this group
-                    for c in range(NUM_CATEGORIES):
-                        category_name = generate_category_name().replace("'", "''")
-                        time_allocated = generate_time_allocated()
-                        f.write(f"INSERT INTO \"category\" (category_id, budget_id, group_id, category_name, time_allocated) VALUES ({category_id}, {budget_id}, {group_id}, '{category_name}', INTERVAL '{time_allocated}');\n")
-                        
-                        # Generate transactions for this category
-                        for t in range(NUM_TRANSACTIONS):
-                            transaction_name = generate_transaction_name().replace("'", "''")
-                            period = generate_time_period()
-                            f.write(f"INSERT INTO \"transaction\" (transaction_id, category_id, transaction_name, period) VALUES ({transaction_id}, {category_id}, '{transaction_name}', INTERVAL '{period}');\n")
-                            transaction_id += 1
-                        
-                        category_id += 1
-                    group_id += 1
-                budget_id += 1
-            
-            user_id += 1
-            if (u + 1) % 10 == 0:
-                print(f"Generated SQL for {u + 1}/{NUM_USERS} users...")
-        
-        f.write("\nCOMMIT;\n")
-    
     total_records = (user_id - 1) + (budget_id - 1) + (group_id - 1) + (category_id - 1) + (transaction_id - 1)
-    print(f"\nSQL generation complete!")
+    print(f"\nGeneration complete!")
     print(f"Total records: {total_records:,}")
-    print(f"  Users: {NUM_USERS:,}")
+    print(f"  Users: {(user_id - 1):,}")
     print(f"  Budgets: {(budget_id - 1):,}")
     print(f"  Groups: {(group_id - 1):,}")
     print(f"  Categories: {(category_id - 1):,}")
     print(f"  Transactions: {(transaction_id - 1):,}")
-    print(f"\nOutput file: {output_file}")
-    print(f"To execute: psql -U username -d database_name -f {output_file}")
-    print(f"Or: mysql -u username -p database_name < {output_file}")
 
-if __name__ == "__main__":    
-    generate_sql_inserts()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a Postgres fixture of budgeting data")
+    parser.add_argument("--format", choices=["copy", "csv", "sql"], default="copy",
+                        help="copy: COPY FROM STDIN blocks, csv: a CSV per table plus load.sql, sql: INSERT per row")
+    parser.add_argument("--output", help="Output file, or directory for csv (default populate_budget_data.sql or populate_budget_data/)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"Multiplier on the {NUM_USERS} users, each with {NUM_BUDGETS * NUM_GROUPS * NUM_CATEGORIES * NUM_TRANSACTIONS} transactions")
+    parser.add_argument("--seed", type=int, default=0, help="The same seed always generates the same data")
+    args = parser.parse_args()
+
+    if args.format == "csv":
+        writer = CsvWriter(args.output or "populate_budget_data")
+    elif args.format == "copy":
+        writer = CopyWriter(args.output or "populate_budget_data.sql")
+    else:
+        writer = SqlWriter(args.output or "populate_budget_data.sql")
+    generate(writer, args.scale, args.seed)